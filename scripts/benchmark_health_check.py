@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+ヘルスチェックベンチマーク
+従来の文字列の集合による全体の検査と、run_health_check の全体の検査・追記分だけの検査の
+所要時間・メモリ確保量を比較する
+"""
+
+import argparse
+import csv
+import gc
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.modules.health_check import HealthCheckResult, run_health_check  # noqa: E402
+from src.modules.models import Attempt  # noqa: E402
+from src.modules.storage import (  # noqa: E402
+    ATTEMPT_HEADER,
+    PROBLEM_HEADER,
+    AttemptStorage,
+    ProblemStorage,
+)
+from src.modules.tombstones import is_tombstoned  # noqa: E402
+
+
+def write_fixture(
+    data_dir: Path, problem_count: int, attempt_count: int, orphan_rate: float
+) -> list[str]:
+    """ベンチマーク用の problems.csv と attempts.csv を作成し、問題IDを返す"""
+    rng = random.Random(0)
+    problem_ids = [f"problem-{i:08d}" for i in range(problem_count)]
+    with (data_dir / "problems.csv").open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(PROBLEM_HEADER)
+        for problem_id in problem_ids:
+            writer.writerow([problem_id, "漢字の練習をする", "練習", "れんしゅう", "2025-01-01", 0])
+
+    # 読み込み時に当月分として扱われるよう、試行日時は当月1日から並べる
+    now = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    with (data_dir / "attempts.csv").open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(ATTEMPT_HEADER)
+        for i in range(attempt_count):
+            if rng.random() < orphan_rate:
+                problem_id = f"deleted-{rng.randrange(problem_count):08d}"
+            else:
+                problem_id = rng.choice(problem_ids)
+            attempted_at = (now + timedelta(milliseconds=i)).isoformat()
+            writer.writerow([f"attempt-{i:09d}", problem_id, attempted_at, True, "なし", ""])
+    return problem_ids
+
+
+def legacy_health_check(
+    problem_storage: ProblemStorage, attempt_storage: AttemptStorage
+) -> HealthCheckResult:
+    """従来方式: 問題IDと試行IDを文字列の集合に持ち、毎回全体を検査する"""
+    result = HealthCheckResult()
+    problem_ids: set[str] = set()
+    duplicate_problem_ids: set[str] = set()
+    deleted_problems = problem_storage.tombstones.load()
+    with problem_storage.file_path.open(encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            pid = row.get("id", "")
+            if pid and is_tombstoned(deleted_problems, pid, row.get("created_at") or ""):
+                continue
+            if pid:
+                if pid in problem_ids:
+                    duplicate_problem_ids.add(pid)
+                problem_ids.add(pid)
+    result.total_problems = len(problem_ids)
+    result.duplicate_problem_ids = list(duplicate_problem_ids)
+
+    attempt_ids: set[str] = set()
+    duplicate_attempt_ids: set[str] = set()
+    deleted_attempts = attempt_storage.tombstones.load()
+    for attempt_file in attempt_storage.data_files():
+        with attempt_file.open(encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                aid = row.get("id", "")
+                if aid in deleted_attempts:
+                    continue
+                pid = row.get("problem_id", "")
+                if aid:
+                    if aid in attempt_ids:
+                        duplicate_attempt_ids.add(aid)
+                    attempt_ids.add(aid)
+                if pid and pid not in problem_ids:
+                    result.orphaned_attempts.append((aid, pid))
+                if row.get("is_correct", "") not in ["True", "False", "true", "false", "1", "0"]:
+                    result.invalid_boolean_values.append(aid)
+    result.total_attempts = len(attempt_ids)
+    result.duplicate_attempt_ids = list(duplicate_attempt_ids)
+    result.orphan_count = len(result.orphaned_attempts)
+    return result
+
+
+def measure(
+    label: str, check: Callable[[], HealthCheckResult], repeat: int, prepare=None
+) -> tuple[float, int, HealthCheckResult]:
+    """所要時間(repeat回の最小値)とメモリ確保量のピークを計測して表示"""
+    elapsed = float("inf")
+    for _ in range(repeat):
+        if prepare is not None:
+            prepare()
+        gc.collect()
+        start = time.perf_counter()
+        result = check()
+        elapsed = min(elapsed, time.perf_counter() - start)
+
+    if prepare is not None:
+        prepare()
+    tracemalloc.start()
+    check()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"{label:<20} 試行 {result.total_attempts:>9}件 孤立 {result.orphan_count:>7}件 "
+        f"{elapsed:8.2f}秒 ピーク {peak / 1024 / 1024:8.1f}MiB"
+    )
+    return elapsed, peak, result
+
+
+def main() -> None:
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="ヘルスチェックのベンチマークを実行します")
+    parser.add_argument("--problems", type=int, default=200_000, help="問題数")
+    parser.add_argument("--attempts", type=int, default=500_000, help="試行数")
+    parser.add_argument("--appended", type=int, default=1_000, help="追記する試行数")
+    parser.add_argument("--orphan-rate", type=float, default=0.001, help="孤立試行の割合")
+    parser.add_argument("--repeat", type=int, default=3, help="計測の繰り返し回数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_dir = Path(temp_dir)
+        problem_ids = write_fixture(data_dir, args.problems, args.attempts, args.orphan_rate)
+        problem_storage = ProblemStorage(temp_dir)
+        attempt_storage = AttemptStorage(temp_dir)
+
+        def check() -> HealthCheckResult:
+            return run_health_check(problem_storage, attempt_storage)
+
+        def full_check() -> HealthCheckResult:
+            return run_health_check(problem_storage, attempt_storage, incremental=False)
+
+        legacy_time, legacy_peak, legacy = measure(
+            "全体(従来)", lambda: legacy_health_check(problem_storage, attempt_storage), args.repeat
+        )
+        full_time, full_peak, full = measure("全体", full_check, args.repeat)
+        if (legacy.total_attempts, legacy.orphan_count) != (full.total_attempts, full.orphan_count):
+            print("❌ 検査結果が一致しません")
+            sys.exit(1)
+        measure("変更なし", check, args.repeat)
+
+        # 採点時と同じく、書き込み遅延キューの経路で試行を末尾に追記する
+        rng = random.Random(1)
+
+        def append_attempts() -> None:
+            full_check()
+            attempt_storage._append_attempts(
+                [
+                    Attempt(problem_id=rng.choice(problem_ids), is_correct=True)
+                    for _ in range(args.appended)
+                ],
+                fsync=False,
+            )
+
+        measure("追記分のみ", check, args.repeat, prepare=append_attempts)
+
+    print(
+        f"全体の検査: 時間 {full_time / legacy_time:.0%} / メモリ {full_peak / legacy_peak:.0%}"
+        "(従来方式比)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+孤立試行検出ベンチマーク
+従来の問題IDの集合による判定と、ハッシュの整列済み配列による判定の所要時間・メモリ確保量を比較する
+"""
+
+import argparse
+import csv
+import gc
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.modules.health_check import ORPHAN_BATCH_SIZE, ProblemIdSet, find_orphans  # noqa: E402
+from src.modules.storage import ATTEMPT_HEADER, PROBLEM_HEADER  # noqa: E402
+
+
+def write_fixture(data_dir: Path, problem_count: int, attempt_count: int, orphan_rate: float):
+    """ベンチマーク用の problems.csv と attempts.csv を作成"""
+    rng = random.Random(0)
+    with (data_dir / "problems.csv").open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(PROBLEM_HEADER)
+        for i in range(problem_count):
+            writer.writerow(
+                [f"problem-{i:08d}", "漢字の練習をする", "練習", "れんしゅう", "2025-01-01", 0]
+            )
+
+    with (data_dir / "attempts.csv").open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(ATTEMPT_HEADER)
+        for i in range(attempt_count):
+            if rng.random() < orphan_rate:
+                problem_id = f"deleted-{rng.randrange(problem_count):08d}"
+            else:
+                problem_id = f"problem-{rng.randrange(problem_count):08d}"
+            writer.writerow([f"attempt-{i:09d}", problem_id, "2025-01-01", True, "なし", ""])
+
+
+def read_problem_ids(data_dir: Path):
+    """problems.csv のIDを順に返す"""
+    with (data_dir / "problems.csv").open(encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield row["id"]
+
+
+def read_references(data_dir: Path):
+    """attempts.csv の (試行ID, 問題ID) を順に返す"""
+    with (data_dir / "attempts.csv").open(encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield row["id"], row["problem_id"]
+
+
+def legacy_find_orphans(data_dir: Path) -> list[tuple[str, str]]:
+    """従来方式: 問題IDをすべて文字列の集合に持って1件ずつ判定する"""
+    problem_ids = set(read_problem_ids(data_dir))
+    return [(aid, pid) for aid, pid in read_references(data_dir) if pid not in problem_ids]
+
+
+def sorted_find_orphans(data_dir: Path) -> list[tuple[str, str]]:
+    """新方式: 問題IDのハッシュの整列済み配列と、まとめて二分探索で照合する"""
+    problem_ids = ProblemIdSet.from_ids(read_problem_ids(data_dir))
+    orphans: list[tuple[str, str]] = []
+    pending: list[tuple[str, str]] = []
+    for reference in read_references(data_dir):
+        pending.append(reference)
+        if len(pending) >= ORPHAN_BATCH_SIZE:
+            orphans.extend(find_orphans(problem_ids, pending))
+            pending = []
+    orphans.extend(find_orphans(problem_ids, pending))
+    return orphans
+
+
+def measure(label: str, find: Callable[[], list], repeat: int) -> tuple[float, int, list]:
+    """所要時間(repeat回の最小値)とメモリ確保量のピークを計測して表示"""
+    elapsed = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        orphans = find()
+        elapsed = min(elapsed, time.perf_counter() - start)
+
+    tracemalloc.start()
+    find()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"{label:<16} 孤立 {len(orphans):>9}件 {elapsed:8.2f}秒 ピーク {peak / 1024 / 1024:8.1f}MiB"
+    )
+    return elapsed, peak, orphans
+
+
+def main() -> None:
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="孤立試行検出のベンチマークを実行します")
+    parser.add_argument("--problems", type=int, default=1_000_000, help="問題数")
+    parser.add_argument("--attempts", type=int, default=2_000_000, help="試行数")
+    parser.add_argument("--orphan-rate", type=float, default=0.001, help="孤立試行の割合")
+    parser.add_argument("--repeat", type=int, default=3, help="計測の繰り返し回数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_dir = Path(temp_dir)
+        write_fixture(data_dir, args.problems, args.attempts, args.orphan_rate)
+        legacy_time, legacy_peak, legacy = measure(
+            "集合(従来)", lambda: legacy_find_orphans(data_dir), args.repeat
+        )
+        fast_time, fast_peak, fast = measure(
+            "整列済み配列", lambda: sorted_find_orphans(data_dir), args.repeat
+        )
+
+    if legacy != fast:
+        print("❌ 検出結果が一致しません")
+        sys.exit(1)
+    print(f"時間 {fast_time / legacy_time:.0%} / メモリ {fast_peak / legacy_peak:.0%}(従来方式比)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+スナップショット更新ベンチマーク
+試行の追記後に、従来の全体の書き出しと、追記分だけを列に加える更新の所要時間・メモリ確保量を比較する
+"""
+
+import argparse
+import csv
+import gc
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.modules.models import Attempt  # noqa: E402
+from src.modules.snapshot import Snapshot, SnapshotExporter  # noqa: E402
+from src.modules.storage import (  # noqa: E402
+    ATTEMPT_HEADER,
+    PROBLEM_HEADER,
+    AttemptStorage,
+    ProblemStorage,
+)
+
+
+def write_fixture(data_dir: Path, problem_count: int, attempt_count: int) -> list[str]:
+    """ベンチマーク用の problems.csv と attempts.csv を作成し、問題IDを返す"""
+    rng = random.Random(0)
+    base = datetime.fromisoformat("2025-01-01T00:00:00")
+    problem_ids = [f"problem-{i:08d}" for i in range(problem_count)]
+
+    with (data_dir / "problems.csv").open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(PROBLEM_HEADER)
+        for i, problem_id in enumerate(problem_ids):
+            created_at = (base + timedelta(seconds=i)).isoformat()
+            writer.writerow(
+                [problem_id, "漢字の練習をする", "練習", "れんしゅう", created_at, i % 5]
+            )
+
+    # 読み込み時に当月分として扱われるよう、試行日時は当月1日から並べる
+    now = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    with (data_dir / "attempts.csv").open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(ATTEMPT_HEADER)
+        for i in range(attempt_count):
+            attempted_at = (now + timedelta(milliseconds=i)).isoformat()
+            is_correct = i % 3 == 0
+            writer.writerow(
+                [
+                    f"attempt-{i:09d}",
+                    rng.choice(problem_ids),
+                    attempted_at,
+                    is_correct,
+                    "なし" if is_correct else "読み間違い",
+                    "",
+                ]
+            )
+    return problem_ids
+
+
+def measure(
+    label: str, update: Callable[[], Snapshot | None], repeat: int
+) -> tuple[float, int, Snapshot]:
+    """所要時間(repeat回の最小値)とメモリ確保量のピークを計測して表示"""
+    elapsed = float("inf")
+    snapshot = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        snapshot = update()
+        elapsed = min(elapsed, time.perf_counter() - start)
+    if snapshot is None:
+        print(f"❌ {label}: スナップショットを更新できませんでした")
+        sys.exit(1)
+
+    tracemalloc.start()
+    update()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"{label:<20} {snapshot.attempt_count:>9}件 {elapsed:8.2f}秒 "
+        f"ピーク {peak / 1024 / 1024:8.1f}MiB"
+    )
+    return elapsed, peak, snapshot
+
+
+def check_same(extended: Snapshot, full: Snapshot) -> None:
+    """追記分を加えた結果が全体の書き出しと一致するか確かめる"""
+    if not (
+        extended.problem_ids == full.problem_ids
+        and extended.attempts_frame().equals(full.attempts_frame())
+        and extended.problems_frame().equals(full.problems_frame())
+    ):
+        print("❌ 更新結果が一致しません")
+        sys.exit(1)
+
+
+def main() -> None:
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="スナップショット更新のベンチマークを実行します")
+    parser.add_argument("--problems", type=int, default=100_000, help="問題数")
+    parser.add_argument("--attempts", type=int, default=1_000_000, help="試行数")
+    parser.add_argument("--appended", type=int, default=1_000, help="追記する試行数")
+    parser.add_argument("--repeat", type=int, default=3, help="計測の繰り返し回数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_dir = Path(temp_dir)
+        problem_ids = write_fixture(data_dir, args.problems, args.attempts)
+        problem_storage = ProblemStorage(temp_dir)
+        attempt_storage = AttemptStorage(temp_dir)
+        exporter = SnapshotExporter(temp_dir)
+        base = exporter.export(problem_storage, attempt_storage)
+
+        # 採点時と同じく、書き込み遅延キューの経路で試行を末尾に追記する
+        rng = random.Random(1)
+        attempt_storage._append_attempts(
+            [
+                Attempt(problem_id=rng.choice(problem_ids), is_correct=i % 2 == 0)
+                for i in range(args.appended)
+            ],
+            fsync=False,
+        )
+
+        full_time, full_peak, full = measure(
+            "全体の書き出し(従来)",
+            lambda: exporter.export(problem_storage, attempt_storage),
+            args.repeat,
+        )
+        extend_time, extend_peak, extended = measure(
+            "追記分の追加(試行のみ)",
+            lambda: exporter.extend(base, problem_storage, attempt_storage),
+            args.repeat,
+        )
+        check_same(extended, full)
+
+        # 採点と同じく、試行の追記に加えて問題の不正解数も更新された場合
+        for problem_id in problem_ids[:10]:
+            problem_storage.increment_incorrect_count(problem_id)
+        scored_time, scored_peak, scored = measure(
+            "追記分の追加(採点後)",
+            lambda: exporter.extend(base, problem_storage, attempt_storage),
+            args.repeat,
+        )
+        check_same(scored, exporter.export(problem_storage, attempt_storage))
+
+    print(f"時間 {extend_time / full_time:.0%} / メモリ {extend_peak / full_peak:.0%}(従来方式比)")
+    print(
+        f"採点後: 時間 {scored_time / full_time:.0%} / メモリ {scored_peak / full_peak:.0%}"
+        "(従来方式比)"
+    )
+
+
+if __name__ == "__main__":
+    main()
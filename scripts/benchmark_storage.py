@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+ストレージ読み込みベンチマーク
+従来の DictReader による読み込みと、位置指定の高速読み込みの所要時間・メモリ確保量を比較する
+"""
+
+import argparse
+import csv
+import gc
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.modules.models import Attempt, Problem  # noqa: E402
+from src.modules.storage import (  # noqa: E402
+    ATTEMPT_HEADER,
+    PROBLEM_HEADER,
+    AttemptStorage,
+    ProblemStorage,
+)
+
+
+def write_fixture(data_dir: Path, problem_count: int, attempt_count: int) -> None:
+    """ベンチマーク用の problems.csv と attempts.csv を作成"""
+    rng = random.Random(0)
+    base = datetime.fromisoformat("2025-01-01T00:00:00")
+    problem_ids = [f"problem-{i:08d}" for i in range(problem_count)]
+
+    with (data_dir / "problems.csv").open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(PROBLEM_HEADER)
+        for i, problem_id in enumerate(problem_ids):
+            created_at = (base + timedelta(seconds=i)).isoformat()
+            writer.writerow(
+                [problem_id, "漢字の練習をする", "練習", "れんしゅう", created_at, i % 5]
+            )
+
+    # 読み込み時に当月分として扱われるよう、試行日時は当月1日から並べる
+    now = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    with (data_dir / "attempts.csv").open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(ATTEMPT_HEADER)
+        for i in range(attempt_count):
+            attempted_at = (now + timedelta(milliseconds=i)).isoformat()
+            is_correct = i % 3 == 0
+            writer.writerow(
+                [
+                    f"attempt-{i:09d}",
+                    rng.choice(problem_ids),
+                    attempted_at,
+                    is_correct,
+                    "なし" if is_correct else "読み間違い",
+                    "",
+                ]
+            )
+
+
+def legacy_load_problems(path: Path) -> list[Problem]:
+    """従来方式: DictReader で読み込み、重複解消時に日時を2回解析する"""
+    with path.open(encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    id_to_rows: dict[str, dict] = {}
+    for row in rows:
+        row_id = row.get("id", "")
+        if not row_id:
+            continue
+        if row_id in id_to_rows:
+            existing = datetime.fromisoformat(id_to_rows[row_id]["created_at"])
+            if datetime.fromisoformat(row["created_at"]) > existing:
+                id_to_rows[row_id] = row
+        else:
+            id_to_rows[row_id] = row
+    problems = [Problem.from_dict(row) for row in id_to_rows.values()]
+    problems.sort(key=lambda p: p.created_at)
+    return problems
+
+
+def legacy_load_attempts(path: Path) -> list[Attempt]:
+    """従来方式: DictReader で読み込み、行ごとに辞書を作成する"""
+    with path.open(encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    id_to_row = {row["id"]: row for row in rows if row.get("id")}
+    return [Attempt.from_dict(row) for row in id_to_row.values()]
+
+
+def measure(label: str, load: Callable[[], list], repeat: int) -> tuple[float, int]:
+    """所要時間(repeat回の最小値)とメモリ確保量のピークを計測して表示"""
+    elapsed = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        count = len(load())
+        elapsed = min(elapsed, time.perf_counter() - start)
+
+    tracemalloc.start()
+    load()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{label:<24} {count:>9}件 {elapsed:8.2f}秒 ピーク {peak / 1024 / 1024:8.1f}MiB")
+    return elapsed, peak
+
+
+def main() -> None:
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="ストレージ読み込みのベンチマークを実行します")
+    parser.add_argument("--problems", type=int, default=100_000, help="問題数")
+    parser.add_argument("--attempts", type=int, default=1_000_000, help="試行数")
+    parser.add_argument("--repeat", type=int, default=3, help="計測の繰り返し回数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_dir = Path(temp_dir)
+        write_fixture(data_dir, args.problems, args.attempts)
+        problem_storage = ProblemStorage(temp_dir)
+        attempt_storage = AttemptStorage(temp_dir)
+
+        results = [
+            (
+                "問題",
+                measure(
+                    "問題(従来)",
+                    lambda: legacy_load_problems(problem_storage.file_path),
+                    args.repeat,
+                ),
+                measure("問題(位置指定)", problem_storage.load_problems, args.repeat),
+            ),
+            (
+                "試行",
+                measure(
+                    "試行(従来)",
+                    lambda: legacy_load_attempts(attempt_storage.file_path),
+                    args.repeat,
+                ),
+                measure("試行(位置指定)", attempt_storage.load_attempts, args.repeat),
+            ),
+        ]
+
+    for label, (legacy_time, legacy_peak), (fast_time, fast_peak) in results:
+        print(
+            f"{label}: 時間 {fast_time / legacy_time:.0%} / メモリ {fast_peak / legacy_peak:.0%}"
+            "(従来方式比)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+試行ログ集約スクリプト
+削除記録をデータファイルに反映し、保持期間を過ぎた試行セグメントを日別集計に畳み込み、
+生データを圧縮アーカイブに移す
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.modules.compaction import AttemptCompactor  # noqa: E402
+from src.modules.storage import AttemptStorage, ProblemStorage  # noqa: E402
+
+
+def main() -> None:
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="古い試行を集約・アーカイブします")
+    parser.add_argument("--data-dir", default=str(ROOT_DIR / "data"), help="データディレクトリ")
+    parser.add_argument("--retention-days", type=int, default=180, help="生データの保持日数")
+    args = parser.parse_args()
+
+    if ProblemStorage(args.data_dir).fold_tombstones():
+        print("問題の削除記録を反映しました")
+
+    compactor = AttemptCompactor(AttemptStorage(args.data_dir), args.retention_days)
+    compacted = compactor.compact()
+    print(f"アーカイブしたセグメント数: {compacted}")
+
+
+if __name__ == "__main__":
+    main()
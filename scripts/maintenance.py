@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+データメンテナンススクリプト
+問題・試行の重複解消、incorrect_count の合算、孤立試行の削除、整合性の検証を行う
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.modules.maintenance import DataMaintenance, MaintenanceResult  # noqa: E402
+
+
+def report_progress(label: str, count: int) -> None:
+    """読み込んだ行数を表示"""
+    print(f"  {label}: {count}行", file=sys.stderr, flush=True)
+
+
+def print_result(label: str, result: MaintenanceResult, dry_run: bool) -> None:
+    """結果を表示"""
+    verb = "削除予定" if dry_run else "削除"
+    print(f"{label}: {result.scanned}行を確認、{result.removed}行を{verb}")
+    if result.merged:
+        print(f"  incorrect_count を合算した問題: {result.merged}件")
+    if result.rewritten:
+        state = "書き換え予定" if dry_run else "書き換え"
+        print(f"  {state}: {', '.join(result.rewritten)}")
+
+
+def main() -> None:
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="問題・試行データのメンテナンスを行います")
+    parser.add_argument("--data-dir", default=str(ROOT_DIR / "data"), help="データディレクトリ")
+    parser.add_argument(
+        "--dry-run", action="store_true", help="変更内容を表示するだけでファイルを書き換えない"
+    )
+    parser.add_argument("--quiet", action="store_true", help="進捗を表示しない")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser(
+        "dedupe", help="問題(created_at が最新の行)と試行(最後の行)の重複IDを解消"
+    )
+    subparsers.add_parser("merge-counts", help="問題の重複IDを解消し incorrect_count を合算")
+    subparsers.add_parser("drop-orphans", help="存在しない問題を参照する試行を削除")
+    subparsers.add_parser("verify", help="重複ID・孤立試行・不正な真偽値を検査")
+    args = parser.parse_args()
+
+    # 検査だけのコマンドはデータを変更しないよう、常に読み取り専用で開く
+    maintenance = DataMaintenance(
+        args.data_dir,
+        dry_run=args.dry_run or args.command == "verify",
+        progress=None if args.quiet else report_progress,
+    )
+
+    if args.command == "dedupe":
+        print_result("問題", maintenance.dedupe_problems(), args.dry_run)
+        print_result("試行", maintenance.dedupe_attempts(), args.dry_run)
+    elif args.command == "merge-counts":
+        print_result("問題", maintenance.dedupe_problems(merge_counts=True), args.dry_run)
+    elif args.command == "drop-orphans":
+        print_result("試行", maintenance.drop_orphans(), args.dry_run)
+    else:
+        result = maintenance.verify()
+        print(result.get_summary())
+        print(f"問題数: {result.total_problems}件, 試行数: {result.total_attempts}件")
+        if result.has_issues:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
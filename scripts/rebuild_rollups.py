@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+日別集計の再構築スクリプト
+既存の試行ログ(セグメント・圧縮アーカイブを含む)から日別・問題別の集計を作り直す
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.modules.storage import AttemptStorage  # noqa: E402
+
+
+def main() -> None:
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="試行の日別集計を作り直します")
+    parser.add_argument("--data-dir", default=str(ROOT_DIR / "data"), help="データディレクトリ")
+    args = parser.parse_args()
+
+    storage = AttemptStorage(args.data_dir)
+    if not storage.rebuild_rollups():
+        sys.exit(1)
+    daily = storage.rollups.load_daily()
+    print(f"日別集計を再構築しました: {len(daily)}日, 試行{sum(r.total_count for r in daily)}件")
+
+
+if __name__ == "__main__":
+    main()
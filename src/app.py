@@ -3,16 +3,18 @@ Streamlitエントリーポイント
 メインアプリケーションの起動とページ構成の管理
 """
 
-import random
-
 import streamlit as st
 
-from src.modules.backup import BackupManager
+from src.modules.backup import start_backup_scheduler
 from src.modules.error_handler import ErrorHandler, error_handler
-from src.modules.health_check import run_health_check
+from src.modules.health_check import start_health_check
+from src.modules.kanji_grades import GRADES, text_grade
+from src.modules.kanji_index import KanjiIndex
 from src.modules.logger import app_logger
 from src.modules.models import Attempt, Problem
+from src.modules.query import ProblemQuery, ProblemQueryEngine
 from src.modules.rendering import TextRenderer
+from src.modules.statistics import StatisticsManager
 from src.modules.storage import AttemptStorage, ProblemStorage
 from src.modules.validators import InputValidator
 
@@ -25,6 +27,16 @@ st.set_page_config(
 )
 
 
+@st.cache_resource
+def shared_attempt_storage(data_dir: str = "data") -> AttemptStorage:
+    """
+    書き込み遅延キュー付きの AttemptStorage をプロセスで1つだけ作成して共有
+
+    セッションごとに作ると書き込みスレッドが増え、同じファイルへの追記が競合するため
+    """
+    return AttemptStorage(data_dir, write_behind=True)
+
+
 @error_handler("アプリケーション初期化中")
 def main():
     """メインアプリケーション"""
@@ -41,25 +53,18 @@ def main():
                 # セッション状態の初期化
                 st.session_state.problems = []
                 st.session_state.problem_storage = ProblemStorage()
-                st.session_state.attempt_storage = AttemptStorage()
+                # 採点時の試行保存はプロセス共有の書き込みキューでまとめて追記する
+                st.session_state.attempt_storage = shared_attempt_storage()
                 st.session_state.printed_problems = []
                 st.session_state.scoring_results = {}
 
-                # ヘルスチェックの実行
-                health_result = run_health_check(
+                # ヘルスチェックはバックグラウンドで実行し、結果は履歴管理ページで表示する
+                start_health_check(
                     st.session_state.problem_storage, st.session_state.attempt_storage
                 )
 
-                # 問題がある場合はダイアログ表示
-                if health_result.has_issues:
-                    st.warning(health_result.get_summary())
-                    st.info(
-                        "💡 データクリーニングスクリプトの実行を推奨します: `python scripts/clean_data.py`"
-                    )
-
                 # 初期化完了フラグを設定
                 st.session_state.initialized = True
-                st.session_state.health_check_result = health_result
                 app_logger.info("アプリケーション初期化完了")
             except Exception as e:
                 st.error(f"初期化エラー: {e}")
@@ -78,18 +83,13 @@ def main():
     st.title("📝 Kanji Test Generator")
     st.markdown("小学生向け漢字テスト自動作成アプリケーション")
 
-    # バックアップ機能の初期化（初期化完了後に実行）
-    if st.session_state.get("initialized", False) and "backup_created" not in st.session_state:
+    # バックアップはプロセス共通のバックグラウンドスレッドで行う（ページ表示を待たせない）
+    if "backup_scheduler_started" not in st.session_state:
         try:
-            with st.spinner("データをバックアップしています..."):
-                backup_manager = BackupManager()
-                backup_manager.create_backup()
-                backup_manager.cleanup_old_backups()
-            st.session_state.backup_created = True
-            app_logger.info("データファイルのバックアップを作成しました")
+            start_backup_scheduler()
         except Exception as e:
-            app_logger.error(f"バックアップ作成に失敗しました: {e}")
-            st.session_state.backup_created = True  # エラーでも次回はスキップ
+            app_logger.error(f"バックアップスケジューラーの開始に失敗しました: {e}")
+        st.session_state.backup_scheduler_started = True
 
     # サイドバーでページ選択（常時表示）
     st.sidebar.title("📝 メニュー")
@@ -119,6 +119,11 @@ def main():
             st.session_state.current_page = "履歴管理"
             st.rerun()
 
+    if st.sidebar.button("📈 統計", use_container_width=True):
+        if st.session_state.current_page != "統計":
+            st.session_state.current_page = "統計"
+            st.rerun()
+
     page = st.session_state.current_page
 
     # ページに応じた表示
@@ -130,6 +135,8 @@ def main():
         show_scoring_page()
     elif page == "履歴管理":
         show_history_page()
+    elif page == "統計":
+        show_statistics_page()
 
 
 def show_problem_creation_page():
@@ -170,6 +177,14 @@ def show_problem_creation_page():
             for error in validation_result.errors:
                 st.error(f"  - {error}")
 
+        # 配当学年のチェック（小学校の範囲外でも保存は可能）
+        grade_result = validator.validate_grade(problem_data["answer_kanji"], max(GRADES))
+        if not grade_result.is_valid:
+            for error in grade_result.errors:
+                st.warning(f"⚠️ {error}")
+        elif grade := text_grade(problem_data["answer_kanji"]):
+            st.info(f"📚 回答漢字は{grade}年生までに習う漢字です")
+
         # 重複チェック
         is_duplicate, duplicate_message = check_duplicate_problem(
             problem_data["sentence"], problem_data["answer_kanji"], problem_data["reading"]
@@ -305,13 +320,81 @@ def check_duplicate_problem(sentence: str, answer_kanji: str, reading: str) -> t
         return False, ""
 
 
+# 問題の自動抽出方法（ボタン, 主ボタンかどうか, 抽出条件, 成功時のメッセージ, 該当なしのメッセージ）
+# 学年と件数は印刷設定から実行時に追加する
+EXTRACTION_MODES = [
+    (
+        "🎯 苦手上位",
+        True,
+        ProblemQuery().order_by("incorrect_count", descending=True),
+        "苦手上位を{count}問抽出しました",
+        "苦手な問題が見つかりませんでした。",
+    ),
+    (
+        "🎲 苦手ランダム",
+        False,
+        ProblemQuery().incorrect_between(minimum=1).order_by("random"),
+        "苦手ランダムで{count}問抽出しました",
+        "苦手な問題が見つかりませんでした。",
+    ),
+    (
+        "📅 最新",
+        False,
+        ProblemQuery().order_by("created_at", descending=True),
+        "最新を{count}問抽出しました",
+        "問題が見つかりませんでした。",
+    ),
+    (
+        "🎲 ランダム",
+        False,
+        ProblemQuery().order_by("random"),
+        "ランダムに{count}問抽出しました",
+        "問題が見つかりませんでした。",
+    ),
+]
+
+
+def get_query_engine() -> ProblemQueryEngine:
+    """問題の検索エンジンを取得(問題データが更新されるまで索引を再利用)"""
+    storage = st.session_state.problem_storage
+    generation = storage.generation
+    cached = st.session_state.get("query_engine")
+    if cached is None or cached[0] != generation:
+        cached = (generation, ProblemQueryEngine(storage.load_problems()))
+        st.session_state.query_engine = cached
+    engine: ProblemQueryEngine = cached[1]
+    return engine
+
+
+def extract_problems(query: ProblemQuery, label: str, success: str, not_found: str) -> None:
+    """条件に一致する問題を抽出してセッション状態に保存"""
+    try:
+        engine = get_query_engine()
+
+        if not engine.problems:
+            st.warning("保存された問題がありません。問題登録ページで問題を作成してください。")
+            return
+
+        problems_to_print = engine.execute(query)
+
+        if not problems_to_print:
+            st.warning(not_found)
+            return
+
+        st.session_state.extracted_problems = problems_to_print
+        st.success(f"✅ {success.format(count=len(problems_to_print))}")
+
+    except Exception as e:
+        st.error(f"❌ {label}抽出に失敗しました: {e}")
+
+
 def show_print_page():
     """問題用紙作成ページ"""
     st.header("🖨️ 問題用紙作成")
 
     # 印刷設定（問題抽出前から表示）
     st.subheader("⚙️ 印刷設定")
-    col_set1, col_set2 = st.columns(2)
+    col_set1, col_set2, col_set3 = st.columns(3)
     with col_set1:
         total_questions = st.number_input(
             "総問題数", min_value=1, max_value=100, value=10, help="印刷する問題の総数を設定します"
@@ -320,128 +403,88 @@ def show_print_page():
         title = st.text_input(
             "テストタイトル", value="漢字テスト", help="印刷用ページのタイトルを設定します"
         )
+    with col_set3:
+        max_grade = st.selectbox(
+            "対象学年",
+            [None, *GRADES],
+            format_func=lambda grade: "すべて" if grade is None else f"{grade}年生まで",
+            help="回答漢字がすべてこの学年までに習う漢字の問題から抽出します",
+        )
 
     # 自動抽出機能のボタン
     st.subheader("📝 問題の自動抽出")
 
-    col1, col2 = st.columns(2)
-    col3, col4 = st.columns(2)
-
-    with col1:
-        if st.button("🎯 苦手上位", type="primary", use_container_width=True):
-            try:
-                # 苦手上位抽出ロジック
-                saved_problems = st.session_state.problem_storage.load_problems()
-
-                if not saved_problems:
-                    st.warning(
-                        "保存された問題がありません。問題登録ページで問題を作成してください。"
-                    )
-                    return
-
-                # 問題の不正解数でソートして上位を抽出
-                problems_with_incorrect_count = [(p, p.incorrect_count) for p in saved_problems]
-                sorted_problems = sorted(
-                    problems_with_incorrect_count, key=lambda x: x[1], reverse=True
+    columns = st.columns(2) + st.columns(2)
+    for column, (button, primary, query, success, not_found) in zip(
+        columns, EXTRACTION_MODES, strict=True
+    ):
+        with column:
+            if st.button(
+                button, type="primary" if primary else "secondary", use_container_width=True
+            ):
+                extract_problems(
+                    query.within_grade(max_grade).limit(int(total_questions)),
+                    button.split(" ", 1)[1],
+                    success,
+                    not_found,
                 )
-                problems_to_print = [p for p, _ in sorted_problems[: int(total_questions)]]
 
-                if problems_to_print:
-                    st.session_state.extracted_problems = problems_to_print
-                    st.success(f"✅ 苦手上位を{len(problems_to_print)}問抽出しました")
-                else:
-                    st.warning("苦手な問題が見つかりませんでした。")
-                    return
+    col5, col6 = st.columns(2)
 
-            except Exception as e:
-                st.error(f"❌ 苦手上位抽出に失敗しました: {e}")
-                return
-
-    with col2:
-        if st.button("🎲 苦手ランダム", type="secondary", use_container_width=True):
+    with col5:
+        if st.button("🈯 苦手漢字", type="secondary", use_container_width=True):
             try:
-                # 苦手ランダム抽出ロジック
-                saved_problems = st.session_state.problem_storage.load_problems()
+                # 苦手漢字抽出ロジック
+                engine = get_query_engine()
+                kanji_index = KanjiIndex.from_storage(
+                    st.session_state.problem_storage,
+                    st.session_state.attempt_storage,
+                    problems=engine.execute(ProblemQuery().within_grade(max_grade)),
+                )
 
-                if not saved_problems:
+                if not kanji_index.problems:
                     st.warning(
                         "保存された問題がありません。問題登録ページで問題を作成してください。"
                     )
                     return
 
-                # incorrect_count >= 1 の問題をフィルタリング
-                weak_problems = [p for p in saved_problems if p.incorrect_count >= 1]
+                # 正答率の低い漢字を含む問題を順に抽出
+                problems_to_print = kanji_index.problems_for_weakest(int(total_questions))
 
-                if not weak_problems:
-                    st.warning("苦手な問題が見つかりませんでした。")
+                if not problems_to_print:
+                    st.warning("苦手な漢字が見つかりませんでした。")
                     return
 
-                # ランダムに抽出（重複なし）
-                qpp = int(total_questions)
-                if len(weak_problems) >= qpp:
-                    problems_to_print = random.sample(weak_problems, qpp)
-                else:
-                    problems_to_print = weak_problems
-
+                weakest = "、".join(s.kanji for s in kanji_index.weakest(5))
                 st.session_state.extracted_problems = problems_to_print
-                st.success(f"✅ 苦手ランダムで{len(problems_to_print)}問抽出しました")
+                st.success(f"✅ 苦手漢字（{weakest} など）で{len(problems_to_print)}問抽出しました")
 
             except Exception as e:
-                st.error(f"❌ 苦手ランダム抽出に失敗しました: {e}")
+                st.error(f"❌ 苦手漢字抽出に失敗しました: {e}")
                 return
 
-    with col3:
-        if st.button("📅 最新", type="secondary", use_container_width=True):
-            try:
-                # 最新抽出ロジック
-                saved_problems = st.session_state.problem_storage.load_problems()
-
-                if not saved_problems:
-                    st.warning(
-                        "保存された問題がありません。問題登録ページで問題を作成してください。"
-                    )
-                    return
-
-                # created_atでソート（新しい順）
-                sorted_problems = sorted(saved_problems, key=lambda x: x.created_at, reverse=True)
-                problems_to_print = sorted_problems[: int(total_questions)]
-
-                if problems_to_print:
-                    st.session_state.extracted_problems = problems_to_print
-                    st.success(f"✅ 最新を{len(problems_to_print)}問抽出しました")
-                else:
-                    st.warning("問題が見つかりませんでした。")
-                    return
-
-            except Exception as e:
-                st.error(f"❌ 最新抽出に失敗しました: {e}")
-                return
-
-    with col4:
-        if st.button("🎲 ランダム", type="secondary", use_container_width=True):
-            try:
-                # ランダム抽出ロジック
-                saved_problems = st.session_state.problem_storage.load_problems()
-
-                if not saved_problems:
-                    st.warning(
-                        "保存された問題がありません。問題登録ページで問題を作成してください。"
-                    )
-                    return
-
-                # ランダムに抽出（重複なし）
-                qpp = int(total_questions)
-                if len(saved_problems) >= qpp:
-                    problems_to_print = random.sample(saved_problems, qpp)
-                else:
-                    problems_to_print = saved_problems
-
-                st.session_state.extracted_problems = problems_to_print
-                st.success(f"✅ ランダムに{len(problems_to_print)}問抽出しました")
-
-            except Exception as e:
-                st.error(f"❌ ランダム抽出に失敗しました: {e}")
-                return
+    with col6:
+        search_kanji = st.text_input(
+            "漢字で検索",
+            max_chars=1,
+            placeholder="例: 創",
+            label_visibility="collapsed",
+            help="指定した漢字を含む問題を抽出します",
+        )
+        if st.button("🔍 漢字を含む問題", type="secondary", use_container_width=True):
+            if search_kanji:
+                extract_problems(
+                    ProblemQuery()
+                    .containing(search_kanji)
+                    .within_grade(max_grade)
+                    .order_by("random")
+                    .limit(int(total_questions)),
+                    "漢字検索",
+                    f"「{search_kanji}」を含む問題を{{count}}問抽出しました",
+                    f"「{search_kanji}」を含む問題が見つかりませんでした。",
+                )
+            else:
+                st.warning("検索する漢字を入力してください。")
 
     # 設定は上部に移動済み
 
@@ -514,7 +557,7 @@ def show_scoring_page():
         # 採点フォーム
         with st.form("printed_problems_scoring_form"):
             st.subheader("✏️ 採点")
-            scores = {}
+            scores: dict[str, dict] = {}
 
             for i, problem in enumerate(st.session_state.extracted_problems):
                 st.write(f"**問題 {i + 1}**: {problem.sentence}")
@@ -556,26 +599,23 @@ def show_scoring_page():
 
             if submitted:
                 try:
-                    # 試行データを保存し、問題の不正解数を更新
+                    # 試行データを書き込みキューに追加し、不正解数の増減を集める
                     saved_count = 0
+                    deltas = {}
                     for problem_id, score_data in scores.items():
                         attempt = Attempt(
-                            problem_id=problem_id, is_correct=score_data["is_correct"]
+                            problem_id=problem_id,
+                            is_correct=score_data["is_correct"],
+                            mistake_type=score_data["mistake_type"] or "なし",
+                            learning_memo=score_data["notes"] or "",
                         )
-                        if st.session_state.attempt_storage.save_attempt(attempt):
+                        if st.session_state.attempt_storage.enqueue_attempt(attempt):
                             saved_count += 1
+                            deltas[problem_id] = -1 if score_data["is_correct"] else 1
 
-                            # 問題の不正解数を更新
-                            saved_problems = st.session_state.problem_storage.load_problems()
-                            for problem in saved_problems:
-                                if problem.id == problem_id:
-                                    if score_data["is_correct"]:
-                                        problem.decrement_incorrect_count()
-                                    else:
-                                        problem.increment_incorrect_count()
-                                    # 更新された問題を保存
-                                    st.session_state.problem_storage.update_problem(problem)
-                                    break
+                    # 問題の不正解数は1回の書き込みでまとめて更新
+                    # （他セッションとの同時採点でも増減を失わない）
+                    st.session_state.problem_storage.adjust_incorrect_counts(deltas)
 
                     if saved_count > 0:
                         st.success(f"✅ {saved_count}問の採点結果を保存しました！")
@@ -626,39 +666,61 @@ def show_history_page():
     """履歴管理ページ"""
     st.header("📚 履歴管理")
 
+    # ヘルスチェックの結果（バックグラウンドで実行し、完了していれば表示）
+    health_runner = start_health_check(
+        st.session_state.problem_storage, st.session_state.attempt_storage
+    )
+    health_result = health_runner.result if health_runner.is_current else None
+    if health_result is None:
+        st.info("🔍 データのヘルスチェックを実行中です。完了後に再表示すると結果が表示されます。")
+    elif health_result.has_issues:
+        st.warning(health_result.get_summary())
+        st.info(
+            "💡 データメンテナンスの実行を推奨します: "
+            "`python scripts/maintenance.py dedupe` / `python scripts/maintenance.py drop-orphans`"
+        )
+
     # 孤立試行データの表示
-    if hasattr(st.session_state, "health_check_result"):
-        health_result = st.session_state.health_check_result
-        if health_result.orphaned_attempts:
-            with st.expander(f"⚠️ 孤立試行データ ({len(health_result.orphaned_attempts)}件)"):
-                st.warning("以下の試行データは対応する問題が存在しません")
-                for attempt_id, problem_id in health_result.orphaned_attempts:
-                    col1, col2 = st.columns([3, 1])
-                    with col1:
-                        st.text(f"試行ID: {attempt_id}, 問題ID: {problem_id}")
-                    with col2:
-                        if st.button("削除", key=f"delete_orphan_{attempt_id}"):
-                            try:
-                                # 孤立データの削除処理
-                                if st.session_state.attempt_storage.delete_attempt(attempt_id):
-                                    st.success(f"試行ID {attempt_id} を削除しました。")
-
-                                    # ヘルスチェックを再実行してセッション状態を更新
-                                    health_result = run_health_check(
-                                        st.session_state.problem_storage,
-                                        st.session_state.attempt_storage,
-                                    )
-                                    st.session_state.health_check_result = health_result
-
-                                    # 画面を再描画
-                                    st.rerun()
-                                else:
-                                    st.error(f"試行ID {attempt_id} の削除に失敗しました。")
-                            except Exception as e:
-                                app_logger.exception(
-                                    f"孤立データの削除中にエラーが発生しました: {e}"
-                                )
-                                st.error(f"削除中にエラーが発生しました: {e}")
+    if health_result is not None and health_result.orphaned_attempts:
+        with st.expander(f"⚠️ 孤立試行データ ({health_result.orphan_count}件)"):
+            st.warning("以下の試行データは対応する問題が存在しません")
+            if health_result.orphan_count > len(health_result.orphaned_attempts):
+                st.caption(
+                    f"先頭の {len(health_result.orphaned_attempts)}件 を表示しています。"
+                    "すべて削除するには `python scripts/maintenance.py drop-orphans` を実行してください。"
+                )
+            if st.button("すべて削除", key="delete_all_orphans"):
+                try:
+                    orphan_ids = [aid for aid, _ in health_result.orphaned_attempts]
+                    deleted = st.session_state.attempt_storage.delete_attempts(orphan_ids)
+                    if deleted:
+                        st.success(f"孤立試行データを {deleted}件 削除しました。")
+
+                        # データの版が変わるため、再描画でヘルスチェックが再実行される
+                        st.rerun()
+                    else:
+                        st.error("孤立試行データの一括削除に失敗しました。")
+                except Exception as e:
+                    app_logger.exception(f"孤立データの一括削除中にエラーが発生しました: {e}")
+                    st.error(f"削除中にエラーが発生しました: {e}")
+            for attempt_id, problem_id in health_result.orphaned_attempts:
+                col1, col2 = st.columns([3, 1])
+                with col1:
+                    st.text(f"試行ID: {attempt_id}, 問題ID: {problem_id}")
+                with col2:
+                    if st.button("削除", key=f"delete_orphan_{attempt_id}"):
+                        try:
+                            # 孤立データの削除処理
+                            if st.session_state.attempt_storage.delete_attempt(attempt_id):
+                                st.success(f"試行ID {attempt_id} を削除しました。")
+
+                                # 画面を再描画（ヘルスチェックは新しい版で再実行される）
+                                st.rerun()
+                            else:
+                                st.error(f"試行ID {attempt_id} の削除に失敗しました。")
+                        except Exception as e:
+                            app_logger.exception(f"孤立データの削除中にエラーが発生しました: {e}")
+                            st.error(f"削除中にエラーが発生しました: {e}")
 
     # 保存された問題を読み込み
     try:
@@ -699,9 +761,9 @@ def show_history_page():
 
         # 問題の並び替え
         if sort_by == "作成日時（新しい順）":
-            filtered_problems.sort(key=lambda x: x.created_at, reverse=True)
+            filtered_problems.sort(key=lambda x: x.created_at_iso, reverse=True)
         elif sort_by == "作成日時（古い順）":
-            filtered_problems.sort(key=lambda x: x.created_at)
+            filtered_problems.sort(key=lambda x: x.created_at_iso)
         elif sort_by == "苦手（不正解数順）":
             filtered_problems.sort(key=lambda x: x.incorrect_count, reverse=True)
 
@@ -792,5 +854,73 @@ def show_history_page():
         st.error(f"❌ 履歴の読み込みに失敗しました: {e}")
 
 
+def show_statistics_page():
+    """統計ページ"""
+    st.header("📈 統計")
+
+    # 統計計算はデータが更新されるまで結果を再利用する
+    if "statistics_manager" not in st.session_state:
+        st.session_state.statistics_manager = StatisticsManager(
+            st.session_state.problem_storage, st.session_state.attempt_storage
+        )
+
+    try:
+        with st.spinner("統計を計算しています..."):
+            calculator = st.session_state.statistics_manager.get_calculator()
+    except Exception as e:
+        app_logger.exception(f"統計の計算に失敗しました: {e}")
+        st.error(f"統計の計算中にエラーが発生しました: {e}")
+        return
+
+    overall = calculator.overall
+    if overall.total_attempts == 0:
+        st.info("📝 採点結果がありません。採点ページで採点結果を保存してください。")
+        return
+
+    # 全体統計
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("総試行数", overall.total_attempts)
+    with col2:
+        st.metric("正答率", f"{overall.accuracy * 100:.1f}%")
+    with col3:
+        st.metric("出題した問題数", overall.attempted_problems)
+    with col4:
+        st.metric("学習日数", overall.study_days)
+
+    # 日別・週別の学習進捗
+    st.subheader("📅 学習進捗")
+    unit = st.radio("集計単位", ["日別", "週別"], horizontal=True, key="statistics_period")
+    progress = st.session_state.statistics_manager.progress(
+        "D" if unit == "日別" else "W"
+    ).set_index("period")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.caption("試行数")
+        st.bar_chart(progress["total_count"])
+    with col2:
+        st.caption("正答率")
+        st.line_chart(progress["accuracy"])
+
+    # 間違いの種類
+    mistakes = calculator.mistake_breakdown
+    if not mistakes.empty:
+        st.subheader("🔍 間違いの種類")
+        st.bar_chart(mistakes.set_index("mistake_type")["count"])
+
+    # 苦手な問題・漢字
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("📉 正答率の低い問題")
+        st.dataframe(
+            calculator.problem_accuracy.head(20).drop(columns=["problem_id"]),
+            hide_index=True,
+            use_container_width=True,
+        )
+    with col2:
+        st.subheader("🈯 漢字別の正答率")
+        st.dataframe(calculator.kanji_accuracy.head(20), hide_index=True, use_container_width=True)
+
+
 if __name__ == "__main__":
     main()
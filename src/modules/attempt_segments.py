@@ -0,0 +1,203 @@
+"""
+試行ログの月別セグメント管理
+"""
+
+import csv
+import gzip
+import json
+import os
+import re
+import shutil
+import tempfile
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from .offset_index import OffsetIndex
+
+SEGMENT_DIR_NAME = "attempt_segments"
+ARCHIVE_DIR_NAME = "attempt_archive"
+MANIFEST_NAME = "manifest.json"
+
+_VERSION_PATTERN = re.compile(r"\.v(\d+)\.csv$")
+
+
+def month_of(iso_timestamp: str) -> str:
+    """ISO形式の日時文字列から月キー(YYYY-MM)を取り出す"""
+    return iso_timestamp[:7]
+
+
+def next_version_name(file_name: str) -> str:
+    """セグメントの次の版のファイル名 (attempts_YYYYMM.csv -> attempts_YYYYMM.v2.csv)"""
+    match = _VERSION_PATTERN.search(file_name)
+    if match is None:
+        return file_name.removesuffix(".csv") + ".v2.csv"
+    return f"{file_name[: match.start()]}.v{int(match.group(1)) + 1}.csv"
+
+
+def open_segment(path: Path):
+    """セグメントをテキストとして開く(.gz のアーカイブは展開しながら読む)"""
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return path.open(encoding="utf-8", newline="")
+
+
+@dataclass
+class SegmentInfo:
+    """封印済みセグメントの情報"""
+
+    month: str
+    file: str
+    rows: int
+    min_attempted_at: str
+    max_attempted_at: str
+
+
+class AttemptSegmentStore:
+    """
+    封印済み(変更されない)月別セグメントとマニフェストの管理
+
+    当月分の試行は attempts.csv に追記し、月が替わった時点で前月以前の行を
+    `attempt_segments/attempts_YYYYMM.csv` に移す。マニフェストには各セグメントの
+    行数と attempted_at の最小値・最大値、および attempts.csv が対象とする月を記録する。
+    ロックは呼び出し側(AttemptStorage)が attempts.csv のロックで取得する。
+    """
+
+    def __init__(self, data_dir: Path, dir_name: str = SEGMENT_DIR_NAME):
+        """
+        Args:
+            data_dir: データディレクトリのパス
+            dir_name: セグメントを格納するサブディレクトリ名
+        """
+        self.segment_dir = Path(data_dir) / dir_name
+        self.manifest_path = self.segment_dir / MANIFEST_NAME
+
+    def load_manifest(self) -> tuple[str | None, list[SegmentInfo]]:
+        """マニフェストを読み込み (対象月, セグメント一覧) を返す"""
+        if not self.manifest_path.exists():
+            return None, []
+        with self.manifest_path.open(encoding="utf-8") as f:
+            manifest = json.load(f)
+        segments = [SegmentInfo(**entry) for entry in manifest.get("segments", [])]
+        return manifest.get("active_month"), segments
+
+    def save_manifest(self, active_month: str | None, segments: list[SegmentInfo]) -> None:
+        """マニフェストをアトミックに書き込む"""
+        self.segment_dir.mkdir(exist_ok=True)
+        manifest = {
+            "active_month": active_month,
+            "segments": [asdict(s) for s in sorted(segments, key=lambda s: s.month)],
+        }
+        with tempfile.NamedTemporaryFile(
+            mode="w", encoding="utf-8", delete=False, dir=self.segment_dir, suffix=".tmp"
+        ) as tmp_file:
+            json.dump(manifest, tmp_file, ensure_ascii=False, indent=2)
+            tmp_path = Path(tmp_file.name)
+        tmp_path.replace(self.manifest_path)
+
+    def segment_path(self, segment: SegmentInfo) -> Path:
+        """セグメントファイルのパスを取得"""
+        return self.segment_dir / segment.file
+
+    def segments_in_range(
+        self, start_month: str | None, end_month: str | None
+    ) -> list[SegmentInfo]:
+        """指定した月の範囲に含まれるセグメントを古い順に取得"""
+        _, segments = self.load_manifest()
+        return [
+            s
+            for s in segments
+            if (start_month is None or s.month >= start_month)
+            and (end_month is None or s.month <= end_month)
+        ]
+
+    def _write_atomic(
+        self, path: Path, header: list[str], rows: list[list[str]], base: Path | None = None
+    ) -> None:
+        """
+        一時ファイルに書き出してから置き換える
+
+        base を指定した場合はその内容を複製し、末尾に rows を追記する(header は書かない)。
+        """
+        with tempfile.NamedTemporaryFile(
+            mode="w",
+            encoding="utf-8",
+            newline="",
+            delete=False,
+            dir=self.segment_dir,
+            suffix=".tmp",
+        ) as tmp_file:
+            tmp_path = Path(tmp_file.name)
+            try:
+                if base is None:
+                    csv.writer(tmp_file).writerow(header)
+                else:
+                    with base.open(encoding="utf-8", newline="") as f:
+                        shutil.copyfileobj(f, tmp_file)
+                csv.writer(tmp_file).writerows(rows)
+                tmp_file.flush()
+                os.fsync(tmp_file.fileno())
+            except BaseException:
+                tmp_file.close()
+                tmp_path.unlink(missing_ok=True)
+                raise
+        tmp_path.replace(path)
+
+    def seal(
+        self,
+        header: list[str],
+        rows_by_month: dict[str, list[list[str]]],
+        active_month: str,
+    ) -> list[SegmentInfo]:
+        """
+        月ごとの行をセグメントとして書き出し、マニフェストを更新する
+
+        通常は新しい月のセグメントを作成するだけだが、過去日時の試行が後から追記された
+        場合は既存セグメントに追記した新しい版を作成する。封印済みのファイルは変更せず、
+        マニフェストを切り替えた後で古い版を削除する。
+        """
+        self.segment_dir.mkdir(exist_ok=True)
+        _, segments = self.load_manifest()
+        by_month = {s.month: s for s in segments}
+        at_idx = header.index("attempted_at")
+        superseded = []
+
+        for month, rows in sorted(rows_by_month.items()):
+            timestamps = [row[at_idx] for row in rows]
+            existing = by_month.get(month)
+            if existing is None:
+                file_name = f"attempts_{month.replace('-', '')}.csv"
+                self._write_atomic(self.segment_dir / file_name, header, rows)
+                by_month[month] = SegmentInfo(
+                    month=month,
+                    file=file_name,
+                    rows=len(rows),
+                    min_attempted_at=min(timestamps),
+                    max_attempted_at=max(timestamps),
+                )
+            else:
+                segment_path = self.segment_path(existing)
+                with segment_path.open(encoding="utf-8") as f:
+                    segment_header = next(csv.reader(f), header)
+                aligned = []
+                for row in rows:
+                    values = dict(zip(header, row, strict=False))
+                    aligned.append([values.get(column, "") for column in segment_header])
+                file_name = next_version_name(existing.file)
+                self._write_atomic(
+                    self.segment_dir / file_name, segment_header, aligned, base=segment_path
+                )
+                superseded.append(segment_path)
+                by_month[month] = SegmentInfo(
+                    month=month,
+                    file=file_name,
+                    rows=existing.rows + len(rows),
+                    min_attempted_at=min(existing.min_attempted_at, *timestamps),
+                    max_attempted_at=max(existing.max_attempted_at, *timestamps),
+                )
+
+        updated = list(by_month.values())
+        self.save_manifest(active_month, updated)
+        for path in superseded:
+            path.unlink(missing_ok=True)
+            OffsetIndex(path).remove()
+        return updated
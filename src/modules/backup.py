@@ -2,16 +2,134 @@
 データファイルの自動バックアップ機能
 """
 
+import atexit
+import errno
+import gzip
+import hashlib
+import json
 import logging
+import os
+import re
 import shutil
+import tempfile
+import threading
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from typing import IO
+
+from .attempt_segments import ARCHIVE_DIR_NAME, SEGMENT_DIR_NAME
+from .backup_catalog import CATALOG_FILE_NAME, BackupCatalog
+
+try:
+    import zstandard
+except ImportError:  # zstandard がない環境では gzip で圧縮する
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:  # Windows では reflink を使わず通常のコピーを行う
+    fcntl = None  # type: ignore[assignment]
 
 logger = logging.getLogger(__name__)
 
+OBJECT_DIR_NAME = "objects"
+MANIFEST_DIR_NAME = "manifests"
+CHUNK_SIZE = 1024 * 1024
+# 圧縮形式ごとのオブジェクトの拡張子("" は圧縮なし)
+OBJECT_SUFFIXES = ("", ".gz", ".zst")
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+# 差分を連ねる最大数。超えたら全体を保存し直す
+MAX_DELTA_CHAIN = 24
+# linux/fs.h の FICLONE (_IOW(0x94, 9, int))
+FICLONE = 0x40049409
+# reflink・copy_file_range に対応していないことを示すエラー
+_UNSUPPORTED_ERRNOS = {errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS}
+# 以前の形式のバックアップ名: <元のファイル名>_<YYYYmmdd>_<HHMMSS>.csv
+LEGACY_NAME_PATTERN = re.compile(r"^(?P<stem>.+)_\d{8}_\d{6}\.csv$")
+BACKUP_INTERVAL_ENV = "KANJI_BACKUP_INTERVAL"
+DEFAULT_BACKUP_INTERVAL = 3600.0
+
+
+def _local_iso(value: datetime) -> str:
+    """日時をマニフェストと同じローカル時刻のISO形式に変換(タイムゾーンなしはローカル時刻とみなす)"""
+    return value.astimezone().replace(tzinfo=None).isoformat(timespec="microseconds")
+
+
+def _reflink(src: IO[bytes], dst: IO[bytes]) -> bool:
+    """reflink(FICLONE)で src の内容を dst に共有させる(対応していなければ False)"""
+    cloned = False
+    if fcntl is not None:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            cloned = True
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED_ERRNOS:
+                raise
+    return cloned
+
+
+def _copy_file_range(src: IO[bytes], dst: IO[bytes], size: int) -> bool:
+    """copy_file_range でカーネル内でコピーする(対応していなければ False)"""
+    if not hasattr(os, "copy_file_range"):
+        return False
+    offset = 0
+    try:
+        while offset < size:
+            copied = os.copy_file_range(
+                src.fileno(), dst.fileno(), size - offset, offset_src=offset, offset_dst=offset
+            )
+            if copied == 0:
+                break
+            offset += copied
+    except OSError as e:
+        if e.errno in _UNSUPPORTED_ERRNOS and offset == 0:
+            return False
+        raise
+    return offset == size
+
+
+def _compressor(suffix: str, fileobj: IO[bytes]):
+    """拡張子に対応する圧縮ストリーム"""
+    if suffix == ".zst":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(fileobj, closefd=False)
+    return gzip.GzipFile(fileobj=fileobj, mode="wb", compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _decompressor(object_path: Path):
+    """オブジェクトを展開しながら読み込むストリーム"""
+    if object_path.suffix == ".zst":
+        if zstandard is None:
+            msg = f"zstandard is required to restore {object_path.name}"
+            raise RuntimeError(msg)
+        return zstandard.ZstdDecompressor().stream_reader(object_path.open("rb"), closefd=True)
+    if object_path.suffix == ".gz":
+        return gzip.open(object_path, "rb")
+    return object_path.open("rb")
+
 
 class BackupManager:
-    """データファイルの自動バックアップ管理"""
+    """
+    データファイルの自動バックアップ管理
+
+    ファイルの内容をSHA-256で識別し、`objects/<ハッシュの先頭2文字>/<ハッシュ>.zst`
+    (zstandard がなければ `.gz`)に圧縮して同じ内容を1回だけ保存する。
+    バックアップごとに `manifests/<バックアップID>.json` へ各ファイルのハッシュ・サイズ・
+    更新時刻を記録し、前回のマニフェストとサイズ・更新時刻が同じファイルは読み込まずに
+    前回の記録を引き継ぐ。前回から変更されたファイルがなければマニフェストも作成しない。
+    マニフェストとオブジェクトは目録(BackupCatalog)にも登録し、一覧・削除・復元は
+    ディレクトリを走査せずに目録から引く。
+
+    前回の内容の末尾に追記されただけのファイル(試行履歴など)は、追記された部分だけを
+    差分オブジェクトとして保存し、マニフェストには連結するオブジェクトの列(chain)を記録する。
+    差分が MAX_DELTA_CHAIN 個を超えたら全体を保存し直す。
+
+    変更されないファイルは圧縮せずに複製を避けて保存する。圧縮アーカイブ
+    (attempt_archive/*.gz)と封印済みセグメント(attempt_segments/*.csv)は、
+    どちらも一時ファイルへの置き換えでしか書かれず(後から追記された過去日時の試行は
+    新しい版のセグメントになる)元の場所は書き換えられないため、reflink・ハードリンク・
+    copy_file_range の順に試す。
+    """
 
     def __init__(self, data_dir: str = "data", backup_dir: str = "backups", keep_days: int = 30):
         """
@@ -25,15 +143,52 @@ class BackupManager:
         self.data_dir = Path(data_dir)
         self.backup_dir = Path(backup_dir)
         self.keep_days = keep_days
+        self.object_dir = self.backup_dir / OBJECT_DIR_NAME
+        self.manifest_dir = self.backup_dir / MANIFEST_DIR_NAME
+        self.object_suffix = ".gz" if zstandard is None else ".zst"
+        # reflink に対応しているか(未判定は None)
+        self.reflink_supported: bool | None = None
         self.backup_dir.mkdir(exist_ok=True)
+        self.catalog = BackupCatalog(self.backup_dir / CATALOG_FILE_NAME)
+        self._sync_catalog()
 
         logger.info(
             f"BackupManager initialized: data_dir={self.data_dir}, backup_dir={self.backup_dir}, keep_days={self.keep_days}"
         )
 
+    def _sync_catalog(self) -> None:
+        """目録にないマニフェスト・以前の形式のバックアップ(目録の作成時はオブジェクトも)を登録"""
+        if self.catalog.created and self.object_dir.is_dir():
+            for object_path in self.object_dir.glob("*/*"):
+                self.catalog.add_object(
+                    object_path.name.split(".")[0],
+                    object_path.relative_to(self.backup_dir).as_posix(),
+                    object_path.stat().st_size,
+                )
+
+        if self.manifest_dir.is_dir():
+            known_ids = self.catalog.backup_ids()
+            for path in sorted(self.manifest_dir.glob("*.json")):
+                if path.stem not in known_ids:
+                    with path.open(encoding="utf-8") as f:
+                        self.catalog.add_backup(json.load(f))
+                    logger.info(f"Registered backup in catalog: {path.stem}")
+
+        known_legacy = self.catalog.legacy_filenames()
+        for backup_file in self.backup_dir.glob("*.csv"):
+            if backup_file.name in known_legacy or not backup_file.is_file():
+                continue
+            match = LEGACY_NAME_PATTERN.match(backup_file.name)
+            stem = match.group("stem") if match else backup_file.stem
+            stat = backup_file.stat()
+            created_at = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+            self.catalog.add_legacy(
+                backup_file.name, f"{stem}.csv", _local_iso(created_at), stat.st_size
+            )
+
     def create_backup(self) -> bool:
         """
-        データファイルのバックアップを作成
+        データファイルのバックアップを作成(前回から変更がなければ何もしない)
 
         Returns:
             bool: バックアップ作成の成功/失敗
@@ -43,45 +198,289 @@ class BackupManager:
                 logger.warning(f"Data directory does not exist: {self.data_dir}")
                 return False
 
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_count = 0
+            latest = self.latest_manifest()
+            previous_files = latest["files"] if latest else {}
+            files = {}
+            stored_count = 0
+
+            for source in self._source_files():
+                name = source.relative_to(self.data_dir).as_posix()
+                stat = source.stat()
+                previous = previous_files.get(name)
+                if (
+                    previous
+                    and previous["size"] == stat.st_size
+                    and previous["mtime_ns"] == stat.st_mtime_ns
+                ):
+                    files[name] = previous
+                    continue
 
-            # CSVファイルをバックアップ
-            for csv_file in self.data_dir.glob("*.csv"):
-                if csv_file.is_file() and csv_file.stat().st_size > 0:  # 空でないファイルのみ
-                    backup_file = self.backup_dir / f"{csv_file.stem}_{timestamp}.csv"
-                    shutil.copy2(csv_file, backup_file)
-                    backup_count += 1
-                    logger.info(f"Backed up: {csv_file.name} -> {backup_file.name}")
+                entry, stored = self._store_file(source, previous)
+                stored_count += stored
+                entry["mtime_ns"] = stat.st_mtime_ns
+                files[name] = entry
+                if previous is None or previous["hash"] != entry["hash"]:
+                    kind = "delta" if "chain" in entry else "full"
+                    logger.info(f"Backed up: {name} ({entry['hash'][:12]}, {kind})")
 
-            if backup_count > 0:
-                logger.info(f"Backup completed: {backup_count} files backed up")
+            changed = {n: e["hash"] for n, e in files.items()} != {
+                n: e["hash"] for n, e in previous_files.items()
+            }
+            if not changed:
+                logger.info("No changes since last backup")
                 return True
-            logger.info("No files to backup")
+
+            backup_id = self._write_manifest(files)
+            logger.info(
+                f"Backup completed: {backup_id} ({len(files)} files, {stored_count} new objects)"
+            )
             return True
 
         except Exception as e:
             logger.error(f"Backup creation failed: {e}")
             return False
 
+    def has_changes(self) -> bool:
+        """
+        最新のバックアップからデータファイルが変更されたか
+
+        ファイルの内容は読まず、一覧・サイズ・更新時刻をマニフェストと比べる。
+        """
+        latest = self.latest_manifest()
+        if latest is None:
+            return True
+        current = {}
+        for source in self._source_files():
+            stat = source.stat()
+            current[source.relative_to(self.data_dir).as_posix()] = (stat.st_size, stat.st_mtime_ns)
+        previous = {name: (e["size"], e["mtime_ns"]) for name, e in latest["files"].items()}
+        return current != previous
+
+    def _source_files(self) -> list[Path]:
+        """バックアップ対象のファイル(データディレクトリ直下のCSV、封印済みセグメント、アーカイブ)"""
+        sources = [f for f in sorted(self.data_dir.glob("*.csv")) if f.is_file()]
+        for dir_name, suffixes in (
+            (SEGMENT_DIR_NAME, (".csv", ".json")),
+            (ARCHIVE_DIR_NAME, (".gz", ".json")),
+        ):
+            segment_dir = self.data_dir / dir_name
+            if segment_dir.is_dir():
+                sources.extend(
+                    f for f in sorted(segment_dir.iterdir()) if f.is_file() and f.suffix in suffixes
+                )
+        # 空のファイルはバックアップしない
+        return [f for f in sources if f.stat().st_size > 0]
+
+    def _object_path(self, digest: str) -> Path | None:
+        """ハッシュに対応する保存済みオブジェクトのパス(圧縮形式は問わない)"""
+        for suffix in OBJECT_SUFFIXES:
+            object_path = self.object_dir / digest[:2] / f"{digest}{suffix}"
+            if object_path.exists():
+                return object_path
+        return None
+
+    def _store_file(self, source: Path, previous: dict | None) -> tuple[dict, int]:
+        """
+        ファイルを保存(前回の内容への追記であれば追記部分だけを保存)
+
+        Returns:
+            tuple: (マニフェストのエントリ, 新しく保存したオブジェクト数)
+        """
+        chain = previous.get("chain", [previous["hash"]]) if previous else []
+        source_size = source.stat().st_size
+        if previous and source_size >= previous["size"] and len(chain) <= MAX_DELTA_CHAIN:
+            with source.open("rb") as src:
+                hasher = hashlib.sha256()
+                remaining = previous["size"]
+                while remaining > 0 and (chunk := src.read(min(CHUNK_SIZE, remaining))):
+                    hasher.update(chunk)
+                    remaining -= len(chunk)
+                if remaining == 0 and hasher.hexdigest() == previous["hash"]:
+                    if source_size == previous["size"]:
+                        # 更新時刻だけが変わり内容は同じ
+                        return dict(previous), 0
+                    delta, stored, size = self._write_object(src, hasher)
+                    entry = {
+                        "hash": hasher.hexdigest(),
+                        "size": previous["size"] + size,
+                        "chain": [*chain, delta],
+                    }
+                    return entry, stored
+
+        name = source.relative_to(self.data_dir).as_posix()
+        if (name.startswith(f"{ARCHIVE_DIR_NAME}/") and source.suffix == ".gz") or (
+            name.startswith(f"{SEGMENT_DIR_NAME}/") and source.suffix == ".csv"
+        ):
+            digest, stored, size = self._clone_object(source)
+            return {"hash": digest, "size": size}, stored
+
+        with source.open("rb") as src:
+            digest, stored, size = self._write_object(src)
+        return {"hash": digest, "size": size}, stored
+
+    def _clone_object(self, source: Path) -> tuple[str, bool, int]:
+        """
+        変更されないファイルを複製せずに(圧縮なしの)オブジェクトとして保存
+
+        reflink、ハードリンク、copy_file_range、通常のコピーの順に試す。
+
+        Returns:
+            tuple: (SHA-256ハッシュ, 新しく保存したかどうか, バイト数)
+        """
+        with source.open("rb") as src:
+            hasher = hashlib.sha256()
+            size = 0
+            while chunk := src.read(CHUNK_SIZE):
+                hasher.update(chunk)
+                size += len(chunk)
+            digest = hasher.hexdigest()
+            if self._object_path(digest) is not None:
+                return digest, False, size
+
+            object_path = self.object_dir / digest[:2] / digest
+            object_path.parent.mkdir(parents=True, exist_ok=True)
+            method = self._clone_into(src, source, object_path, size)
+
+        self.catalog.add_object(
+            digest, object_path.relative_to(self.backup_dir).as_posix(), object_path.stat().st_size
+        )
+        logger.debug(f"Stored {source.name} by {method}")
+        return digest, True, size
+
+    def _clone_into(self, src: IO[bytes], source: Path, object_path: Path, size: int) -> str:
+        """
+        開いているファイルの内容を object_path に複製し、使った方法を返す
+
+        Returns:
+            str: "reflink" / "hardlink" / "copy_file_range" / "copy"
+        """
+        with tempfile.NamedTemporaryFile(delete=False, dir=self.object_dir, suffix=".tmp") as tmp:
+            tmp_path = Path(tmp.name)
+            if self.reflink_supported is not False:
+                self.reflink_supported = _reflink(src, tmp)
+                if self.reflink_supported:
+                    tmp.close()
+                    tmp_path.replace(object_path)
+                    return "reflink"
+
+        try:
+            os.link(source, object_path)
+        except FileExistsError:
+            tmp_path.unlink()
+            return "hardlink"
+        except OSError:
+            pass
+        else:
+            # ハッシュを計算したファイルが置き換えられていなければリンクを使う
+            if object_path.stat().st_ino == os.fstat(src.fileno()).st_ino:
+                tmp_path.unlink()
+                return "hardlink"
+            object_path.unlink()
+
+        with tmp_path.open("r+b") as tmp_file:
+            if _copy_file_range(src, tmp_file, size):
+                method = "copy_file_range"
+            else:
+                src.seek(0)
+                tmp_file.seek(0)
+                tmp_file.truncate()
+                shutil.copyfileobj(src, tmp_file, CHUNK_SIZE)
+                method = "copy"
+        tmp_path.replace(object_path)
+        return method
+
+    def _write_object(self, src: IO[bytes], full_hasher=None) -> tuple[str, bool, int]:
+        """
+        ストリームの残りを読みながらハッシュの計算と圧縮を行い、未保存の内容であれば
+        オブジェクトとして保存
+
+        Args:
+            src: 読み込むストリーム
+            full_hasher: 読み込んだ内容で合わせて更新するハッシュ(差分の保存用)
+
+        Returns:
+            tuple: (SHA-256ハッシュ, 新しく保存したかどうか, 読み込んだバイト数)
+        """
+        self.object_dir.mkdir(parents=True, exist_ok=True)
+        hasher = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(delete=False, dir=self.object_dir, suffix=".tmp") as tmp:
+            tmp_path = Path(tmp.name)
+            with _compressor(self.object_suffix, tmp) as compressed:
+                while chunk := src.read(CHUNK_SIZE):
+                    hasher.update(chunk)
+                    if full_hasher is not None:
+                        full_hasher.update(chunk)
+                    compressed.write(chunk)
+                    size += len(chunk)
+
+        digest = hasher.hexdigest()
+        if self._object_path(digest) is not None:
+            tmp_path.unlink()
+            return digest, False, size
+        object_path = self.object_dir / digest[:2] / f"{digest}{self.object_suffix}"
+        object_path.parent.mkdir(exist_ok=True)
+        tmp_path.replace(object_path)
+        self.catalog.add_object(
+            digest, object_path.relative_to(self.backup_dir).as_posix(), object_path.stat().st_size
+        )
+        return digest, True, size
+
+    def _write_manifest(self, files: dict[str, dict]) -> str:
+        """マニフェストをアトミックに書き込み、バックアップIDを返す"""
+        self.manifest_dir.mkdir(exist_ok=True)
+        now = datetime.now()
+        backup_id = now.strftime("%Y%m%d_%H%M%S_%f")
+        manifest = {"id": backup_id, "created_at": _local_iso(now), "files": files}
+        with tempfile.NamedTemporaryFile(
+            mode="w", encoding="utf-8", delete=False, dir=self.manifest_dir, suffix=".tmp"
+        ) as tmp_file:
+            json.dump(manifest, tmp_file, ensure_ascii=False, indent=2)
+            tmp_path = Path(tmp_file.name)
+        tmp_path.replace(self.manifest_dir / f"{backup_id}.json")
+        self.catalog.add_backup(manifest)
+        return backup_id
+
+    def list_backups(self) -> list[dict]:
+        """バックアップのマニフェストを古い順に取得"""
+        return self.catalog.manifests()
+
+    def latest_manifest(self) -> dict | None:
+        """最新のバックアップのマニフェストを取得"""
+        return self.catalog.latest()
+
     def cleanup_old_backups(self) -> int:
         """
         古いバックアップを削除
 
+        保持期間を過ぎたマニフェスト(最新のものは常に残す)と、どのマニフェストからも
+        参照されなくなったオブジェクトを削除する。以前の形式のCSVコピーも保持期間で削除する。
+        対象は目録から引くため、バックアップディレクトリは走査しない。
+
         Returns:
             int: 削除されたファイル数
         """
         try:
-            cutoff_date = datetime.now() - timedelta(days=self.keep_days)
+            cutoff = _local_iso(datetime.now(timezone.utc) - timedelta(days=self.keep_days))
             deleted_count = 0
 
-            for backup_file in self.backup_dir.glob("*.csv"):
-                if backup_file.is_file():
-                    file_mtime = datetime.fromtimestamp(backup_file.stat().st_mtime, tz=timezone.utc)
-                    if file_mtime < cutoff_date:
-                        backup_file.unlink()
-                        deleted_count += 1
-                        logger.info(f"Deleted old backup: {backup_file.name}")
+            # 目録から先に消すと、途中で失敗してもマニフェストは次回の起動時に再登録される
+            for backup_id in self.catalog.expired(cutoff):
+                self.catalog.remove_backup(backup_id)
+                (self.manifest_dir / f"{backup_id}.json").unlink(missing_ok=True)
+                deleted_count += 1
+                logger.info(f"Deleted old backup: {backup_id}")
+
+            for digest, path in self.catalog.unreferenced_objects():
+                (self.backup_dir / path).unlink(missing_ok=True)
+                self.catalog.remove_object(digest)
+                deleted_count += 1
+
+            for filename in self.catalog.expired_legacy(cutoff):
+                (self.backup_dir / filename).unlink(missing_ok=True)
+                self.catalog.remove_legacy(filename)
+                deleted_count += 1
+                logger.info(f"Deleted old backup: {filename}")
 
             if deleted_count > 0:
                 logger.info(f"Cleanup completed: {deleted_count} old backups deleted")
@@ -102,11 +501,11 @@ class BackupManager:
             dict: バックアップの統計情報
         """
         try:
-            backup_files = list(self.backup_dir.glob("*.csv"))
-            total_size = sum(f.stat().st_size for f in backup_files if f.is_file())
+            backup_count, latest_backup, total_size = self.catalog.stats()
 
             return {
-                "backup_count": len(backup_files),
+                "backup_count": backup_count,
+                "latest_backup": latest_backup,
                 "total_size_bytes": total_size,
                 "total_size_mb": round(total_size / (1024 * 1024), 2),
                 "backup_dir": str(self.backup_dir),
@@ -116,30 +515,191 @@ class BackupManager:
             logger.error(f"Failed to get backup info: {e}")
             return {}
 
-    def restore_backup(self, backup_filename: str) -> bool:
+    def restore_backup(self, backup_id: str, files: list[str] | None = None) -> bool:
         """
         指定されたバックアップから復元
 
         Args:
-            backup_filename: 復元するバックアップファイル名
+            backup_id: 復元するバックアップID(以前の形式ではバックアップファイル名)
+            files: 復元するファイル(データディレクトリからの相対パス。省略時はすべて)
 
         Returns:
             bool: 復元の成功/失敗
         """
         try:
-            backup_file = self.backup_dir / backup_filename
-            if not backup_file.exists():
-                logger.error(f"Backup file not found: {backup_filename}")
-                return False
+            legacy_target = self.catalog.legacy_target(backup_id)
+            if legacy_target is not None:
+                shutil.copy2(self.backup_dir / backup_id, self.data_dir / legacy_target)
+                logger.info(f"Restored backup: {backup_id} -> {legacy_target}")
+                return True
 
-            # 元のファイル名を推測（タイムスタンプ部分を除去）
-            original_name = backup_filename.split("_")[0] + ".csv"
-            target_file = self.data_dir / original_name
+            manifest = self.catalog.manifest(backup_id)
+            if manifest is None:
+                logger.error(f"Backup not found: {backup_id}")
+                return False
 
-            shutil.copy2(backup_file, target_file)
-            logger.info(f"Restored backup: {backup_filename} -> {original_name}")
+            targets = (
+                manifest["files"] if files is None else {n: manifest["files"][n] for n in files}
+            )
+            for name, entry in targets.items():
+                self._restore_objects(entry.get("chain", [entry["hash"]]), self.data_dir / name)
+                logger.info(f"Restored backup: {backup_id}/{name}")
             return True
 
         except Exception as e:
             logger.error(f"Backup restore failed: {e}")
             return False
+
+    def _restore_objects(self, chain: list[str], target_file: Path) -> None:
+        """オブジェクトを順に展開・連結しながら一時ファイル経由で復元先に書き出す"""
+        object_paths = []
+        for digest in chain:
+            object_path = self._object_path(digest)
+            if object_path is None:
+                msg = f"Backup object not found: {digest}"
+                raise FileNotFoundError(msg)
+            object_paths.append(object_path)
+        target_file.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            delete=False, dir=target_file.parent, suffix=".tmp"
+        ) as tmp:
+            tmp_path = Path(tmp.name)
+            cloned = False
+            if len(object_paths) == 1 and not object_paths[0].suffix:
+                # 圧縮なしのオブジェクトは reflink・copy_file_range で複製する
+                with object_paths[0].open("rb") as src:
+                    size = os.fstat(src.fileno()).st_size
+                    cloned = _reflink(src, tmp) or _copy_file_range(src, tmp, size)
+                if not cloned:
+                    tmp.seek(0)
+                    tmp.truncate()
+            if not cloned:
+                for object_path in object_paths:
+                    with _decompressor(object_path) as src:
+                        shutil.copyfileobj(src, tmp, CHUNK_SIZE)
+        tmp_path.replace(target_file)
+
+    def restore_to(self, timestamp: datetime | str, files: list[str] | None = None) -> bool:
+        """
+        指定日時の時点の最新のバックアップから復元
+
+        Args:
+            timestamp: 復元する時点
+            files: 復元するファイル(データディレクトリからの相対パス。省略時はすべて)
+
+        Returns:
+            bool: 復元の成功/失敗
+        """
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        backup_id = self.catalog.backup_at(_local_iso(timestamp))
+        if backup_id is None:
+            logger.error(f"No backup at or before {timestamp.isoformat()}")
+            return False
+        return self.restore_backup(backup_id, files)
+
+
+class BackupScheduler:
+    """
+    バックグラウンドでの定期バックアップ
+
+    poll_interval 秒ごとに起きて、最新のバックアップから interval 秒以上経過しており、
+    かつデータファイルが変更されている場合だけバックアップと古いバックアップの削除を行う。
+    経過時間は最新のマニフェストの作成日時で判定するため、再起動しても間隔は守られる。
+    """
+
+    def __init__(
+        self,
+        manager: BackupManager,
+        interval: float = DEFAULT_BACKUP_INTERVAL,
+        poll_interval: float = 60.0,
+    ):
+        """
+        Args:
+            manager: バックアップマネージャー
+            interval: バックアップの最短間隔(秒)
+            poll_interval: 変更を確認する間隔(秒)
+        """
+        self.manager = manager
+        self.interval = interval
+        self.poll_interval = poll_interval
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        """バックアップスレッドが動作中か"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """バックアップスレッドを開始(開始済みの場合は何もしない)"""
+        with self._lock:
+            if self.running:
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="backup-scheduler", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+        logger.info(
+            f"Backup scheduler started: interval={self.interval}s, poll_interval={self.poll_interval}s"
+        )
+
+    def stop(self) -> None:
+        """バックアップスレッドを停止"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None:
+            return
+        self._stop_event.set()
+        thread.join()
+        atexit.unregister(self.stop)
+
+    def run_pending(self) -> bool:
+        """
+        間隔が経過していてデータが変更されていればバックアップを実行
+
+        Returns:
+            bool: バックアップを実行したかどうか
+        """
+        latest = self.manager.latest_manifest()
+        if latest is not None:
+            created_at = datetime.fromisoformat(latest["created_at"]).astimezone()
+            elapsed = datetime.now(timezone.utc) - created_at
+            if elapsed.total_seconds() < self.interval:
+                return False
+        if not self.manager.has_changes():
+            return False
+        self.manager.create_backup()
+        self.manager.cleanup_old_backups()
+        return True
+
+    def _run(self) -> None:
+        """バックアップスレッド本体"""
+        while not self._stop_event.is_set():
+            try:
+                self.run_pending()
+            except Exception as e:
+                logger.error(f"Scheduled backup failed: {e}")
+            self._stop_event.wait(self.poll_interval)
+
+
+_scheduler: BackupScheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def start_backup_scheduler(data_dir: str = "data", backup_dir: str = "backups") -> BackupScheduler:
+    """
+    プロセス内で共有するバックアップスケジューラーを開始
+
+    2回目以降の呼び出しは開始済みのスケジューラーを返す。間隔は環境変数
+    KANJI_BACKUP_INTERVAL(秒)で変更できる。
+    """
+    global _scheduler  # noqa: PLW0603
+    with _scheduler_lock:
+        if _scheduler is None:
+            interval = float(os.getenv(BACKUP_INTERVAL_ENV, DEFAULT_BACKUP_INTERVAL))
+            _scheduler = BackupScheduler(BackupManager(data_dir, backup_dir), interval)
+        _scheduler.start()
+        return _scheduler
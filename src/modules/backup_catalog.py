@@ -0,0 +1,244 @@
+"""
+バックアップの目録(SQLite)
+"""
+
+import json
+import sqlite3
+from collections.abc import Iterator
+from contextlib import closing, contextmanager
+from pathlib import Path
+
+CATALOG_FILE_NAME = "catalog.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS backups (
+    id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS backups_created_at ON backups (created_at);
+CREATE TABLE IF NOT EXISTS files (
+    backup_id TEXT NOT NULL REFERENCES backups (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    chain TEXT,
+    PRIMARY KEY (backup_id, name)
+);
+CREATE TABLE IF NOT EXISTS backup_objects (
+    backup_id TEXT NOT NULL REFERENCES backups (id) ON DELETE CASCADE,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (backup_id, hash)
+);
+CREATE INDEX IF NOT EXISTS backup_objects_hash ON backup_objects (hash);
+CREATE TABLE IF NOT EXISTS objects (
+    hash TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    stored_size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS legacy_backups (
+    filename TEXT PRIMARY KEY,
+    target TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS legacy_backups_created_at ON legacy_backups (created_at);
+"""
+
+
+class BackupCatalog:
+    """
+    バックアップ・ファイル・オブジェクトの目録
+
+    マニフェスト(JSON)が正本で、この目録はそれを検索するための索引。
+    一覧・最新のバックアップ・日時による選択・期限切れの判定・参照されない
+    オブジェクトの検出を、ディレクトリを走査せずに索引付きのクエリで行う。
+    日時はマニフェストと同じくローカル時刻のISO形式の文字列で比較する。
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.created = not self.path.exists()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """接続を開き、ブロックを抜けるときにコミットして閉じる"""
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn:
+            conn.execute("PRAGMA foreign_keys = ON")
+            with conn:
+                yield conn
+
+    def add_backup(self, manifest: dict) -> None:
+        """マニフェストを登録"""
+        files = manifest["files"]
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO backups (id, created_at) VALUES (?, ?)",
+                (manifest["id"], manifest["created_at"]),
+            )
+            conn.executemany(
+                "INSERT INTO files (backup_id, name, hash, size, mtime_ns, chain)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        manifest["id"],
+                        name,
+                        entry["hash"],
+                        entry["size"],
+                        entry["mtime_ns"],
+                        json.dumps(entry["chain"]) if "chain" in entry else None,
+                    )
+                    for name, entry in files.items()
+                ],
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO backup_objects (backup_id, hash) VALUES (?, ?)",
+                [
+                    (manifest["id"], digest)
+                    for entry in files.values()
+                    for digest in entry.get("chain", [entry["hash"]])
+                ],
+            )
+
+    def backup_ids(self) -> set[str]:
+        """登録済みのバックアップID"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id FROM backups").fetchall()
+        return {row[0] for row in rows}
+
+    def manifest(self, backup_id: str) -> dict | None:
+        """バックアップのマニフェストを取得"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, created_at FROM backups WHERE id = ?", (backup_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            return self._manifest(conn, row)
+
+    def manifests(self) -> list[dict]:
+        """すべてのマニフェストを古い順に取得"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, created_at FROM backups ORDER BY id").fetchall()
+            return [self._manifest(conn, row) for row in rows]
+
+    def latest(self) -> dict | None:
+        """最新のマニフェストを取得"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, created_at FROM backups ORDER BY id DESC LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            return self._manifest(conn, row)
+
+    def backup_at(self, timestamp: str) -> str | None:
+        """指定日時以前で最新のバックアップIDを取得"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id FROM backups WHERE created_at <= ? ORDER BY created_at DESC LIMIT 1",
+                (timestamp,),
+            ).fetchone()
+        return row[0] if row else None
+
+    def expired(self, cutoff: str) -> list[str]:
+        """作成日時が cutoff より前のバックアップID(最新のものは除く)"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id FROM backups WHERE created_at < ?"
+                " AND id != (SELECT MAX(id) FROM backups) ORDER BY id",
+                (cutoff,),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def remove_backup(self, backup_id: str) -> None:
+        """バックアップの登録を削除"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM backups WHERE id = ?", (backup_id,))
+
+    def add_object(self, digest: str, path: str, stored_size: int) -> None:
+        """保存したオブジェクトを登録"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO objects (hash, path, stored_size) VALUES (?, ?, ?)",
+                (digest, path, stored_size),
+            )
+
+    def unreferenced_objects(self) -> list[tuple[str, str]]:
+        """どのバックアップからも参照されないオブジェクトの (ハッシュ, パス)"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT hash, path FROM objects WHERE NOT EXISTS"
+                " (SELECT 1 FROM backup_objects WHERE backup_objects.hash = objects.hash)"
+            ).fetchall()
+        return [(row[0], row[1]) for row in rows]
+
+    def remove_object(self, digest: str) -> None:
+        """オブジェクトの登録を削除"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM objects WHERE hash = ?", (digest,))
+
+    def add_legacy(self, filename: str, target: str, created_at: str, size: int) -> None:
+        """以前の形式のバックアップを登録"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO legacy_backups (filename, target, created_at, size)"
+                " VALUES (?, ?, ?, ?)",
+                (filename, target, created_at, size),
+            )
+
+    def legacy_target(self, filename: str) -> str | None:
+        """以前の形式のバックアップの復元先ファイル名を取得"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT target FROM legacy_backups WHERE filename = ?", (filename,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def legacy_filenames(self) -> set[str]:
+        """登録済みの以前の形式のバックアップのファイル名"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT filename FROM legacy_backups").fetchall()
+        return {row[0] for row in rows}
+
+    def expired_legacy(self, cutoff: str) -> list[str]:
+        """作成日時が cutoff より前の以前の形式のバックアップ"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT filename FROM legacy_backups WHERE created_at < ?", (cutoff,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def remove_legacy(self, filename: str) -> None:
+        """以前の形式のバックアップの登録を削除"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM legacy_backups WHERE filename = ?", (filename,))
+
+    def stats(self) -> tuple[int, str | None, int]:
+        """(バックアップ数, 最新のバックアップID, 保存サイズの合計)"""
+        with self._connect() as conn:
+            count, latest = conn.execute("SELECT COUNT(*), MAX(id) FROM backups").fetchone()
+            legacy_count, legacy_size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM legacy_backups"
+            ).fetchone()
+            (object_size,) = conn.execute(
+                "SELECT COALESCE(SUM(stored_size), 0) FROM objects"
+            ).fetchone()
+        return count + legacy_count, latest, object_size + legacy_size
+
+    @staticmethod
+    def _manifest(conn: sqlite3.Connection, row: tuple) -> dict:
+        """バックアップの行からマニフェストを組み立てる"""
+        backup_id, created_at = row
+        files = {}
+        for name, digest, size, mtime_ns, chain in conn.execute(
+            "SELECT name, hash, size, mtime_ns, chain FROM files WHERE backup_id = ? ORDER BY name",
+            (backup_id,),
+        ):
+            entry = {"hash": digest, "size": size, "mtime_ns": mtime_ns}
+            if chain is not None:
+                entry["chain"] = json.loads(chain)
+            files[name] = entry
+        return {"id": backup_id, "created_at": created_at, "files": files}
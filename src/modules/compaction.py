@@ -0,0 +1,306 @@
+"""
+古い試行の集約・アーカイブ機能
+"""
+
+import csv
+import gzip
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from .attempt_segments import SegmentInfo, open_segment
+from .logger import app_logger
+from .offset_index import OffsetIndex
+from .storage import AttemptStorage
+
+SUMMARY_FILE_NAME = "attempt_summaries.csv"
+SUMMARY_HEADER = ["date", "problem_id", "total_count", "correct_count"]
+
+TRUE_VALUES = ("True", "true", "1")
+
+
+@dataclass
+class AttemptSummary:
+    """問題別・日別の試行集計"""
+
+    date: str
+    problem_id: str
+    total_count: int
+    correct_count: int
+
+
+def load_attempt_summaries(data_dir: str | Path = "data") -> list[AttemptSummary]:
+    """アーカイブ済み試行の集計行を読み込む"""
+    summary_path = Path(data_dir) / SUMMARY_FILE_NAME
+    if not summary_path.exists():
+        return []
+    with summary_path.open(encoding="utf-8") as f:
+        return [
+            AttemptSummary(
+                date=row["date"],
+                problem_id=row["problem_id"],
+                total_count=int(row["total_count"]),
+                correct_count=int(row["correct_count"]),
+            )
+            for row in csv.DictReader(f)
+        ]
+
+
+def read_archived_rows(archive_path: Path) -> tuple[list[str], list[list[str]]]:
+    """セグメントまたはgzip圧縮されたアーカイブからCSVのヘッダと行を読み込む"""
+    with open_segment(archive_path) as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        return header, [row for row in reader if row]
+
+
+class AttemptCompactor:
+    """
+    保持期間を過ぎた封印済みセグメントの集約・アーカイブ
+
+    対象月の生データは `attempt_archive/attempts_YYYYMM.csv.gz` に圧縮して移し、
+    問題別・日別の集計行を `attempt_summaries.csv` に書き込む。集計行は月単位で
+    置き換えるため、途中で中断しても再実行すれば同じ結果になる。
+    問題ごとの incorrect_count は problems.csv 側で管理しているため変更しない。
+    集約の前に、試行の削除記録(トゥームストーン)も各ファイルに反映する。
+    """
+
+    def __init__(self, attempt_storage: AttemptStorage, retention_days: int = 180):
+        """
+        Args:
+            attempt_storage: 対象の試行ストレージ
+            retention_days: 生データを attempts 側に残す日数
+        """
+        self.attempt_storage = attempt_storage
+        self.retention_days = retention_days
+        self.data_dir = attempt_storage.data_dir
+        self.archive = attempt_storage.archive
+        self.summary_path = self.data_dir / SUMMARY_FILE_NAME
+
+    def compact(self, now: datetime | None = None) -> int:
+        """
+        保持期間を過ぎたセグメントを集約・アーカイブする
+
+        Returns:
+            int: アーカイブしたセグメント数
+        """
+        self.fold_tombstones()
+        cutoff = ((now or datetime.now()) - timedelta(days=self.retention_days)).isoformat()
+        storage = self.attempt_storage
+        compacted = 0
+
+        with storage.lock.exclusive() as locked:
+            active_month, segments = storage.segments.load_manifest()
+            expired = [s for s in segments if s.max_attempted_at < cutoff]
+            for segment in expired:
+                self._archive_segment(segment)
+                segments.remove(segment)
+                storage.segments.save_manifest(active_month, segments)
+                segment_path = storage.segments.segment_path(segment)
+                segment_path.unlink(missing_ok=True)
+                OffsetIndex(segment_path).remove()
+                compacted += 1
+                app_logger.info(f"試行セグメントをアーカイブ: {segment.month} ({segment.rows}件)")
+            if compacted:
+                generation = locked.bump_generation()
+                storage.rollups.advance(generation - 1, generation)
+
+        return compacted
+
+    def fold_tombstones(self) -> int:
+        """
+        試行の削除記録を attempts.csv・セグメント・アーカイブに反映して消去する
+
+        削除対象を含むファイルだけを書き換える。途中で中断しても削除記録は残るため、
+        再実行すれば同じ結果になる。
+
+        Returns:
+            int: ファイルから取り除いた行数
+        """
+        storage = self.attempt_storage
+        removed = 0
+
+        with storage.lock.exclusive() as locked:
+            deleted = storage.tombstones.load()
+            if not deleted:
+                return 0
+
+            header, rows = read_archived_rows(storage.file_path)
+            remaining = self._drop_deleted(header, rows, deleted)
+            if len(remaining) != len(rows):
+                if not storage._atomic_write_csv(storage.file_path, header, remaining):
+                    msg = f"削除記録の反映に失敗しました: {storage.file_path}"
+                    raise OSError(msg)
+                removed += len(rows) - len(remaining)
+
+            active_month, segments = storage.segments.load_manifest()
+            kept = []
+            emptied = []
+            for segment in segments:
+                segment_path = storage.segments.segment_path(segment)
+                header, rows = read_archived_rows(segment_path)
+                remaining = self._drop_deleted(header, rows, deleted)
+                if len(remaining) == len(rows):
+                    kept.append(segment)
+                    continue
+                removed += len(rows) - len(remaining)
+                if remaining:
+                    if not storage._atomic_write_csv(segment_path, header, remaining):
+                        msg = f"削除記録の反映に失敗しました: {segment_path}"
+                        raise OSError(msg)
+                    kept.append(self._segment_info(segment.month, segment.file, header, remaining))
+                else:
+                    emptied.append(segment_path)
+            storage.segments.save_manifest(active_month, kept)
+
+            _, archived = self.archive.load_manifest()
+            kept = []
+            for segment in archived:
+                archive_path = self.archive.segment_path(segment)
+                header, rows = read_archived_rows(archive_path)
+                remaining = self._drop_deleted(header, rows, deleted)
+                if len(remaining) == len(rows):
+                    kept.append(segment)
+                    continue
+                removed += len(rows) - len(remaining)
+                if remaining:
+                    self._write_archive(archive_path, header, remaining)
+                    kept.append(self._segment_info(segment.month, segment.file, header, remaining))
+                else:
+                    emptied.append(archive_path)
+                self._replace_summaries(segment.month, header, remaining)
+            if archived:
+                self.archive.save_manifest(None, kept)
+
+            # マニフェストから外したファイルを削除してから削除記録を消去する
+            for path in emptied:
+                path.unlink(missing_ok=True)
+                OffsetIndex(path).remove()
+            storage.tombstones.clear()
+            generation = locked.bump_generation()
+            storage.rollups.advance(generation - 1, generation)
+
+        app_logger.info(f"試行の削除記録を反映: {removed}行")
+        return removed
+
+    @staticmethod
+    def _drop_deleted(
+        header: list[str], rows: list[list[str]], deleted: dict[str, set[str]]
+    ) -> list[list[str]]:
+        """削除記録に含まれるIDの行を取り除く"""
+        id_idx = header.index("id")
+        return [row for row in rows if row[id_idx] not in deleted]
+
+    @staticmethod
+    def _segment_info(
+        month: str, file_name: str, header: list[str], rows: list[list[str]]
+    ) -> SegmentInfo:
+        """行からセグメント情報を作成"""
+        at_idx = header.index("attempted_at")
+        timestamps = [row[at_idx] for row in rows]
+        return SegmentInfo(
+            month=month,
+            file=file_name,
+            rows=len(rows),
+            min_attempted_at=min(timestamps),
+            max_attempted_at=max(timestamps),
+        )
+
+    def _archive_segment(self, segment: SegmentInfo) -> None:
+        """1か月分のセグメントを圧縮アーカイブし、集計行を更新"""
+        segment_path = self.attempt_storage.segments.segment_path(segment)
+        with segment_path.open(encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            rows = [row for row in reader if row]
+
+        # 中断後の再実行や、アーカイブ済みの月への追記分は既存アーカイブと統合する
+        _, archived = self.archive.load_manifest()
+        by_month = {s.month: s for s in archived}
+        existing = by_month.get(segment.month)
+        if existing is not None:
+            archived_header, archived_rows = read_archived_rows(self.archive.segment_path(existing))
+            rows = self._align_rows(archived_header, header, archived_rows) + rows
+
+        # ID重複を解消（同一IDの場合は最終行を採用）
+        id_idx = header.index("id")
+        rows = list({row[id_idx]: row for row in rows}.values())
+
+        archive_name = f"attempts_{segment.month.replace('-', '')}.csv.gz"
+        self._write_archive(self.archive.segment_dir / archive_name, header, rows)
+        self._replace_summaries(segment.month, header, rows)
+
+        at_idx = header.index("attempted_at")
+        timestamps = [row[at_idx] for row in rows]
+        by_month[segment.month] = SegmentInfo(
+            month=segment.month,
+            file=archive_name,
+            rows=len(rows),
+            min_attempted_at=min(timestamps, default=segment.min_attempted_at),
+            max_attempted_at=max(timestamps, default=segment.max_attempted_at),
+        )
+        self.archive.save_manifest(None, list(by_month.values()))
+
+    @staticmethod
+    def _align_rows(
+        source_header: list[str], target_header: list[str], rows: list[list[str]]
+    ) -> list[list[str]]:
+        """列構成の異なる行を target_header の順に並べ替える"""
+        if source_header == target_header:
+            return rows
+        aligned = []
+        for row in rows:
+            values = dict(zip(source_header, row, strict=False))
+            aligned.append([values.get(column, "") for column in target_header])
+        return aligned
+
+    def _write_archive(self, archive_path: Path, header: list[str], rows: list[list[str]]) -> None:
+        """gzip圧縮したCSVを一時ファイル経由でアトミックに書き込む"""
+        archive_path.parent.mkdir(exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            delete=False, dir=archive_path.parent, suffix=".tmp"
+        ) as tmp_file:
+            tmp_path = Path(tmp_file.name)
+            with gzip.open(tmp_file, "wt", encoding="utf-8", newline="") as gz:
+                writer = csv.writer(gz)
+                writer.writerow(header)
+                writer.writerows(rows)
+        tmp_path.replace(archive_path)
+
+    def _replace_summaries(self, month: str, header: list[str], rows: list[list[str]]) -> None:
+        """対象月の集計行を置き換える"""
+        pid_idx = header.index("problem_id")
+        at_idx = header.index("attempted_at")
+        correct_idx = header.index("is_correct")
+
+        totals: dict[tuple[str, str], list[int]] = {}
+        for row in rows:
+            key = (row[at_idx][:10], row[pid_idx])
+            counts = totals.setdefault(key, [0, 0])
+            counts[0] += 1
+            if row[correct_idx] in TRUE_VALUES:
+                counts[1] += 1
+
+        summaries = [s for s in load_attempt_summaries(self.data_dir) if s.date[:7] != month]
+        summaries.extend(
+            AttemptSummary(date=date, problem_id=pid, total_count=total, correct_count=correct)
+            for (date, pid), (total, correct) in totals.items()
+        )
+        summaries.sort(key=lambda s: (s.date, s.problem_id))
+
+        with tempfile.NamedTemporaryFile(
+            mode="w",
+            newline="",
+            encoding="utf-8",
+            delete=False,
+            dir=self.data_dir,
+            suffix=".tmp",
+        ) as tmp_file:
+            writer = csv.writer(tmp_file)
+            writer.writerow(SUMMARY_HEADER)
+            writer.writerows(
+                [s.date, s.problem_id, s.total_count, s.correct_count] for s in summaries
+            )
+            tmp_path = Path(tmp_file.name)
+        tmp_path.replace(self.summary_path)
@@ -0,0 +1,112 @@
+"""
+プロセス間ファイルロック・世代管理機能
+"""
+
+import os
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows では fcntl が存在しないためロックなしで動作する
+    fcntl = None  # type: ignore[assignment]
+
+
+class LockTimeoutError(TimeoutError):
+    """ロック取得がタイムアウトした場合の例外"""
+
+
+class LockedFile:
+    """ロック保持中のファイルハンドル(世代番号の読み書きを提供)"""
+
+    def __init__(self, handle):
+        self._handle = handle
+
+    @property
+    def generation(self) -> int:
+        """現在の世代番号を取得"""
+        self._handle.seek(0)
+        content = self._handle.read().strip()
+        try:
+            return int(content or 0)
+        except ValueError:
+            return 0
+
+    def bump_generation(self) -> int:
+        """世代番号を1増やす(排他ロック保持中のみ呼び出すこと)"""
+        new_generation = self.generation + 1
+        self._handle.seek(0)
+        self._handle.truncate()
+        self._handle.write(str(new_generation))
+        self._handle.flush()
+        return new_generation
+
+
+class FileLock:
+    """
+    データファイルごとのアドバイザリロック
+
+    `<data_file>.lock` をロック対象とし、同ファイルにデータファイルの
+    世代番号(書き込みのたびに増加)を保持する。
+    """
+
+    def __init__(self, data_file: Path, timeout: float = 10.0, poll_interval: float = 0.01):
+        """
+        Args:
+            data_file: ロック対象のデータファイル
+            timeout: ロック取得のタイムアウト秒数(0で即時失敗)
+            poll_interval: ロック再試行の間隔秒数
+        """
+        self.data_file = Path(data_file)
+        self.lock_path = self.data_file.with_name(self.data_file.name + ".lock")
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+
+    @contextmanager
+    def shared(self) -> Iterator[LockedFile]:
+        """共有ロック(読み込み用)"""
+        with self._acquire(exclusive=False) as locked:
+            yield locked
+
+    @contextmanager
+    def exclusive(self) -> Iterator[LockedFile]:
+        """排他ロック(書き込み用)"""
+        with self._acquire(exclusive=True) as locked:
+            yield locked
+
+    def read_generation(self) -> int:
+        """ロックを取得せずに世代番号を読み込む"""
+        try:
+            content = self.lock_path.read_text(encoding="utf-8").strip()
+            return int(content or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    @contextmanager
+    def _acquire(self, exclusive: bool) -> Iterator[LockedFile]:
+        """ロックを取得してハンドルを返す"""
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        with os.fdopen(fd, "r+", encoding="utf-8") as handle:
+            if fcntl is not None:
+                self._wait_for_lock(handle, exclusive)
+            try:
+                yield LockedFile(handle)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+    def _wait_for_lock(self, handle, exclusive: bool) -> None:
+        """タイムアウトまでロック取得を再試行"""
+        operation = (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | fcntl.LOCK_NB
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                fcntl.flock(handle.fileno(), operation)
+                return
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    msg = f"ロックの取得がタイムアウトしました: {self.lock_path}"
+                    raise LockTimeoutError(msg) from None
+                time.sleep(self.poll_interval)
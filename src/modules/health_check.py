@@ -2,7 +2,41 @@
 データ整合性ヘルスチェック
 """
 
+import array
+import csv
+import hashlib
+import io
+import itertools
+import json
+import os
+import tempfile
+import threading
+import uuid
+from collections.abc import Container, Iterable, Iterator
+from pathlib import Path
+from typing import BinaryIO
+
+import numpy as np
+
+from .logger import app_logger
 from .storage import AttemptStorage, ProblemStorage
+from .tombstones import is_tombstoned
+
+HEALTH_CHECK_DIR_NAME = "health_check"
+STATE_FILE_NAME = "state.json"
+STATE_VERSION = 3
+# 検査済みの位置の直前を何バイト照合して、前回から書き換えられていないことを確かめるか
+TAIL_WINDOW = 4096
+VALID_BOOLEANS = ("True", "False", "true", "false", "1", "0")
+# 孤立の判定をまとめて行う試行の件数
+ORPHAN_BATCH_SIZE = 8192
+# 試行ログを一度に読み込むバイト数
+READ_CHUNK_SIZE = 1 << 22
+# 結果に一覧として含める孤立試行の最大件数。件数はすべて数える
+ORPHAN_LIST_LIMIT = 1000
+# 状態とともに保存する配列
+# (試行IDのハッシュ、参照されている問題IDのハッシュ、孤立した問題IDのハッシュとその試行数)
+STATE_ARRAYS = ("attempt_ids", "referenced_problem_ids", "orphan_problem_ids", "orphan_counts")
 
 
 class HealthCheckResult:
@@ -13,6 +47,7 @@ class HealthCheckResult:
         self.duplicate_problem_ids: list[str] = []
         self.duplicate_attempt_ids: list[str] = []
         self.orphaned_attempts: list[tuple[str, str]] = []  # (attempt_id, problem_id)
+        self.orphan_count = 0  # orphaned_attempts は先頭の ORPHAN_LIST_LIMIT 件まで
         self.invalid_boolean_values: list[str] = []
         self.total_problems = 0
         self.total_attempts = 0
@@ -30,8 +65,8 @@ class HealthCheckResult:
         if self.duplicate_attempt_ids:
             messages.append(f"- 重複試行ID: {len(self.duplicate_attempt_ids)}件")
 
-        if self.orphaned_attempts:
-            messages.append(f"- 孤立試行データ: {len(self.orphaned_attempts)}件")
+        if self.orphan_count:
+            messages.append(f"- 孤立試行データ: {self.orphan_count}件")
 
         if self.invalid_boolean_values:
             messages.append(f"- 不正な真偽値: {len(self.invalid_boolean_values)}件")
@@ -39,73 +74,737 @@ class HealthCheckResult:
         return "\n".join(messages)
 
 
+def _file_signature(path: Path) -> list[int] | None:
+    """ファイルの (inode, サイズ, 更新時刻ns)。存在しなければ None"""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return [stat.st_ino, stat.st_size, stat.st_mtime_ns]
+
+
+def _tail_hash(f: BinaryIO, offset: int) -> str:
+    """offset の直前 TAIL_WINDOW バイトのハッシュ"""
+    start = max(0, offset - TAIL_WINDOW)
+    f.seek(start)
+    return hashlib.sha256(f.read(offset - start)).hexdigest()
+
+
+def _complete_chunks(f: BinaryIO, position: list[int], end: int | None = None) -> Iterator[str]:
+    """
+    position[0] から改行で終わる行だけを READ_CHUNK_SIZE 程度ずつ復号して返し、
+    読み終えたバイト位置を position[0] に記録
+
+    引用符の中の改行では区切らない。書き込み途中の最終行は次回の検査に回す。
+    end を指定した場合はその位置までを読む。
+    """
+    f.seek(position[0])
+    limit = None if end is None else end - position[0]
+    carry = b""
+    while True:
+        size = READ_CHUNK_SIZE if limit is None else min(READ_CHUNK_SIZE, limit)
+        block = f.read(size) if size > 0 else b""
+        if limit is not None:
+            limit -= len(block)
+        data = carry + block
+        cut = data.rfind(b"\n")
+        # 区切りまでの引用符の数が奇数なら、その改行はフィールドの途中にある
+        while cut >= 0 and data.count(b'"', 0, cut) % 2:
+            cut = data.rfind(b"\n", 0, cut)
+        if cut >= 0:
+            position[0] += cut + 1
+            yield data[: cut + 1].decode("utf-8")
+            data = data[cut + 1 :]
+        if not block:
+            return
+        carry = data
+
+
+def _iter_attempt_rows(
+    f: BinaryIO, start: int, position: list[int], end: int | None = None
+) -> Iterator[tuple[str, str, str]]:
+    """
+    試行ログの start 以降の行を (試行ID, 問題ID, 正誤) として返し、
+    読み終えたバイト位置を position[0] に記録
+    """
+    f.seek(0)
+    first = f.readline()
+    header = next(csv.reader([first.decode("utf-8")]), [])
+    if not first.endswith(b"\n"):
+        header = []
+    position[0] = max(start, len(first)) if header else 0
+    if not header:
+        return
+    # ない列は行の末尾に補う空文字の位置を指す
+    width = len(header) + 1
+    columns = {column: i for i, column in enumerate(header)}
+    id_idx = columns.get("id", len(header))
+    pid_idx = columns.get("problem_id", len(header))
+    correct_idx = columns.get("is_correct", len(header))
+
+    for chunk in _complete_chunks(f, position, end):
+        for values in csv.reader(io.StringIO(chunk, newline="")):
+            if not values:
+                continue
+            if len(values) < width:
+                values.extend([""] * (width - len(values)))
+            yield values[id_idx], values[pid_idx], values[correct_idx]
+
+
+def id_keys(ids: list[str]) -> np.ndarray:
+    """IDを8バイトのハッシュ(uint64)に変換"""
+    blake2b = hashlib.blake2b
+    digests = b"".join([blake2b(i.encode("utf-8"), digest_size=8).digest() for i in ids])
+    return np.frombuffer(digests, dtype=">u8").astype(np.uint64)
+
+
+def _sorted_unique(keys: np.ndarray) -> np.ndarray:
+    """重複を除いた昇順の配列(np.unique より速い、整列してから隣同士を比べる方法)"""
+    keys = np.sort(keys)
+    if not len(keys):
+        return keys
+    distinct: np.ndarray = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+    return distinct
+
+
+def _in_sorted(sorted_keys: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """各キーが整列済み配列に含まれるかどうかの真偽値の配列"""
+    if not len(sorted_keys):
+        return np.zeros(len(keys), dtype=bool)
+    found = np.searchsorted(sorted_keys, keys)
+    hit: np.ndarray = sorted_keys[np.minimum(found, len(sorted_keys) - 1)] == keys
+    return hit
+
+
+def _merge_sorted(sorted_keys: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """整列済み配列に含まれないキーを、二分探索した位置に挿入した配列"""
+    keys = _sorted_unique(keys)
+    keys = keys[~_in_sorted(sorted_keys, keys)]
+    if not len(keys):
+        return sorted_keys
+    return np.insert(sorted_keys, np.searchsorted(sorted_keys, keys), keys)
+
+
+class ProblemIdSet:
+    """
+    問題IDの所属判定
+
+    問題IDを8バイトのハッシュの整列済み配列として持ち、二分探索で判定する。
+    文字列の集合に比べて1件あたり8バイトで済むため、問題数が多くても
+    メモリ使用量が小さい。配列にないIDは確実に存在しない(孤立と確定できる)。
+    配列は保存せずプロセス内だけで使うため、ハッシュには組み込みの hash を使う。
+    """
+
+    def __init__(self, keys: np.ndarray):
+        """
+        Args:
+            keys: 重複のない昇順のハッシュ配列
+        """
+        self.keys = keys
+
+    @classmethod
+    def from_ids(cls, problem_ids: Iterable[str]) -> "ProblemIdSet":
+        """IDを順に読みながらハッシュ配列を作成"""
+        collected = array.array("q", map(hash, problem_ids))
+        return cls(_sorted_unique(np.frombuffer(collected, dtype=np.int64)))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, problem_id: str) -> bool:
+        return bool(self.contains([problem_id])[0])
+
+    def contains(self, problem_ids: list[str]) -> np.ndarray:
+        """各IDが含まれるかどうかの真偽値の配列"""
+        keys = np.fromiter(map(hash, problem_ids), dtype=np.int64, count=len(problem_ids))
+        return _in_sorted(self.keys, keys)
+
+
+class HealthCheckState:
+    """
+    前回のヘルスチェックの検査済み位置と結果
+
+    `health_check/state.json` に試行ログのファイルごとの検査済みバイト位置
+    (inode と直前 TAIL_WINDOW バイトのハッシュを添えて)、問題ファイル・削除記録の
+    (inode, サイズ, 更新時刻)、検出済みの問題を記録する。検査済みの試行ID・
+    参照されている問題ID・孤立した問題ID(とその試行数)は8バイトのハッシュの
+    整列済み配列として `<配列名>_<トークン>.npy` に保存する。配列のトークンは state.json から参照するため、
+    両者は常に対応が取れている。
+    """
+
+    def __init__(self, state_dir: Path):
+        self.state_dir = Path(state_dir)
+        self.state_path = self.state_dir / STATE_FILE_NAME
+
+    def load(self) -> dict | None:
+        """前回の状態を読み込む(ない・壊れている場合は None)"""
+        try:
+            with self.state_path.open(encoding="utf-8") as f:
+                state: dict = json.load(f)
+            if state.get("version") != STATE_VERSION:
+                return None
+            for name in STATE_ARRAYS:
+                state[name] = np.load(self._array_path(name, state["token"]), mmap_mode="r")
+        except (OSError, ValueError, KeyError):
+            return None
+        return state
+
+    def save(self, state: dict, arrays: dict[str, np.ndarray] | None) -> None:
+        """
+        状態をアトミックに保存し、古い配列を削除
+
+        Args:
+            arrays: STATE_ARRAYS の各配列(None の場合は前回の配列をそのまま使う)
+        """
+        self.state_dir.mkdir(exist_ok=True)
+        if arrays is None:
+            token = state["token"]
+        else:
+            token = uuid.uuid4().hex
+            for name in STATE_ARRAYS:
+                np.save(self._array_path(name, token), arrays[name])
+        saved = {key: value for key, value in state.items() if key not in STATE_ARRAYS}
+        saved.update(version=STATE_VERSION, token=token)
+
+        with tempfile.NamedTemporaryFile(
+            mode="w", encoding="utf-8", delete=False, dir=self.state_dir, suffix=".tmp"
+        ) as tmp_file:
+            json.dump(saved, tmp_file, ensure_ascii=False)
+            tmp_path = Path(tmp_file.name)
+        tmp_path.replace(self.state_path)
+
+        for old in self.state_dir.glob("*.npy"):
+            if not old.stem.endswith(token):
+                old.unlink(missing_ok=True)
+
+    def _array_path(self, name: str, token: str) -> Path:
+        """配列の保存先"""
+        return self.state_dir / f"{name}_{token}.npy"
+
+
+def iter_problem_ids(problem_storage: ProblemStorage) -> Iterator[str]:
+    """削除記録のない問題のIDを順に返す"""
+    deleted_problems = problem_storage.tombstones.load()
+    with problem_storage.file_path.open(encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        if "id" not in header:
+            return
+        id_idx = header.index("id")
+        created_idx = header.index("created_at") if "created_at" in header else None
+        for row in reader:
+            pid = row[id_idx] if len(row) > id_idx else ""
+            if not pid:
+                continue
+            # 削除記録のある行は削除済みとして扱う
+            if deleted_problems:
+                created_at = row[created_idx] if created_idx is not None else ""
+                if is_tombstoned(deleted_problems, pid, created_at):
+                    continue
+            yield pid
+
+
+def _check_problems(problem_storage: ProblemStorage) -> tuple[ProblemIdSet, list[str]]:
+    """
+    問題ファイルを検査して (問題IDの所属判定, 重複問題ID) を返す
+
+    1回目の読み込みではIDのハッシュだけを集め、ハッシュが重複したIDがある
+    場合だけ、2回目の読み込みでその候補のIDを数えて重複を確定する。
+    """
+    collected = array.array("q", map(hash, iter_problem_ids(problem_storage)))
+    keys = np.frombuffer(collected, dtype=np.int64).copy()
+    keys.sort()
+    candidate_keys = _sorted_unique(keys[1:][keys[1:] == keys[:-1]])
+
+    duplicate_problem_ids: list[str] = []
+    if len(candidate_keys):
+        candidates = ProblemIdSet(candidate_keys)
+        counts: dict[str, int] = {}
+        for pid in iter_problem_ids(problem_storage):
+            if pid in candidates:
+                counts[pid] = counts.get(pid, 0) + 1
+        duplicate_problem_ids = [pid for pid, count in counts.items() if count > 1]
+    return ProblemIdSet(_sorted_unique(keys)), duplicate_problem_ids
+
+
+def find_orphans(
+    problem_ids: ProblemIdSet, pending: list[tuple[str, str]]
+) -> list[tuple[str, str]]:
+    """(試行ID, 問題ID) のうち問題が存在しないものを順序を保って返す"""
+    distinct = list(dict.fromkeys(pid for _, pid in pending))
+    missing = {
+        pid for pid, ok in zip(distinct, problem_ids.contains(distinct), strict=True) if not ok
+    }
+    return [o for o in pending if o[1] in missing]
+
+
+def _resume_offsets(state: dict | None, attempt_files: list[Path], data_dir: Path) -> dict | None:
+    """
+    前回の検査済み位置から再開できるファイルごとの開始位置
+
+    前回検査したファイルがなくなった・置き換えられた・検査済みの部分が書き換えられた
+    場合は None(全体を検査し直す)を返す。
+    """
+    if state is None:
+        return None
+    names = {path.relative_to(data_dir).as_posix(): path for path in attempt_files}
+    if not set(state["files"]) <= set(names):
+        return None
+
+    offsets = {}
+    for name, path in names.items():
+        mark = state["files"].get(name)
+        if mark is None:
+            offsets[name] = 0
+            continue
+        signature = _file_signature(path)
+        if signature is None or signature[0] != mark["inode"] or signature[1] < mark["offset"]:
+            return None
+        with path.open("rb") as f:
+            if _tail_hash(f, mark["offset"]) != mark["tail_hash"]:
+                return None
+        offsets[name] = mark["offset"]
+    return offsets
+
+
+def _unique_keys(ids: Iterable[str]) -> np.ndarray:
+    """IDを ORPHAN_BATCH_SIZE 件ずつハッシュに変換し、重複のない整列済み配列にする"""
+    iterator = iter(ids)
+    chunks = [np.empty(0, dtype=np.uint64)]
+    while batch := list(itertools.islice(iterator, ORPHAN_BATCH_SIZE)):
+        chunks.append(id_keys(batch))
+    return _sorted_unique(np.concatenate(chunks))
+
+
+class _ReferencedProblems:
+    """
+    試行が参照する問題IDのハッシュ(保存用)を集める
+
+    同じ問題IDを何度もハッシュしないよう、プロセス内の hash で既出かどうかを先に判定する。
+    """
+
+    def __init__(self, keys: np.ndarray):
+        """
+        Args:
+            keys: 前回までに参照されていた問題IDのハッシュの整列済み配列
+        """
+        self.keys = keys
+        self._seen = np.empty(0, dtype=np.int64)
+        self._chunks = [np.empty(0, dtype=np.uint64)]
+
+    def add(self, pending: list[tuple[str, str]]) -> None:
+        """(試行ID, 問題ID) が参照する問題IDを加える"""
+        distinct = list(dict.fromkeys(pid for _, pid in pending))
+        hashes = np.fromiter(map(hash, distinct), dtype=np.int64, count=len(distinct))
+        unseen = ~_in_sorted(self._seen, hashes)
+        if unseen.any():
+            self._seen = _merge_sorted(self._seen, hashes[unseen])
+            self._chunks.append(
+                id_keys([pid for pid, new in zip(distinct, unseen, strict=True) if new])
+            )
+
+    def merged(self) -> np.ndarray:
+        """前回までの配列に加えた整列済み配列"""
+        return _merge_sorted(self.keys, np.concatenate(self._chunks))
+
+
+class _OrphanedAttempts:
+    """
+    孤立試行を集める
+
+    件数は孤立した問題IDのハッシュごとに数えて保存し、問題が追加されて孤立でなく
+    なった分を差し引けるようにする。一覧は先頭の ORPHAN_LIST_LIMIT 件だけを持つ。
+    """
+
+    def __init__(self, listed: list[tuple[str, str]], keys: np.ndarray, counts: np.ndarray):
+        """
+        Args:
+            listed: 前回までの孤立試行の一覧
+            keys: 孤立した問題IDのハッシュの整列済み配列
+            counts: keys の各問題IDを参照する孤立試行の件数
+        """
+        self.listed = listed
+        self.keys = keys
+        self.counts = counts
+
+    @property
+    def count(self) -> int:
+        """孤立試行の件数"""
+        return int(self.counts.sum())
+
+    def add(self, found: list[tuple[str, str]]) -> None:
+        """孤立試行を加える"""
+        if not found:
+            return
+        self.listed.extend(found[: max(ORPHAN_LIST_LIMIT - len(self.listed), 0)])
+        per_problem: dict[str, int] = {}
+        for _, pid in found:
+            per_problem[pid] = per_problem.get(pid, 0) + 1
+        keys = np.concatenate((self.keys, id_keys(list(per_problem))))
+        counts = np.concatenate(
+            (self.counts, np.fromiter(per_problem.values(), dtype=np.int64, count=len(per_problem)))
+        )
+        # 整列してから同じキーの件数を合計する
+        order = np.argsort(keys, kind="stable")
+        keys, counts = keys[order], counts[order]
+        starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        self.keys = keys[starts]
+        self.counts = np.add.reduceat(counts, starts)
+
+    def resolve(self, missing: np.ndarray, problem_ids: ProblemIdSet) -> None:
+        """存在しない問題IDのハッシュ missing に含まれない分を取り除く"""
+        remaining = _in_sorted(missing, self.keys)
+        self.keys, self.counts = self.keys[remaining], self.counts[remaining]
+        if self.listed:
+            resolved = problem_ids.contains([pid for _, pid in self.listed])
+            self.listed = [o for o, ok in zip(self.listed, resolved, strict=True) if not ok]
+
+
+def _appended_ids(
+    attempt_files: list[Path],
+    data_dir: Path,
+    offsets: dict[str, int],
+    marks: dict[str, dict],
+    deleted_attempts: Container[str],
+) -> Iterator[str]:
+    """今回検査した範囲の(削除記録のない)試行IDを読み直して順に返す"""
+    for path in attempt_files:
+        name = path.relative_to(data_dir).as_posix()
+        with path.open("rb") as f:
+            # 検査後に置き換えられたファイルは読まない
+            if os.fstat(f.fileno()).st_ino != marks[name]["inode"]:
+                continue
+            rows = _iter_attempt_rows(f, offsets[name], [0], marks[name]["offset"])
+            for aid, _, _ in rows:
+                if aid and aid not in deleted_attempts:
+                    yield aid
+
+
+def _duplicate_attempt_ids(
+    ids: Iterator[str], candidate_keys: np.ndarray, existing_keys: np.ndarray
+) -> list[str]:
+    """ハッシュが重複した候補の試行IDを数えて、重複している試行IDを確定する"""
+    counts: dict[str, int] = {}
+    while batch := list(itertools.islice(ids, ORPHAN_BATCH_SIZE)):
+        hits = _in_sorted(candidate_keys, id_keys(batch))
+        for aid, hit in zip(batch, hits, strict=True):
+            if hit:
+                counts[aid] = counts.get(aid, 0) + 1
+    candidates = list(counts)
+    known = _in_sorted(existing_keys, id_keys(candidates))
+    return [aid for aid, seen in zip(candidates, known, strict=True) if seen or counts[aid] > 1]
+
+
+def _judge(result: HealthCheckResult) -> HealthCheckResult:
+    """問題の有無を判定"""
+    result.has_issues = bool(
+        result.duplicate_problem_ids
+        or result.duplicate_attempt_ids
+        or result.orphan_count
+        or result.invalid_boolean_values
+    )
+    return result
+
+
 def run_health_check(
-    problem_storage: ProblemStorage, attempt_storage: AttemptStorage
+    problem_storage: ProblemStorage,
+    attempt_storage: AttemptStorage,
+    *,
+    incremental: bool = True,
+    save: bool = True,
 ) -> HealthCheckResult:
-    """ヘルスチェックを実行"""
-    result = HealthCheckResult()
+    """
+    ヘルスチェックを実行
 
-    # 問題データの読み込み（生データ）
-    import csv
+    前回の結果と検査済み位置を `health_check/` に保存し、次回は試行ログの追記された
+    行だけを検査する。追記された行がなく問題ファイルも変わっていなければ、前回の結果を
+    そのまま返す。問題ファイルは変更された場合だけ読み直す。試行の削除記録が
+    変わった場合や、試行ログが追記以外で変更された場合は全体を検査し直す。
+    孤立試行は件数をすべて数え、一覧は先頭の ORPHAN_LIST_LIMIT 件だけを返す。
 
-    problem_ids = set()
-    duplicate_problem_ids = set()
+    Args:
+        incremental: 前回の検査結果を使うかどうか(False の場合は全体を検査)
+        save: 結果と検査済み位置を保存するかどうか(False の場合はファイルを書き込まない)
+    """
+    result = HealthCheckResult()
+    data_dir = attempt_storage.data_dir
+    store = HealthCheckState(data_dir / HEALTH_CHECK_DIR_NAME)
+    state = store.load() if incremental else None
+
+    problem_signature = [
+        _file_signature(problem_storage.file_path),
+        _file_signature(problem_storage.tombstones.file_path),
+    ]
+    tombstone_signature = _file_signature(attempt_storage.tombstones.file_path)
+    if state is not None and state["attempt_tombstones"] != tombstone_signature:
+        state = None
 
+    # 問題データ（変更がなければ前回の結果を使う）
+    problem_ids: ProblemIdSet | None = None
+    problems_checked = True
     try:
-        with problem_storage.file_path.open(encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                pid = row.get("id", "")
-                if pid:
-                    if pid in problem_ids:
-                        duplicate_problem_ids.add(pid)
-                    problem_ids.add(pid)
-        result.total_problems = len(problem_ids)
-        result.duplicate_problem_ids = list(duplicate_problem_ids)
+        if state is not None and state["problems"] == problem_signature:
+            result.total_problems = state["total_problems"]
+            result.duplicate_problem_ids = state["duplicate_problem_ids"]
+        else:
+            problem_ids, result.duplicate_problem_ids = _check_problems(problem_storage)
+            result.total_problems = len(problem_ids)
     except Exception as e:
         print(f"問題データのチェックに失敗: {e}")
+        problem_ids = ProblemIdSet(np.empty(0, dtype=np.int64))
+        problems_checked = False
 
-    # 試行データの読み込み（生データ）
-    attempt_ids = set()
-    duplicate_attempt_ids = set()
-    orphaned_attempts = []
-    invalid_boolean_values = []
-
+    # 試行データ（追記された行だけを検査）
     try:
-        with attempt_storage.file_path.open(encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                aid = row.get("id", "")
-                pid = row.get("problem_id", "")
-                is_correct = row.get("is_correct", "")
-
-                # ID重複チェック
-                if aid:
-                    if aid in attempt_ids:
-                        duplicate_attempt_ids.add(aid)
-                    attempt_ids.add(aid)
-
-                # 外部キーチェック
-                if pid and pid not in problem_ids:
-                    orphaned_attempts.append((aid, pid))
-
-                # 真偽値チェック
-                if is_correct not in ["True", "False", "true", "false", "1", "0"]:
-                    invalid_boolean_values.append(aid)
-
-        result.total_attempts = len(attempt_ids)
+        attempt_files = attempt_storage.data_files()
+        offsets = _resume_offsets(state, attempt_files, data_dir)
+
+        if state is not None and offsets is not None:
+            existing_keys = state["attempt_ids"]
+            referenced = state["referenced_problem_ids"]
+            duplicate_attempt_ids = dict.fromkeys(state["duplicate_attempt_ids"])
+            orphans = _OrphanedAttempts(
+                [tuple(o) for o in state["orphaned_attempts"]],
+                state["orphan_problem_ids"],
+                state["orphan_counts"],
+            )
+            invalid_boolean_values = list(state["invalid_boolean_values"])
+            if problem_ids is None and all(
+                path.stat().st_size == offsets[path.relative_to(data_dir).as_posix()]
+                for path in attempt_files
+            ):
+                # 追記された行がなく問題ファイルも変わっていなければ、前回の結果を返す
+                result.total_attempts = len(existing_keys)
+                result.duplicate_attempt_ids = list(duplicate_attempt_ids)
+                result.orphaned_attempts = orphans.listed
+                result.orphan_count = orphans.count
+                result.invalid_boolean_values = invalid_boolean_values
+                return _judge(result)
+            if problem_ids is not None:
+                # 問題が削除されて新たに孤立した試行がある場合は全体を検査し直し、
+                # 問題が追加されて孤立でなくなった試行は件数と一覧から除く
+                problem_keys = _unique_keys(iter_problem_ids(problem_storage))
+                missing = referenced[~_in_sorted(problem_keys, referenced)]
+                if not _in_sorted(orphans.keys, missing).all():
+                    offsets = None
+                else:
+                    orphans.resolve(missing, problem_ids)
+        resumed = state is not None and offsets is not None
+        if state is None or offsets is None:
+            offsets = {path.relative_to(data_dir).as_posix(): 0 for path in attempt_files}
+            existing_keys = np.empty(0, dtype=np.uint64)
+            referenced = np.empty(0, dtype=np.uint64)
+            duplicate_attempt_ids = {}
+            orphans = _OrphanedAttempts(
+                [], np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)
+            )
+            invalid_boolean_values = []
+
+        deleted_attempts = None
+        # 追記分の試行IDは ORPHAN_BATCH_SIZE 件ずつハッシュに変換して持つ
+        id_chunks = [np.empty(0, dtype=np.uint64)]
+        batch_ids: list[str] = []
+        pending: list[tuple[str, str]] = []
+        references = _ReferencedProblems(referenced)
+        marks = {}
+        for attempt_file in attempt_files:
+            name = attempt_file.relative_to(data_dir).as_posix()
+            with attempt_file.open("rb") as f:
+                position = [0]
+                for aid, pid, is_correct in _iter_attempt_rows(f, offsets[name], position):
+                    if deleted_attempts is None:
+                        deleted_attempts = attempt_storage.tombstones.load()
+                    if problem_ids is None:
+                        problem_ids, _ = _check_problems(problem_storage)
+                    if aid in deleted_attempts:
+                        continue
+
+                    # ID重複チェック（ハッシュを集めて後でまとめて照合する）
+                    if aid:
+                        batch_ids.append(aid)
+                        if len(batch_ids) >= ORPHAN_BATCH_SIZE:
+                            id_chunks.append(id_keys(batch_ids))
+                            batch_ids = []
+
+                    # 外部キーチェック（まとめて問題IDの配列と照合する）
+                    if pid:
+                        pending.append((aid, pid))
+                        if len(pending) >= ORPHAN_BATCH_SIZE:
+                            orphans.add(find_orphans(problem_ids, pending))
+                            references.add(pending)
+                            pending = []
+
+                    # 真偽値チェック
+                    if is_correct not in VALID_BOOLEANS:
+                        invalid_boolean_values.append(aid)
+
+                marks[name] = {
+                    "inode": os.fstat(f.fileno()).st_ino,
+                    "offset": position[0],
+                    "tail_hash": _tail_hash(f, position[0]),
+                }
+
+        if pending and problem_ids is not None:
+            orphans.add(find_orphans(problem_ids, pending))
+            references.add(pending)
+        id_chunks.append(id_keys(batch_ids))
+        new_keys = np.concatenate(id_chunks)
+
+        # 追記分の中でハッシュが重なるIDと前回までの配列に含まれるIDを重複の候補とし、
+        # 候補がある場合だけ追記分を読み直して重複を確定する
+        sorted_keys = np.sort(new_keys)
+        candidate_keys = _sorted_unique(
+            np.concatenate(
+                (
+                    sorted_keys[1:][sorted_keys[1:] == sorted_keys[:-1]],
+                    new_keys[_in_sorted(existing_keys, new_keys)],
+                )
+            )
+        )
+        if len(candidate_keys) and deleted_attempts is not None:
+            ids = _appended_ids(attempt_files, data_dir, offsets, marks, deleted_attempts)
+            for aid in _duplicate_attempt_ids(ids, candidate_keys, existing_keys):
+                duplicate_attempt_ids[aid] = None
+        attempt_keys = _merge_sorted(existing_keys, sorted_keys)
+        referenced = references.merged()
+
+        result.total_attempts = len(attempt_keys)
         result.duplicate_attempt_ids = list(duplicate_attempt_ids)
-        result.orphaned_attempts = orphaned_attempts
+        result.orphaned_attempts = orphans.listed
+        result.orphan_count = orphans.count
         result.invalid_boolean_values = invalid_boolean_values
+
+        # 問題データを検査できなかった場合の結果は次回に引き継がない
+        if problems_checked and save:
+            saved = {
+                "files": marks,
+                "problems": problem_signature,
+                "attempt_tombstones": tombstone_signature,
+                "total_problems": result.total_problems,
+                "duplicate_problem_ids": result.duplicate_problem_ids,
+                "duplicate_attempt_ids": result.duplicate_attempt_ids,
+                "orphaned_attempts": result.orphaned_attempts,
+                "invalid_boolean_values": result.invalid_boolean_values,
+            }
+            if (
+                resumed
+                and state is not None
+                and not len(new_keys)
+                and len(referenced) == len(state["referenced_problem_ids"])
+                and len(orphans.keys) == len(state["orphan_problem_ids"])
+            ):
+                # 配列が変わっていなければ前回の配列をそのまま使う
+                store.save({**saved, "token": state["token"]}, None)
+            else:
+                store.save(
+                    saved,
+                    {
+                        "attempt_ids": attempt_keys,
+                        "referenced_problem_ids": referenced,
+                        "orphan_problem_ids": orphans.keys,
+                        "orphan_counts": orphans.counts,
+                    },
+                )
     except Exception as e:
         print(f"試行データのチェックに失敗: {e}")
+        app_logger.error(f"試行データのチェックに失敗: {e}")
 
-    # 問題の有無を判定
-    result.has_issues = bool(
-        result.duplicate_problem_ids
-        or result.duplicate_attempt_ids
-        or result.orphaned_attempts
-        or result.invalid_boolean_values
-    )
+    return _judge(result)
 
-    return result
+
+class HealthCheckRunner:
+    """
+    バックグラウンドでのヘルスチェック
+
+    データの版(問題ファイルと試行ログの世代番号)ごとに1回だけ検査し、結果を
+    保持する。検査中の版がある間は新たなスレッドを起動しない。版が変わった後の
+    要求で検査し直すため、表示側は `result` が現在の版のものかを `is_current`
+    で確かめる。
+    """
+
+    def __init__(self, problem_storage: ProblemStorage, attempt_storage: AttemptStorage):
+        self.problem_storage = problem_storage
+        self.attempt_storage = attempt_storage
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._result: HealthCheckResult | None = None
+        self._result_version: tuple[int, int] | None = None
+
+    def data_version(self) -> tuple[int, int]:
+        """(問題ファイルの世代番号, 試行ログの世代番号)"""
+        return self.problem_storage.generation, self.attempt_storage.generation
+
+    @property
+    def running(self) -> bool:
+        """検査スレッドが動作中か"""
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def result(self) -> HealthCheckResult | None:
+        """最後に完了した検査の結果(未完了なら None)"""
+        return self._result
+
+    @property
+    def is_current(self) -> bool:
+        """保持している結果が現在のデータの版のものか"""
+        return self._result is not None and self._result_version == self.data_version()
+
+    def request(self) -> bool:
+        """
+        現在のデータの版を検査していなければバックグラウンドで検査を開始
+
+        Returns:
+            bool: 検査を開始したかどうか
+        """
+        with self._lock:
+            version = self.data_version()
+            if self.running or self._result_version == version:
+                return False
+            self._thread = threading.Thread(
+                target=self._run, args=(version,), name="health-check", daemon=True
+            )
+            self._thread.start()
+        return True
+
+    def wait(self, timeout: float | None = None) -> HealthCheckResult | None:
+        """実行中の検査の完了を待って結果を返す"""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self._result
+
+    def _run(self, version: tuple[int, int]) -> None:
+        """検査スレッド本体"""
+        try:
+            result = run_health_check(self.problem_storage, self.attempt_storage)
+        except Exception as e:
+            app_logger.error(f"ヘルスチェックに失敗: {e}")
+            return
+        if result.has_issues:
+            app_logger.warning(result.get_summary())
+        with self._lock:
+            self._result = result
+            self._result_version = version
+
+
+_runners: dict[Path, HealthCheckRunner] = {}
+_runners_lock = threading.Lock()
+
+
+def start_health_check(
+    problem_storage: ProblemStorage, attempt_storage: AttemptStorage
+) -> HealthCheckRunner:
+    """
+    プロセス内で共有するヘルスチェックをバックグラウンドで開始
+
+    データディレクトリごとに1つのランナーを共有し、現在のデータの版を
+    まだ検査していない場合だけ検査を開始する。
+    """
+    data_dir = attempt_storage.data_dir.resolve()
+    with _runners_lock:
+        runner = _runners.get(data_dir)
+        if runner is None:
+            runner = HealthCheckRunner(problem_storage, attempt_storage)
+            _runners[data_dir] = runner
+    runner.request()
+    return runner
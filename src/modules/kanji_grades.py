@@ -0,0 +1,113 @@
+"""
+学年別漢字配当表(小学校)
+"""
+
+# 学年別漢字配当表(2020年度施行、1026字)。添字 i が第 i+1 学年
+GRADE_KANJI: tuple[str, ...] = (
+    # 第1学年(80字)
+    (
+        "一右雨円王音下火花貝学気九休玉金空月犬見五口校左三山子四糸字耳七車手十出女小上森"
+        "人水正生青夕石赤千川先早草足村大男竹中虫町天田土二日入年白八百文木本名目立力林六"
+    ),
+    # 第2学年(160字)
+    (
+        "引羽雲園遠何科夏家歌画回会海絵外角楽活間丸岩顔汽記帰弓牛魚京強教近兄形計元言原戸"
+        "古午後語工公広交光考行高黄合谷国黒今才細作算止市矢姉思紙寺自時室社弱首秋週春書少"
+        "場色食心新親図数西声星晴切雪船線前組走多太体台地池知茶昼長鳥朝直通弟店点電刀冬当"
+        "東答頭同道読内南肉馬売買麦半番父風分聞米歩母方北毎妹万明鳴毛門夜野友用曜来里理話"
+    ),
+    # 第3学年(200字)
+    (
+        "悪安暗医委意育員院飲運泳駅央横屋温化荷界開階寒感漢館岸起期客究急級宮球去橋業曲局"
+        "銀区苦具君係軽血決研県庫湖向幸港号根祭皿仕死使始指歯詩次事持式実写者主守取酒受州"
+        "拾終習集住重宿所暑助昭消商章勝乗植申身神真深進世整昔全相送想息速族他打対待代第題"
+        "炭短談着注柱丁帳調追定庭笛鉄転都度投豆島湯登等動童農波配倍箱畑発反坂板皮悲美鼻筆"
+        "氷表秒病品負部服福物平返勉放味命面問役薬由油有遊予羊洋葉陽様落流旅両緑礼列練路和"
+    ),
+    # 第4学年(202字)
+    (
+        "愛案以衣位茨印英栄媛塩岡億加果貨課芽賀改械害街各覚潟完官管関観願岐希季旗器機議求"
+        "泣給挙漁共協鏡競極熊訓軍郡群径景芸欠結建健験固功好香候康佐差菜最埼材崎昨札刷察参"
+        "産散残氏司試児治滋辞鹿失借種周祝順初松笑唱焼照城縄臣信井成省清静席積折節説浅戦選"
+        "然争倉巣束側続卒孫帯隊達単置仲沖兆低底的典伝徒努灯働特徳栃奈梨熱念敗梅博阪飯飛必"
+        "票標不夫付府阜富副兵別辺変便包法望牧末満未民無約勇要養浴利陸良料量輪類令冷例連老"
+        "労録"
+    ),
+    # 第5学年(193字)
+    (
+        "圧囲移因永営衛易益液演応往桜可仮価河過快解格確額刊幹慣眼紀基寄規喜技義逆久旧救居"
+        "許境均禁句型経潔件険検限現減故個護効厚耕航鉱構興講告混査再災妻採際在財罪殺雑酸賛"
+        "士支史志枝師資飼示似識質舎謝授修述術準序招証象賞条状常情織職制性政勢精製税責績接"
+        "設絶祖素総造像増則測属率損貸態団断築貯張停提程適統堂銅導得毒独任燃能破犯判版比肥"
+        "非費備評貧布婦武復複仏粉編弁保墓報豊防貿暴脈務夢迷綿輸余容略留領歴"
+    ),
+    # 第6学年(191字)
+    (
+        "胃異遺域宇映延沿恩我灰拡革閣割株干巻看簡危机揮貴疑吸供胸郷勤筋系敬警劇激穴券絹権"
+        "憲源厳己呼誤后孝皇紅降鋼刻穀骨困砂座済裁策冊蚕至私姿視詞誌磁射捨尺若樹収宗就衆従"
+        "縦縮熟純処署諸除承将傷障蒸針仁垂推寸盛聖誠舌宣専泉洗染銭善奏窓創装層操蔵臓存尊退"
+        "宅担探誕段暖値宙忠著庁頂腸潮賃痛敵展討党糖届難乳認納脳派拝背肺俳班晩否批秘俵腹奮"
+        "並陛閉片補暮宝訪亡忘棒枚幕密盟模訳郵優預幼欲翌乱卵覧裏律臨朗論"
+    ),
+)
+
+GRADES = tuple(range(1, len(GRADE_KANJI) + 1))
+# 配当表にない漢字(中学校以降で習う漢字)の学年
+SECONDARY_GRADE = len(GRADE_KANJI) + 1
+
+# CJK統合漢字(U+4E00〜U+9FFF)の符号位置 -> 学年(配当表にない文字は0)。
+# import 時に1回だけ作成し、1文字あたり配列の参照1回で学年を引く
+_CJK_START = 0x4E00
+_CJK_END = 0x9FFF
+
+
+def _build_grade_table() -> bytes:
+    """符号位置で引く学年表を作成"""
+    table = bytearray(_CJK_END - _CJK_START + 1)
+    for grade, kanji in enumerate(GRADE_KANJI, start=1):
+        for char in kanji:
+            table[ord(char) - _CJK_START] = grade
+    return bytes(table)
+
+
+_GRADE_TABLE = _build_grade_table()
+
+
+def grade_of(char: str) -> int | None:
+    """
+    漢字1文字の配当学年を取得
+
+    Returns:
+        int | None: 1〜6、配当表にない漢字は SECONDARY_GRADE、漢字でない文字は None
+    """
+    offset = ord(char) - _CJK_START
+    if not 0 <= offset <= _CJK_END - _CJK_START:
+        return None
+    return _GRADE_TABLE[offset] or SECONDARY_GRADE
+
+
+def kanji_for_grade(grade: int) -> str:
+    """学年で習う漢字を取得"""
+    if grade not in GRADES:
+        msg = f"不正な学年です: {grade}"
+        raise ValueError(msg)
+    return GRADE_KANJI[grade - 1]
+
+
+def text_grade(text: str) -> int | None:
+    """
+    テキストに含まれる漢字の最も高い配当学年を取得
+
+    Returns:
+        int | None: 漢字を含まない場合は None
+    """
+    return max((g for g in map(grade_of, text) if g is not None), default=None)
+
+
+def is_within_grade(text: str, grade: int) -> bool:
+    """テキストの漢字がすべて指定した学年までに習う漢字かどうか"""
+    for char in text:
+        char_grade = grade_of(char)
+        if char_grade is not None and char_grade > grade:
+            return False
+    return True
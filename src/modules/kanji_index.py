@@ -0,0 +1,137 @@
+"""
+漢字ごとの転置索引と苦手漢字の集計
+"""
+
+import heapq
+from dataclasses import dataclass
+
+from .models import Problem
+from .storage import AttemptStorage, ProblemStorage
+from .utils import extract_kanji
+
+
+@dataclass
+class KanjiStats:
+    """漢字1文字ごとの集計"""
+
+    kanji: str
+    problem_count: int
+    total_count: int
+    correct_count: int
+
+    @property
+    def incorrect_count(self) -> int:
+        """不正解数"""
+        return self.total_count - self.correct_count
+
+    @property
+    def accuracy(self) -> float:
+        """正答率(試行がない場合は1.0)"""
+        return self.correct_count / self.total_count if self.total_count else 1.0
+
+
+class KanjiIndex:
+    """
+    漢字 -> 問題ID の転置索引
+
+    問題の answer_kanji を漢字1文字ずつに分け、漢字ごとに含まれる問題IDを登録順に持つ。
+    「創を含む問題」は該当する問題だけを辿るため、結果の件数に比例した時間で取得できる。
+    漢字ごとの試行数・正解数は、その漢字を含む問題の集計を合算して求める。
+    """
+
+    def __init__(
+        self,
+        problems: list[Problem],
+        problem_counts: dict[str, tuple[int, int]] | None = None,
+    ):
+        """
+        Args:
+            problems: 問題一覧
+            problem_counts: 問題ID -> (試行数, 正解数)
+        """
+        self.problems = {p.id: p for p in problems}
+        self._postings: dict[str, list[str]] = {}
+        self._stats: dict[str, KanjiStats] = {}
+        counts = problem_counts or {}
+
+        for problem in self.problems.values():
+            total, correct = counts.get(problem.id, (0, 0))
+            # 同じ漢字を2回含む問題も1回として数える
+            for kanji in dict.fromkeys(extract_kanji(problem.answer_kanji)):
+                self._postings.setdefault(kanji, []).append(problem.id)
+                stats = self._stats.get(kanji)
+                if stats is None:
+                    stats = self._stats[kanji] = KanjiStats(kanji, 0, 0, 0)
+                stats.problem_count += 1
+                stats.total_count += total
+                stats.correct_count += correct
+
+    @classmethod
+    def from_storage(
+        cls,
+        problem_storage: ProblemStorage,
+        attempt_storage: AttemptStorage,
+        problems: list[Problem] | None = None,
+    ) -> "KanjiIndex":
+        """
+        保存済みの問題と試行の日別集計から索引を作成
+
+        Args:
+            problems: 索引に含める問題(省略時は保存済みの問題すべて)
+        """
+        counts: dict[str, tuple[int, int]] = {}
+        if attempt_storage.ensure_rollups():
+            for rollup in attempt_storage.rollups.load_problems():
+                total, correct = counts.get(rollup.key, (0, 0))
+                counts[rollup.key] = (total + rollup.total_count, correct + rollup.correct_count)
+        if problems is None:
+            problems = problem_storage.load_problems()
+        return cls(problems, counts)
+
+    @property
+    def kanji(self) -> list[str]:
+        """索引に含まれる漢字一覧"""
+        return list(self._postings)
+
+    def problem_ids_with(self, kanji: str) -> list[str]:
+        """漢字を含む問題IDを取得"""
+        return list(self._postings.get(kanji, ()))
+
+    def problems_with(self, kanji: str) -> list[Problem]:
+        """漢字を含む問題を取得"""
+        return [self.problems[problem_id] for problem_id in self._postings.get(kanji, ())]
+
+    def stats(self, kanji: str) -> KanjiStats | None:
+        """漢字の集計を取得"""
+        return self._stats.get(kanji)
+
+    def weakest(self, n: int = 20) -> list[KanjiStats]:
+        """
+        苦手な漢字を上位 n 件取得
+
+        不正解のある漢字を、正答率の低い順(同率の場合は試行数の多い順)に並べる。
+        """
+        candidates = (s for s in self._stats.values() if s.incorrect_count > 0)
+        return heapq.nsmallest(n, candidates, key=lambda s: (s.accuracy, -s.total_count, s.kanji))
+
+    def problems_for_weakest(self, count: int) -> list[Problem]:
+        """
+        苦手な漢字を中心に問題を選ぶ
+
+        苦手な漢字の順に、その漢字を含む問題を不正解数の多い順に1問ずつ選ぶ。
+        1周で足りない場合は同じ順で2問目以降を選ぶ。
+        """
+        queues = [
+            sorted(self.problems_with(s.kanji), key=lambda p: p.incorrect_count, reverse=True)
+            for s in self.weakest(len(self._stats))
+        ]
+        selected: dict[str, Problem] = {}
+        depth = 0
+        while len(selected) < count and any(depth < len(q) for q in queues):
+            for queue in queues:
+                if depth < len(queue) and queue[depth].id not in selected:
+                    selected[queue[depth].id] = queue[depth]
+                    if len(selected) >= count:
+                        break
+            depth += 1
+        return list(selected.values())
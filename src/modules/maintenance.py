@@ -0,0 +1,399 @@
+"""
+データのメンテナンス(重複の解消・孤立試行の削除・検証)
+"""
+
+import array
+import csv
+import tempfile
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from .attempt_segments import open_segment
+from .file_lock import LockedFile
+from .health_check import (
+    ORPHAN_BATCH_SIZE,
+    HealthCheckResult,
+    ProblemIdSet,
+    iter_problem_ids,
+    run_health_check,
+)
+from .logger import app_logger
+from .offset_index import OffsetIndex
+from .storage import PROBLEM_HEADER, AttemptStorage, ProblemStorage
+from .tombstones import is_tombstoned
+
+# 進捗を報告する行数の間隔
+PROGRESS_INTERVAL = 100_000
+
+RowFilter = Callable[[Iterator[list[str]]], Iterator[list[str]]]
+
+
+@dataclass
+class MaintenanceResult:
+    """メンテナンスの結果(dry-run の場合は変更する予定の内容)"""
+
+    scanned: int = 0
+    removed: int = 0
+    merged: int = 0
+    rewritten: list[str] = field(default_factory=list)
+
+
+def _duplicate_keys(keys: array.array) -> ProblemIdSet:
+    """ハッシュの配列から2回以上現れるものを取り出す"""
+    values = np.frombuffer(keys, dtype=np.int64).copy()
+    values.sort()
+    return ProblemIdSet(np.unique(values[1:][values[1:] == values[:-1]]))
+
+
+def _to_int(value: str) -> int:
+    """整数に変換(変換できない値は 0)"""
+    try:
+        return int(value)
+    except ValueError:
+        return 0
+
+
+def _batches(rows: Iterator[list[str]], size: int) -> Iterator[list[list[str]]]:
+    """行を size 件ずつにまとめる"""
+    batch: list[list[str]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _referenced(batch: list[list[str]], pid_idx: int, problem_ids: ProblemIdSet) -> list[list[str]]:
+    """存在する問題を参照する行(problem_id が空の行を含む)だけを返す"""
+    pids = [row[pid_idx] for row in batch]
+    found = problem_ids.contains(pids)
+    return [row for row, pid, ok in zip(batch, pids, found, strict=True) if ok or not pid]
+
+
+def _drop_indexes(drop: set[int]) -> RowFilter:
+    """指定した行番号の行を取り除くフィルタ"""
+    return lambda rows: (row for index, row in enumerate(rows) if index not in drop)
+
+
+def _drop_orphans(pid_idx: int, problem_ids: ProblemIdSet) -> RowFilter:
+    """存在しない問題を参照する行を取り除くフィルタ"""
+    return lambda rows: (
+        row
+        for batch in _batches(rows, ORPHAN_BATCH_SIZE)
+        for row in _referenced(batch, pid_idx, problem_ids)
+    )
+
+
+class DataMaintenance:
+    """
+    問題・試行データのメンテナンス
+
+    ファイルは1行ずつ読み込み、IDは8バイトのハッシュの配列だけを保持する。
+    ハッシュが重複したIDだけを2回目の読み込みで照合するため、データファイルより
+    小さいメモリで動作する。書き換えは一時ファイル経由のアトミックな置換で行い、
+    対象ファイルのロックを保持したまま世代番号を進める。試行は attempts.csv と
+    封印済みセグメントが対象で、圧縮アーカイブは変更しない。
+    """
+
+    def __init__(
+        self,
+        data_dir: str = "data",
+        *,
+        dry_run: bool = False,
+        progress: Callable[[str, int], None] | None = None,
+    ):
+        """
+        Args:
+            data_dir: データディレクトリのパス
+            dry_run: 変更内容を数えるだけでファイルを書き換えないかどうか
+                (ストレージも読み取り専用で開き、列の追加やセグメント分割を行わない)
+            progress: (対象ファイル名, 読み込んだ行数) を受け取る進捗の通知先
+        """
+        self.data_dir = Path(data_dir)
+        self.dry_run = dry_run
+        self.progress = progress
+        self.problem_storage = ProblemStorage(data_dir, read_only=dry_run)
+        self.attempt_storage = AttemptStorage(data_dir, read_only=dry_run)
+
+    @contextmanager
+    def _open_rows(self, path: Path) -> Iterator[tuple[list[str], Iterator[list[str]]]]:
+        """CSVを開いて (ヘッダ, 空行を除いた行のイテレータ) を返す"""
+        with open_segment(path) as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            yield header, self._counted(path.name, reader, len(header))
+
+    def _counted(self, label: str, reader: Iterator[list[str]], width: int) -> Iterator[list[str]]:
+        """列数を揃えながら行を返し、PROGRESS_INTERVAL 行ごとに進捗を通知"""
+        count = 0
+        for row in reader:
+            if not row:
+                continue
+            if len(row) < width:
+                row.extend([""] * (width - len(row)))
+            count += 1
+            if self.progress is not None and count % PROGRESS_INTERVAL == 0:
+                self.progress(label, count)
+            yield row
+        if self.progress is not None and count % PROGRESS_INTERVAL:
+            self.progress(label, count)
+
+    def dedupe_problems(self, *, merge_counts: bool = False) -> MaintenanceResult:
+        """
+        problems.csv の重複IDを解消し、削除記録を反映する
+
+        アプリの読み込みと同じく created_at が最新の行を残す(同じ場合は先の行)。
+        merge_counts の場合は残す行の incorrect_count を重複した行の合計にする。
+        空の incorrect_count は 0 で補う。
+        """
+        storage = self.problem_storage
+        path = storage.file_path
+        result = MaintenanceResult()
+
+        with storage.lock.exclusive() as locked:
+            tombstones = storage.tombstones.load()
+
+            def is_live(row: list[str]) -> bool:
+                """IDがあり削除記録のない行かどうか"""
+                row_id = row[id_idx]
+                return bool(row_id) and not is_tombstoned(tombstones, row_id, row[created_idx])
+
+            # 1回目: IDのハッシュを集め、列の補正が必要かどうかを調べる
+            keys = array.array("q")
+            with self._open_rows(path) as (header, rows):
+                columns = {name: i for i, name in enumerate(header)}
+                id_idx = columns["id"]
+                created_idx = columns["created_at"]
+                count_idx = columns.get("incorrect_count")
+                needs_rewrite = bool(tombstones) or header != PROBLEM_HEADER
+                for row in rows:
+                    result.scanned += 1
+                    if not is_live(row):
+                        continue
+                    keys.append(hash(row[id_idx]))
+                    if count_idx is None or not row[count_idx]:
+                        needs_rewrite = True
+            live_count = len(keys)
+            candidates = _duplicate_keys(keys)
+            del keys
+
+            # 2回目: 重複候補のIDだけを照合し、残す行と incorrect_count の合計を決める
+            winners: dict[str, list] = {}
+            if len(candidates):
+                with self._open_rows(path) as (_, rows):
+                    for index, row in enumerate(rows):
+                        row_id = row[id_idx]
+                        if row_id not in candidates or not is_live(row):
+                            continue
+                        count = _to_int(row[count_idx]) if count_idx is not None else 0
+                        winner = winners.get(row_id)
+                        if winner is None:
+                            winners[row_id] = [index, row[created_idx], count, 1]
+                            continue
+                        winner[2] += count
+                        winner[3] += 1
+                        if row[created_idx] > winner[1]:
+                            winner[0], winner[1] = index, row[created_idx]
+            duplicated = {
+                row_id: (index, total)
+                for row_id, (index, _, total, occurrences) in winners.items()
+                if occurrences > 1
+            }
+            losers = sum(winners[row_id][3] - 1 for row_id in duplicated)
+            result.removed = result.scanned - (live_count - losers)
+            result.merged = len(duplicated) if merge_counts else 0
+            if not (needs_rewrite or result.removed):
+                return result
+            result.rewritten.append(path.name)
+            if self.dry_run:
+                return result
+
+            # 3回目: 残す行だけを現在の列構成で書き出す
+            def kept_rows(rows: Iterator[list[str]]) -> Iterator[list[str]]:
+                """書き出す行を現在の列構成で返す"""
+                for index, row in enumerate(rows):
+                    if not is_live(row):
+                        continue
+                    values = [row[columns[c]] if c in columns else "" for c in PROBLEM_HEADER]
+                    winner = duplicated.get(row[id_idx])
+                    if winner is not None:
+                        if winner[0] != index:
+                            continue
+                        if merge_counts:
+                            values[-1] = str(winner[1])
+                    values[-1] = values[-1] or "0"
+                    yield values
+
+            self._rewrite(path, kept_rows, PROBLEM_HEADER)
+            # 削除済みの行は書き込まれていないため、削除記録は不要になる
+            storage.tombstones.clear()
+            locked.bump_generation()
+
+        app_logger.info(f"問題の重複を解消: {result.removed}行を削除")
+        return result
+
+    def dedupe_attempts(self) -> MaintenanceResult:
+        """
+        試行の重複IDを解消する
+
+        アプリの読み込みと同じく後に書かれた行(新しいセグメント、最後に attempts.csv)を残す。
+        """
+        storage = self.attempt_storage
+        result = MaintenanceResult()
+
+        with storage.lock.exclusive() as locked:
+            files = storage.data_files()
+
+            # 1回目: IDのハッシュを集める
+            keys = array.array("q")
+            for path in files:
+                with self._open_rows(path) as (header, rows):
+                    id_idx = header.index("id")
+                    for row in rows:
+                        result.scanned += 1
+                        if row[id_idx]:
+                            keys.append(hash(row[id_idx]))
+            candidates = _duplicate_keys(keys)
+            del keys
+
+            # 2回目: 重複候補のIDだけを照合し、最後の出現以外を取り除く
+            occurrences: dict[str, list[tuple[int, int]]] = {}
+            if len(candidates):
+                for file_idx, path in enumerate(files):
+                    with self._open_rows(path) as (header, rows):
+                        id_idx = header.index("id")
+                        for index, row in enumerate(rows):
+                            if row[id_idx] and row[id_idx] in candidates:
+                                occurrences.setdefault(row[id_idx], []).append((file_idx, index))
+            drops: dict[int, set[int]] = {}
+            for places in occurrences.values():
+                for file_idx, index in places[:-1]:
+                    drops.setdefault(file_idx, set()).add(index)
+            result.removed = sum(len(drop) for drop in drops.values())
+
+            self._rewrite_attempt_files(
+                locked, {files[i]: _drop_indexes(drop) for i, drop in sorted(drops.items())}, result
+            )
+
+        app_logger.info(f"試行の重複を解消: {result.removed}行を削除")
+        return result
+
+    def drop_orphans(self) -> MaintenanceResult:
+        """存在しない問題を参照する試行を削除する(problem_id が空の行は対象外)"""
+        result = MaintenanceResult()
+
+        with (
+            self.problem_storage.lock.shared(),
+            self.attempt_storage.lock.exclusive() as locked,
+        ):
+            problem_ids = ProblemIdSet.from_ids(iter_problem_ids(self.problem_storage))
+            filters: dict[Path, RowFilter] = {}
+            for path in self.attempt_storage.data_files():
+                with self._open_rows(path) as (header, rows):
+                    pid_idx = header.index("problem_id")
+                    removed = 0
+                    for batch in _batches(rows, ORPHAN_BATCH_SIZE):
+                        result.scanned += len(batch)
+                        removed += len(batch) - len(_referenced(batch, pid_idx, problem_ids))
+                if removed:
+                    result.removed += removed
+                    filters[path] = _drop_orphans(pid_idx, problem_ids)
+
+            self._rewrite_attempt_files(locked, filters, result)
+
+        app_logger.info(f"孤立試行を削除: {result.removed}行")
+        return result
+
+    def verify(self) -> HealthCheckResult:
+        """データ全体を検査する(前回の検査結果は使わず、検査結果も保存しない)"""
+        return run_health_check(
+            self.problem_storage, self.attempt_storage, incremental=False, save=False
+        )
+
+    def _rewrite(
+        self,
+        path: Path,
+        keep: RowFilter,
+        header: list[str] | None = None,
+        at_column: str | None = None,
+    ) -> tuple[int, str, str]:
+        """
+        keep が返す行を一時ファイルに書き出してアトミックに置き換える
+
+        Args:
+            header: 書き出すヘッダ(省略時は元のヘッダ)
+            at_column: 最小値・最大値を求める列
+
+        Returns:
+            (書き込んだ行数, at_column 列の最小値, 最大値)
+        """
+        count = 0
+        low = high = ""
+        tmp_path = None
+        try:
+            with tempfile.NamedTemporaryFile(
+                mode="w",
+                newline="",
+                encoding="utf-8",
+                delete=False,
+                dir=path.parent,
+                suffix=".tmp",
+            ) as tmp_file:
+                tmp_path = Path(tmp_file.name)
+                with self._open_rows(path) as (source_header, rows):
+                    at_idx = source_header.index(at_column) if at_column else None
+                    writer = csv.writer(tmp_file)
+                    writer.writerow(header or source_header)
+                    for row in keep(rows):
+                        writer.writerow(row)
+                        count += 1
+                        if at_idx is not None:
+                            low = row[at_idx] if count == 1 else min(low, row[at_idx])
+                            high = max(high, row[at_idx])
+            tmp_path.replace(path)
+        except BaseException:
+            if tmp_path is not None:
+                tmp_path.unlink(missing_ok=True)
+            raise
+        return count, low, high
+
+    def _rewrite_attempt_files(
+        self, locked: LockedFile, filters: dict[Path, RowFilter], result: MaintenanceResult
+    ) -> None:
+        """
+        試行ログのファイルを書き換え、セグメントのマニフェストを更新する
+
+        空になったセグメントはマニフェストから外してから削除する。日別集計は
+        世代番号が進むため、次回の参照時に作り直される。
+        """
+        result.rewritten.extend(path.name for path in filters)
+        if self.dry_run or not filters:
+            return
+
+        segments_store = self.attempt_storage.segments
+        active_month, segments = segments_store.load_manifest()
+        by_path = {segments_store.segment_path(s): s for s in segments}
+        emptied = []
+        for path, keep in filters.items():
+            count, low, high = self._rewrite(path, keep, at_column="attempted_at")
+            segment = by_path.get(path)
+            if segment is None:
+                continue
+            if count:
+                segment.rows = count
+                segment.min_attempted_at = low
+                segment.max_attempted_at = high
+            else:
+                segments.remove(segment)
+                emptied.append(path)
+        segments_store.save_manifest(active_month, segments)
+        for path in emptied:
+            path.unlink(missing_ok=True)
+            OffsetIndex(path).remove()
+        locked.bump_generation()
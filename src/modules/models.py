@@ -2,22 +2,97 @@
 データクラス・型定義・ID採番
 """
 
+import os
+import secrets
+import threading
+import time
 import uuid
 from dataclasses import dataclass
 from datetime import datetime
 
 from .utils import normalize_reading
 
+# ID採番方式を切り替える環境変数(uuid4 が既定、uuid7 で時刻順のIDになる)
+ID_SCHEME_ENV = "KANJI_ID_SCHEME"
+
+_uuid7_lock = threading.Lock()
+_uuid7_last_ms = 0
+_uuid7_counter = 0
+
+
+def uuid7() -> uuid.UUID:
+    """
+    UUIDv7(RFC 9562)を生成
+
+    先頭48ビットがUnix時刻(ミリ秒)のため、文字列としても生成順に並ぶ。
+    同一ミリ秒内では12ビットのカウンタで単調増加を保証する。
+    """
+    global _uuid7_last_ms, _uuid7_counter  # noqa: PLW0603
+    with _uuid7_lock:
+        unix_ms = time.time_ns() // 1_000_000
+        if unix_ms <= _uuid7_last_ms:
+            unix_ms = _uuid7_last_ms
+            _uuid7_counter += 1
+            if _uuid7_counter > 0xFFF:
+                # カウンタが溢れた場合は時刻を1ミリ秒進める
+                unix_ms += 1
+                _uuid7_counter = 0
+        else:
+            # 同一ミリ秒内の採番数に余裕を残すため、初期値は上位ビットを0にする
+            _uuid7_counter = secrets.randbits(11)
+        _uuid7_last_ms = unix_ms
+        counter = _uuid7_counter
+
+    value = (unix_ms & 0xFFFF_FFFF_FFFF) << 80
+    value |= 0x7 << 76
+    value |= counter << 64
+    value |= 0b10 << 62
+    value |= secrets.randbits(62)
+    return uuid.UUID(int=value)
+
+
+def generate_id() -> str:
+    """
+    問題・試行のIDを採番
+
+    環境変数 KANJI_ID_SCHEME=uuid7 の場合は時刻順に並ぶUUIDv7を、
+    それ以外は従来どおりUUIDv4を返す。既存のUUIDv4のIDとはそのまま混在できる。
+    """
+    if os.getenv(ID_SCHEME_ENV, "uuid4").lower() == "uuid7":
+        return str(uuid7())
+    return str(uuid.uuid4())
+
+
+def _to_iso(value: datetime | str) -> tuple[str, datetime | None]:
+    """日時をISO文字列と(解析済みであれば)datetimeの組に変換"""
+    if isinstance(value, str):
+        return value, None
+    return value.isoformat(), value
+
+
+def parse_incorrect_count(value: int | str) -> int:
+    """不正解数を整数に変換(解析できない値は0、最低値は0)"""
+    try:
+        count = int(value)
+    except (TypeError, ValueError):
+        count = 0
+    return max(0, count)
+
 
 @dataclass
 class Problem:
-    """問題データの管理"""
+    """
+    問題データの管理
+
+    created_at はISO文字列(created_at_iso)のまま保持し、datetime への変換は
+    初回アクセス時に行う。並べ替えや範囲の比較には created_at_iso を使う。
+    """
 
     id: str
     sentence: str
     answer_kanji: str
     reading: str
-    created_at: datetime
+    created_at_iso: str
     incorrect_count: int
 
     def __init__(
@@ -26,19 +101,27 @@ class Problem:
         answer_kanji: str,
         reading: str,
         id: str | None = None,
-        created_at: datetime | None = None,
+        created_at: datetime | str | None = None,
         incorrect_count: int | str = 1,
     ):
-        self.id = id or str(uuid.uuid4())
+        self.id = id or generate_id()
         self.sentence = sentence
         self.answer_kanji = answer_kanji
         self.reading = normalize_reading(reading)
+        self._created_at: datetime | None = None
         self.created_at = created_at or datetime.now()
-        try:
-            ic = int(incorrect_count)
-        except (TypeError, ValueError):
-            ic = 0
-        self.incorrect_count = max(0, ic)  # 最低値は0
+        self.incorrect_count = parse_incorrect_count(incorrect_count)
+
+    @property
+    def created_at(self) -> datetime:
+        """作成日時(初回アクセス時に解析)"""
+        if self._created_at is None:
+            self._created_at = datetime.fromisoformat(self.created_at_iso)
+        return self._created_at
+
+    @created_at.setter
+    def created_at(self, value: datetime | str) -> None:
+        self.created_at_iso, self._created_at = _to_iso(value)
 
     def increment_incorrect_count(self) -> None:
         """不正解数を1増やす"""
@@ -55,7 +138,7 @@ class Problem:
             "sentence": self.sentence,
             "answer_kanji": self.answer_kanji,
             "reading": self.reading,
-            "created_at": self.created_at.isoformat(),
+            "created_at": self.created_at_iso,
             "incorrect_count": self.incorrect_count,
         }
 
@@ -67,7 +150,7 @@ class Problem:
             sentence=data["sentence"],
             answer_kanji=data["answer_kanji"],
             reading=data["reading"],
-            created_at=datetime.fromisoformat(data["created_at"]),
+            created_at=data["created_at"],
             incorrect_count=int(
                 data.get("incorrect_count", 0) or 0
             ),  # 後方互換性のためデフォルト値0
@@ -76,15 +159,20 @@ class Problem:
 
 @dataclass
 class Attempt:
-    """試行データの管理"""
+    """
+    試行データの管理
+
+    attempted_at と timestamp はISO文字列のまま保持し、datetime への変換は
+    初回アクセス時に行う。並べ替えや範囲の比較には attempted_at_iso を使う。
+    """
 
     id: str
     problem_id: str
-    attempted_at: datetime
+    attempted_at_iso: str
     is_correct: bool
     mistake_type: str
     learning_memo: str
-    timestamp: datetime
+    timestamp_iso: str
 
     def __init__(
         self,
@@ -93,27 +181,51 @@ class Attempt:
         mistake_type: str = "なし",
         learning_memo: str = "",
         id: str | None = None,
-        attempted_at: datetime | None = None,
-        timestamp: datetime | None = None,
+        attempted_at: datetime | str | None = None,
+        timestamp: datetime | str | None = None,
     ):
-        self.id = id or str(uuid.uuid4())
+        self.id = id or generate_id()
         self.problem_id = problem_id
+        self._attempted_at: datetime | None = None
+        self._timestamp: datetime | None = None
         self.attempted_at = attempted_at or datetime.now()
         self.is_correct = is_correct
         self.mistake_type = mistake_type
         self.learning_memo = learning_memo
         self.timestamp = timestamp or datetime.now()
 
+    @property
+    def attempted_at(self) -> datetime:
+        """試行日時(初回アクセス時に解析)"""
+        if self._attempted_at is None:
+            self._attempted_at = datetime.fromisoformat(self.attempted_at_iso)
+        return self._attempted_at
+
+    @attempted_at.setter
+    def attempted_at(self, value: datetime | str) -> None:
+        self.attempted_at_iso, self._attempted_at = _to_iso(value)
+
+    @property
+    def timestamp(self) -> datetime:
+        """記録日時(初回アクセス時に解析)"""
+        if self._timestamp is None:
+            self._timestamp = datetime.fromisoformat(self.timestamp_iso)
+        return self._timestamp
+
+    @timestamp.setter
+    def timestamp(self, value: datetime | str) -> None:
+        self.timestamp_iso, self._timestamp = _to_iso(value)
+
     def to_dict(self) -> dict:
         """辞書形式に変換"""
         return {
             "id": self.id,
             "problem_id": self.problem_id,
-            "attempted_at": self.attempted_at.isoformat(),
+            "attempted_at": self.attempted_at_iso,
             "is_correct": self.is_correct,
             "mistake_type": self.mistake_type,
             "learning_memo": self.learning_memo,
-            "timestamp": self.timestamp.isoformat(),
+            "timestamp": self.timestamp_iso,
         }
 
     @classmethod
@@ -125,8 +237,33 @@ class Attempt:
             is_correct=data["is_correct"] == "True"
             if isinstance(data["is_correct"], str)
             else bool(data["is_correct"]),
-            attempted_at=datetime.fromisoformat(data["attempted_at"]),
+            attempted_at=data["attempted_at"],
             mistake_type=data.get("mistake_type", "なし"),
             learning_memo=data.get("learning_memo", ""),
-            timestamp=datetime.fromisoformat(data.get("timestamp", data["attempted_at"])),
+            timestamp=data.get("timestamp") or data["attempted_at"],
         )
+
+    @classmethod
+    def from_stored(
+        cls,
+        *,
+        id: str,
+        problem_id: str,
+        attempted_at: str,
+        is_correct: bool,
+        mistake_type: str,
+        learning_memo: str,
+        timestamp: str,
+    ) -> "Attempt":
+        """保存済みの値から作成(一括読み込み用。__init__ の既定値処理を省く)"""
+        attempt = cls.__new__(cls)
+        attempt.id = id
+        attempt.problem_id = problem_id
+        attempt.attempted_at_iso = attempted_at
+        attempt._attempted_at = None
+        attempt.is_correct = is_correct
+        attempt.mistake_type = mistake_type
+        attempt.learning_memo = learning_memo
+        attempt.timestamp_iso = timestamp
+        attempt._timestamp = None
+        return attempt
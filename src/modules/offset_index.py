@@ -0,0 +1,171 @@
+"""
+IDから行のバイト位置を引くオフセット索引
+"""
+
+import csv
+import hashlib
+import mmap
+import struct
+import tempfile
+from collections.abc import Iterator
+from pathlib import Path
+from typing import BinaryIO
+
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"KTGIDX02"
+
+# 索引ヘッダはマジック、データファイルのサイズ、更新時刻ns、inode、件数を各8バイトで格納する
+_HEADER = struct.Struct(">8sQQQQ")
+# 各レコードはIDのハッシュと行の先頭バイト位置を各8バイトで格納する
+_RECORD = struct.Struct(">8sQ")
+
+
+def index_path_for(data_path: Path) -> Path:
+    """データファイルに対応する索引ファイルのパスを取得"""
+    return data_path.with_name(data_path.name + INDEX_SUFFIX)
+
+
+def _id_key(record_id: str) -> bytes:
+    """IDを固定長(8バイト)のキーに変換"""
+    return hashlib.blake2b(record_id.encode("utf-8"), digest_size=8).digest()
+
+
+def _decoded_lines(f: BinaryIO, position: list[int]) -> Iterator[str]:
+    """バイナリファイルを1行ずつ復号し、読み終えたバイト位置を position[0] に記録"""
+    for raw in f:
+        position[0] += len(raw)
+        yield raw.decode("utf-8")
+
+
+class OffsetIndex:
+    """
+    CSVデータファイルのオフセット索引
+
+    `<データファイル名>.idx` にIDのハッシュと行の先頭バイト位置の組をキー順に格納し、
+    mmap した索引を二分探索して該当行だけを読み込む。ハッシュの衝突や同一IDの重複行が
+    あり得るため、読み込んだ行のIDを照合して返す。索引にはデータファイルのサイズと
+    更新時刻、inode を記録し、一致しなくなった時点で自動的に再構築する。
+    ロックは呼び出し側がデータファイルのロックで取得する。
+    """
+
+    def __init__(self, data_path: Path):
+        """
+        Args:
+            data_path: 索引を作成するCSVデータファイルのパス
+        """
+        self.data_path = Path(data_path)
+        self.index_path = index_path_for(self.data_path)
+
+    def find_rows(self, record_id: str) -> tuple[list[str], list[list[str]]]:
+        """
+        IDが一致する行をファイル内の出現順に取得
+
+        Returns:
+            tuple: (ヘッダ, 一致した行のリスト)
+        """
+        offsets = self.lookup(record_id)
+        if not offsets:
+            return [], []
+
+        with self.data_path.open("rb") as f:
+            header = next(csv.reader(_decoded_lines(f, [0])), [])
+            id_idx = header.index("id")
+            rows = []
+            for offset in sorted(offsets):
+                f.seek(offset)
+                row = next(csv.reader(_decoded_lines(f, [offset])), [])
+                if len(row) > id_idx and row[id_idx] == record_id:
+                    rows.append(row)
+        return header, rows
+
+    def lookup(self, record_id: str) -> list[int]:
+        """IDのハッシュが一致する行の先頭バイト位置を取得(必要に応じて索引を再構築)"""
+        if not self.data_path.exists():
+            return []
+        if not self._is_current():
+            self.rebuild()
+
+        key = _id_key(record_id)
+        with (
+            self.index_path.open("rb") as f,
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm,
+        ):
+            *_, count = _HEADER.unpack_from(mm, 0)
+
+            # キー以上となる最初のレコードを二分探索
+            low, high = 0, count
+            while low < high:
+                mid = (low + high) // 2
+                if mm[self._record_pos(mid) : self._record_pos(mid) + 8] < key:
+                    low = mid + 1
+                else:
+                    high = mid
+
+            offsets = []
+            while low < count:
+                record_key, offset = _RECORD.unpack_from(mm, self._record_pos(low))
+                if record_key != key:
+                    break
+                offsets.append(offset)
+                low += 1
+        return offsets
+
+    def rebuild(self) -> None:
+        """データファイルを走査して索引をアトミックに書き直す"""
+        stat = self.data_path.stat()
+        records = []
+        with self.data_path.open("rb") as f:
+            position = [0]
+            reader = csv.reader(_decoded_lines(f, position))
+            header = next(reader, [])
+            id_idx = header.index("id") if "id" in header else 0
+            while True:
+                # csv.reader は先読みしないため、呼び出し前の位置が次の行の先頭になる
+                start = position[0]
+                row = next(reader, None)
+                if row is None:
+                    break
+                if len(row) > id_idx and row[id_idx]:
+                    records.append((_id_key(row[id_idx]), start))
+        records.sort()
+
+        with tempfile.NamedTemporaryFile(
+            delete=False, dir=self.index_path.parent, suffix=".tmp"
+        ) as tmp_file:
+            tmp_file.write(
+                _HEADER.pack(INDEX_MAGIC, stat.st_size, stat.st_mtime_ns, stat.st_ino, len(records))
+            )
+            tmp_file.writelines(_RECORD.pack(key, offset) for key, offset in records)
+            tmp_path = Path(tmp_file.name)
+        tmp_path.replace(self.index_path)
+
+    def remove(self) -> None:
+        """索引ファイルを削除"""
+        self.index_path.unlink(missing_ok=True)
+
+    def _is_current(self) -> bool:
+        """
+        索引がデータファイルの現在のサイズ・更新時刻・inode と一致するかどうか
+
+        置き換えで書き直されたファイルは、サイズと更新時刻が偶然一致しても inode で区別する。
+        """
+        try:
+            with self.index_path.open("rb") as f:
+                header = f.read(_HEADER.size)
+        except FileNotFoundError:
+            return False
+        if len(header) != _HEADER.size:
+            return False
+        magic, size, mtime_ns, inode, _ = _HEADER.unpack(header)
+        stat = self.data_path.stat()
+        return bool(
+            magic == INDEX_MAGIC
+            and size == stat.st_size
+            and mtime_ns == stat.st_mtime_ns
+            and inode == stat.st_ino
+        )
+
+    @staticmethod
+    def _record_pos(i: int) -> int:
+        """i番目のレコードの先頭位置"""
+        return _HEADER.size + i * _RECORD.size
@@ -0,0 +1,237 @@
+"""
+問題の複合条件検索
+"""
+
+import random
+from bisect import bisect_left, bisect_right
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, replace
+from datetime import datetime
+
+from .kanji_grades import text_grade
+from .kanji_index import KanjiIndex
+from .models import Problem
+
+ORDER_FIELDS = ("incorrect_count", "created_at", "random")
+
+
+def _to_iso(value: datetime | str | None) -> str | None:
+    """日時をISO形式の文字列に変換"""
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+@dataclass(frozen=True)
+class ProblemQuery:
+    """
+    問題の検索条件
+
+    条件を追加するメソッドは新しい ProblemQuery を返すため、共通の条件から
+    抽出方法ごとの条件を組み立てられる。
+    """
+
+    min_incorrect: int | None = None
+    max_incorrect: int | None = None
+    created_from: str | None = None
+    created_to: str | None = None
+    kanji: str | None = None
+    max_grade: int | None = None
+    order: str | None = None
+    descending: bool = False
+    max_results: int | None = None
+
+    def incorrect_between(
+        self, minimum: int | None = None, maximum: int | None = None
+    ) -> "ProblemQuery":
+        """不正解数の範囲(両端を含む)"""
+        return replace(self, min_incorrect=minimum, max_incorrect=maximum)
+
+    def created_between(
+        self, start: datetime | str | None = None, end: datetime | str | None = None
+    ) -> "ProblemQuery":
+        """作成日時の範囲(両端を含む)"""
+        return replace(self, created_from=_to_iso(start), created_to=_to_iso(end))
+
+    def containing(self, kanji: str | None) -> "ProblemQuery":
+        """回答漢字に指定した漢字1文字を含む"""
+        return replace(self, kanji=kanji or None)
+
+    def within_grade(self, grade: int | None) -> "ProblemQuery":
+        """回答漢字がすべて指定した学年までに習う漢字(None は制限なし)"""
+        return replace(self, max_grade=grade)
+
+    def order_by(self, field: str, descending: bool = False) -> "ProblemQuery":
+        """並び順("incorrect_count" / "created_at" / "random")"""
+        if field not in ORDER_FIELDS:
+            msg = f"不正な並び順です: {field}"
+            raise ValueError(msg)
+        return replace(self, order=field, descending=descending)
+
+    def limit(self, count: int | None) -> "ProblemQuery":
+        """取得する最大件数"""
+        return replace(self, max_results=count)
+
+
+class ProblemQueryEngine:
+    """
+    索引を使った問題の検索
+
+    作成時に作成日時・不正解数の整列済み索引、漢字の転置索引、配当学年ごとの
+    問題の一覧を作っておき、検索ごとに最も候補の少ない索引から候補を絞ってから
+    残りの条件で確かめる。条件で絞り込めず並び順に索引がある場合は、その索引を
+    先頭から辿って件数に達した時点で打ち切る。
+    """
+
+    def __init__(self, problems: Iterable[Problem], rng: random.Random | None = None):
+        """
+        Args:
+            problems: 問題一覧
+            rng: ランダム抽出に使う乱数生成器
+        """
+        self.problems = list(problems)
+        self.rng = rng or random.Random()
+        self._positions = {p.id: i for i, p in enumerate(self.problems)}
+        self._kanji_index = KanjiIndex(self.problems)
+
+        size = len(self.problems)
+        self._created_order = sorted(range(size), key=self._created_key)
+        self._created_keys = [self.problems[i].created_at_iso for i in self._created_order]
+        self._incorrect_order = sorted(range(size), key=self._incorrect_key)
+        self._incorrect_keys = [self.problems[i].incorrect_count for i in self._incorrect_order]
+        self._grades = [text_grade(p.answer_kanji) for p in self.problems]
+        self._grade_buckets: dict[int | None, list[int]] = {}
+        for i, grade in enumerate(self._grades):
+            self._grade_buckets.setdefault(grade, []).append(i)
+        self._order_indexes: dict[tuple[str, bool], list[int]] = {}
+
+    def execute(self, query: ProblemQuery) -> list[Problem]:
+        """条件に一致する問題を取得"""
+        _, positions = self._run(query)
+        return [self.problems[i] for i in positions]
+
+    def explain(self, query: ProblemQuery) -> str:
+        """検索に使う索引の名前(テスト・調査用)"""
+        plan, _ = self._plan(query)
+        return plan
+
+    def _run(self, query: ProblemQuery) -> tuple[str, list[int]]:
+        """検索を実行して (使った索引, 一致した位置) を返す"""
+        plan, candidates = self._plan(query)
+        matches = self._predicate(query)
+        limit = query.max_results
+
+        if plan.startswith("order:"):
+            # 並び順の索引を辿り、件数に達したら打ち切る
+            result = []
+            for i in self._order_index(query.order or "", query.descending):
+                if matches(i):
+                    result.append(i)
+                    if limit is not None and len(result) >= limit:
+                        break
+            return plan, result
+
+        if candidates is None:
+            candidates = list(range(len(self.problems)))
+        positions = sorted(i for i in candidates if matches(i))
+        if query.order == "random":
+            count = len(positions) if limit is None else min(limit, len(positions))
+            return plan, self.rng.sample(positions, count)
+        if query.order is not None:
+            key = self._created_key if query.order == "created_at" else self._incorrect_key
+            positions.sort(key=key, reverse=query.descending)
+        return plan, positions if limit is None else positions[:limit]
+
+    def _plan(self, query: ProblemQuery) -> tuple[str, list[int] | None]:
+        """
+        候補の最も少ない索引を選ぶ
+
+        Returns:
+            tuple: (索引の名前, 候補の位置。None は全件)
+        """
+        options: list[tuple[int, str, Callable[[], list[int]]]] = []
+        if query.kanji is not None:
+            ids = self._kanji_index.problem_ids_with(query.kanji)
+            options.append((len(ids), "index:kanji", lambda: [self._positions[pid] for pid in ids]))
+        if query.created_from is not None or query.created_to is not None:
+            low, high = self._range(self._created_keys, query.created_from, query.created_to)
+            options.append((high - low, "index:created_at", lambda: self._created_order[low:high]))
+        if query.min_incorrect is not None or query.max_incorrect is not None:
+            i_low, i_high = self._range(
+                self._incorrect_keys, query.min_incorrect, query.max_incorrect
+            )
+            options.append(
+                (
+                    i_high - i_low,
+                    "index:incorrect_count",
+                    lambda: self._incorrect_order[i_low:i_high],
+                )
+            )
+        if query.max_grade is not None:
+            buckets = [
+                bucket
+                for grade, bucket in self._grade_buckets.items()
+                if grade is None or grade <= query.max_grade
+            ]
+            options.append(
+                (
+                    sum(map(len, buckets)),
+                    "index:grade",
+                    lambda: [i for bucket in buckets for i in bucket],
+                )
+            )
+
+        best = min(options, key=lambda option: option[0], default=None)
+        # 絞り込みが効かない(半数以上が候補)場合は並び順の索引を辿る方が少なく済む
+        indexed_order = query.order in ("incorrect_count", "created_at")
+        if indexed_order and query.max_results is not None:
+            if best is None or best[0] * 2 > len(self.problems):
+                return f"order:{query.order}", None
+        if best is None:
+            return "scan", None
+        return best[1], best[2]()
+
+    def _predicate(self, query: ProblemQuery) -> Callable[[int], bool]:
+        """位置の問題が条件に一致するかを判定する関数"""
+        problems = self.problems
+        grades = self._grades
+
+        def matches(i: int) -> bool:
+            problem = problems[i]
+            if query.min_incorrect is not None and problem.incorrect_count < query.min_incorrect:
+                return False
+            if query.max_incorrect is not None and problem.incorrect_count > query.max_incorrect:
+                return False
+            if query.created_from is not None and problem.created_at_iso < query.created_from:
+                return False
+            if query.created_to is not None and problem.created_at_iso > query.created_to:
+                return False
+            if query.kanji is not None and query.kanji not in problem.answer_kanji:
+                return False
+            grade = grades[i]
+            return query.max_grade is None or grade is None or grade <= query.max_grade
+
+        return matches
+
+    def _order_index(self, field: str, descending: bool) -> list[int]:
+        """並び順の索引(同じ値の問題は元の順)"""
+        key = (field, descending)
+        if key not in self._order_indexes:
+            sort_key = self._created_key if field == "created_at" else self._incorrect_key
+            self._order_indexes[key] = sorted(
+                range(len(self.problems)), key=sort_key, reverse=descending
+            )
+        return self._order_indexes[key]
+
+    def _created_key(self, i: int) -> str:
+        """作成日時の並び順のキー"""
+        return self.problems[i].created_at_iso
+
+    def _incorrect_key(self, i: int) -> int:
+        """不正解数の並び順のキー"""
+        return self.problems[i].incorrect_count
+
+    @staticmethod
+    def _range(keys: list, low, high) -> tuple[int, int]:
+        """整列済みのキーから範囲(両端を含む)の位置を二分探索"""
+        start = 0 if low is None else bisect_left(keys, low)
+        end = len(keys) if high is None else bisect_right(keys, high)
+        return start, max(start, end)
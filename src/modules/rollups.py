@@ -0,0 +1,266 @@
+"""
+試行の日別集計(ロールアップ)
+"""
+
+import csv
+import json
+import tempfile
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+
+from .logger import app_logger
+from .models import Attempt
+from .utils import extract_kanji
+
+ROLLUP_DIR_NAME = "rollups"
+DAILY_FILE_NAME = "daily.csv"
+STATE_FILE_NAME = "state.json"
+DAILY_HEADER = ["date", "total_count", "correct_count"]
+PROBLEM_ROLLUP_HEADER = ["date", "problem_id", "total_count", "correct_count"]
+
+# (日付, 問題ID) -> [試行数, 正解数]
+Counts = dict[tuple[str, str], list[int]]
+
+
+@dataclass
+class DailyRollup:
+    """日別の試行集計(key は問題IDまたは漢字。日別の合計では空文字)"""
+
+    date: str
+    key: str
+    total_count: int
+    correct_count: int
+
+    @property
+    def accuracy(self) -> float:
+        """正答率"""
+        return self.correct_count / self.total_count if self.total_count else 0.0
+
+
+def count_attempts(attempts: Iterable[Attempt]) -> Counts:
+    """試行を日付・問題IDごとに数える"""
+    counts: Counts = {}
+    for attempt in attempts:
+        key = (attempt.attempted_at_iso[:10], attempt.problem_id)
+        entry = counts.get(key)
+        if entry is None:
+            entry = counts[key] = [0, 0]
+        entry[0] += 1
+        entry[1] += attempt.is_correct
+    return counts
+
+
+class DailyRollupStore:
+    """
+    日別・問題別の試行集計の管理
+
+    `rollups/daily.csv` に日別の合計、`rollups/problems_YYYYMM.csv` に月ごとの
+    日別・問題別の集計を持つ。採点の保存時に追加分だけを加算するため、進捗グラフは
+    履歴の長さによらず数百行の集計を読むだけで済む。
+    `rollups/state.json` には集計に反映済みの試行ログの世代番号を記録し、削除などで
+    世代番号がずれた場合は再構築が必要と判断する。
+    ロックは呼び出し側(AttemptStorage)が attempts.csv のロックで取得する。
+    """
+
+    def __init__(self, data_dir: str | Path = "data"):
+        """
+        Args:
+            data_dir: データディレクトリのパス
+        """
+        self.rollup_dir = Path(data_dir) / ROLLUP_DIR_NAME
+        self.daily_path = self.rollup_dir / DAILY_FILE_NAME
+        self.state_path = self.rollup_dir / STATE_FILE_NAME
+
+    def generation(self) -> int | None:
+        """集計に反映済みの試行ログの世代番号(未作成・破損時は None)"""
+        try:
+            with self.state_path.open(encoding="utf-8") as f:
+                return int(json.load(f)["generation"])
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            return None
+
+    def is_current(self, generation: int) -> bool:
+        """集計が指定した世代番号の試行ログと一致するかどうか"""
+        return self.generation() == generation
+
+    def apply(self, attempts: list[Attempt], previous_generation: int, generation: int) -> None:
+        """
+        追加された試行を集計に加算する
+
+        集計が追加前の世代番号と一致する場合のみ加算し、一致しない場合は
+        再構築されるまで古いままにする。失敗した場合も集計を無効にするだけで、
+        試行の保存は失敗させない。
+        """
+        if not attempts or self.generation() != previous_generation:
+            return
+        try:
+            counts = count_attempts(attempts)
+            daily = self._read_daily()
+            months: dict[str, Counts] = {}
+            for (date, problem_id), (total, correct) in counts.items():
+                month = date[:7]
+                if month not in months:
+                    months[month] = self._read_problem_month(month)
+                entry = months[month].setdefault((date, problem_id), [0, 0])
+                entry[0] += total
+                entry[1] += correct
+                day = daily.setdefault(date, [0, 0])
+                day[0] += total
+                day[1] += correct
+
+            for month, month_counts in months.items():
+                self._write_problem_month(month, month_counts)
+            self._write_daily(daily)
+            self._write_state(generation)
+        except Exception as e:
+            app_logger.warning(f"日別集計の更新に失敗しました: {e}")
+            self.state_path.unlink(missing_ok=True)
+
+    def advance(self, previous_generation: int, generation: int) -> None:
+        """内容が変わらない書き換え(セグメント分割など)の後に世代番号だけを進める"""
+        if self.generation() == previous_generation:
+            self._write_state(generation)
+
+    def rebuild(self, attempts: Iterable[Attempt], generation: int) -> None:
+        """試行全体から集計を作り直す"""
+        counts = count_attempts(attempts)
+        self.rollup_dir.mkdir(parents=True, exist_ok=True)
+        # 書き換え中の集計を使われないよう、先に世代番号を消す
+        self.state_path.unlink(missing_ok=True)
+        for path in self.rollup_dir.glob("problems_*.csv"):
+            path.unlink()
+
+        daily: dict[str, list[int]] = {}
+        months: dict[str, Counts] = {}
+        for (date, problem_id), (total, correct) in counts.items():
+            months.setdefault(date[:7], {})[(date, problem_id)] = [total, correct]
+            day = daily.setdefault(date, [0, 0])
+            day[0] += total
+            day[1] += correct
+        for month, month_counts in months.items():
+            self._write_problem_month(month, month_counts)
+        self._write_daily(daily)
+        self._write_state(generation)
+        app_logger.info(
+            f"日別集計を再構築: {len(daily)}日, 試行{sum(t for t, _ in daily.values())}件"
+        )
+
+    def load_daily(self, start: str | None = None, end: str | None = None) -> list[DailyRollup]:
+        """
+        日別の合計を日付順に取得
+
+        Args:
+            start: この日付(YYYY-MM-DD)以降のみ
+            end: この日付(YYYY-MM-DD)以前のみ
+        """
+        return [
+            DailyRollup(date=date, key="", total_count=total, correct_count=correct)
+            for date, (total, correct) in sorted(self._read_daily().items())
+            if (start is None or date >= start) and (end is None or date <= end)
+        ]
+
+    def load_problems(self, start: str | None = None, end: str | None = None) -> list[DailyRollup]:
+        """日別・問題別の集計を取得(該当する月のファイルだけを読む)"""
+        rollups = []
+        for path in sorted(self.rollup_dir.glob("problems_*.csv")):
+            month = f"{path.stem[9:13]}-{path.stem[13:15]}"
+            if (start is not None and month < start[:7]) or (end is not None and month > end[:7]):
+                continue
+            for (date, problem_id), (total, correct) in sorted(
+                self._read_problem_month(month).items()
+            ):
+                if (start is None or date >= start) and (end is None or date <= end):
+                    rollups.append(
+                        DailyRollup(
+                            date=date, key=problem_id, total_count=total, correct_count=correct
+                        )
+                    )
+        return rollups
+
+    def load_kanji(
+        self, answer_kanji: dict[str, str], start: str | None = None, end: str | None = None
+    ) -> list[DailyRollup]:
+        """
+        日別・漢字別の集計を取得
+
+        問題の答えは後から編集され得るため、漢字別の集計は保存せず、
+        日別・問題別の集計を読み込み時点の答えの漢字に展開して求める。
+
+        Args:
+            answer_kanji: 問題ID -> 答えの漢字
+        """
+        counts: dict[tuple[str, str], list[int]] = {}
+        for rollup in self.load_problems(start, end):
+            for kanji in extract_kanji(answer_kanji.get(rollup.key, "")):
+                entry = counts.setdefault((rollup.date, kanji), [0, 0])
+                entry[0] += rollup.total_count
+                entry[1] += rollup.correct_count
+        return [
+            DailyRollup(date=date, key=kanji, total_count=total, correct_count=correct)
+            for (date, kanji), (total, correct) in sorted(counts.items())
+        ]
+
+    def _problem_month_path(self, month: str) -> Path:
+        """月ごとの日別・問題別集計ファイルのパス"""
+        return self.rollup_dir / f"problems_{month.replace('-', '')}.csv"
+
+    def _read_daily(self) -> dict[str, list[int]]:
+        """日別の合計を読み込む"""
+        if not self.daily_path.exists():
+            return {}
+        with self.daily_path.open(encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            return {row[0]: [int(row[1]), int(row[2])] for row in reader if row}
+
+    def _read_problem_month(self, month: str) -> Counts:
+        """1か月分の日別・問題別集計を読み込む"""
+        path = self._problem_month_path(month)
+        if not path.exists():
+            return {}
+        with path.open(encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            return {(row[0], row[1]): [int(row[2]), int(row[3])] for row in reader if row}
+
+    def _write_daily(self, daily: dict[str, list[int]]) -> None:
+        """日別の合計を書き込む"""
+        self._atomic_write_csv(
+            self.daily_path,
+            DAILY_HEADER,
+            [[date, total, correct] for date, (total, correct) in sorted(daily.items())],
+        )
+
+    def _write_problem_month(self, month: str, counts: Counts) -> None:
+        """1か月分の日別・問題別集計を書き込む"""
+        self._atomic_write_csv(
+            self._problem_month_path(month),
+            PROBLEM_ROLLUP_HEADER,
+            [
+                [date, problem_id, total, correct]
+                for (date, problem_id), (total, correct) in sorted(counts.items())
+            ],
+        )
+
+    def _write_state(self, generation: int) -> None:
+        """反映済みの世代番号をアトミックに書き込む"""
+        self.rollup_dir.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            mode="w", encoding="utf-8", delete=False, dir=self.rollup_dir, suffix=".tmp"
+        ) as tmp_file:
+            json.dump({"generation": generation}, tmp_file)
+            tmp_path = Path(tmp_file.name)
+        tmp_path.replace(self.state_path)
+
+    def _atomic_write_csv(self, file_path: Path, header: list[str], rows: list[list]) -> None:
+        """一時ファイル経由でアトミックにCSVを書き込む"""
+        self.rollup_dir.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            mode="w", newline="", encoding="utf-8", delete=False, dir=self.rollup_dir, suffix=".tmp"
+        ) as tmp_file:
+            writer = csv.writer(tmp_file)
+            writer.writerow(header)
+            writer.writerows(rows)
+            tmp_path = Path(tmp_file.name)
+        tmp_path.replace(file_path)
@@ -0,0 +1,451 @@
+"""
+分析用の列指向スナップショット
+"""
+
+import json
+import shutil
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .health_check import id_keys
+from .logger import app_logger
+from .models import Attempt
+from .storage import AttemptStorage, ProblemStorage
+
+SNAPSHOT_DIR_NAME = "snapshot"
+CURRENT_NAME = "CURRENT.json"
+
+# 各列は <接頭辞>_<列名>.npy として保存し、読み込み時にメモリマップする
+ATTEMPT_COLUMNS = ("problem_code", "attempted_at", "is_correct", "mistake_code", "id_keys")
+PROBLEM_COLUMNS = ("created_at", "incorrect_count")
+
+
+@dataclass
+class Snapshot:
+    """
+    列指向スナップショット
+
+    試行の problem_id と mistake_type は辞書(problem_ids / mistake_types)の
+    番号で持ち、日時はローカル時刻のマイクロ秒(int64)で持つ。
+    問題の列は problem_ids と同じ並びで、試行にしか現れない問題IDの行は
+    created_at が NaT 相当(最小値)、answer_kanji が空文字になる。
+    attempt_id_keys は試行IDのハッシュ(uint64)の整列済み配列で、行とは対応しない。
+    source には作成時の試行ログの各ファイルの状態を持ち、試行の追記だけがあった場合に
+    追記分を列の末尾に加えるために使う(作成中に書き込みがあった場合は None)。
+    """
+
+    problem_ids: list[str]
+    answer_kanji: list[str]
+    mistake_types: list[str]
+    problem_created_at: np.ndarray
+    problem_incorrect_count: np.ndarray
+    attempt_problem_code: np.ndarray
+    attempt_attempted_at: np.ndarray
+    attempt_is_correct: np.ndarray
+    attempt_mistake_code: np.ndarray
+    attempt_id_keys: np.ndarray
+    generations: dict[str, int]
+    created_at: str
+    source: dict | None = None
+
+    @property
+    def attempt_count(self) -> int:
+        """試行数"""
+        return len(self.attempt_problem_code)
+
+    def attempts_frame(self) -> pd.DataFrame:
+        """試行の列を辞書型(Categorical)の列を持つ DataFrame として取得"""
+        return pd.DataFrame(
+            {
+                "problem_id": pd.Categorical.from_codes(
+                    self.attempt_problem_code, categories=self.problem_ids
+                ),
+                "attempted_at": self.attempt_attempted_at.view("datetime64[us]"),
+                "is_correct": self.attempt_is_correct,
+                "mistake_type": pd.Categorical.from_codes(
+                    self.attempt_mistake_code, categories=self.mistake_types
+                ),
+            }
+        )
+
+    def problems_frame(self) -> pd.DataFrame:
+        """問題の列を DataFrame として取得(並びは problem_ids と同じ)"""
+        return pd.DataFrame(
+            {
+                "problem_id": self.problem_ids,
+                "answer_kanji": self.answer_kanji,
+                "created_at": self.problem_created_at.view("datetime64[us]"),
+                "incorrect_count": self.problem_incorrect_count,
+            }
+        )
+
+
+class SnapshotExporter:
+    """
+    問題・試行の列指向スナップショットの書き出しと読み込み
+
+    `snapshot/<作成日時>/` に列ごとの .npy と辞書を含む meta.json を書き出し、
+    最後に `snapshot/CURRENT.json` を置き換えて切り替える。切り替え後は、切り替え前に
+    CURRENT.json が指していたディレクトリだけを削除する(他のプロセスが書き出し中の
+    ディレクトリには触れない)。
+    """
+
+    def __init__(self, data_dir: str | Path = "data"):
+        """
+        Args:
+            data_dir: データディレクトリのパス
+        """
+        self.snapshot_dir = Path(data_dir) / SNAPSHOT_DIR_NAME
+        self.current_path = self.snapshot_dir / CURRENT_NAME
+
+    def export(
+        self,
+        problem_storage: ProblemStorage,
+        attempt_storage: AttemptStorage,
+        include_archived: bool = True,
+    ) -> Snapshot:
+        """
+        スナップショットを書き出す
+
+        Args:
+            problem_storage: 問題ストレージ
+            attempt_storage: 試行ストレージ
+            include_archived: 圧縮アーカイブに移した試行も含めるかどうか
+        """
+        attempt_storage.flush()
+        generations = {
+            "problems": problem_storage.generation,
+            "attempts": attempt_storage.generation,
+        }
+        source: dict | None = _source(attempt_storage, include_archived)
+        problems = problem_storage.load_problem_columns()
+        attempts = attempt_storage.load_attempts(include_archived=include_archived)
+        if attempt_storage.generation != generations["attempts"]:
+            source = None
+
+        # 問題IDの辞書: 問題マスタの順に並べ、試行にしか現れないIDを後ろに追加
+        problem_codes = {pid: i for i, pid in enumerate(problems["id"])}
+        answer_kanji = problems["answer_kanji"]
+        created_at = problems["created_at"]
+        incorrect_count = problems["incorrect_count"]
+        for a in attempts:
+            if a.problem_id not in problem_codes:
+                problem_codes[a.problem_id] = len(problem_codes)
+                answer_kanji.append("")
+                created_at.append("NaT")
+                incorrect_count.append(0)
+
+        mistake_codes: dict[str, int] = {}
+        columns = _attempt_columns(attempts, problem_codes, mistake_codes)
+        snapshot = Snapshot(
+            problem_ids=list(problem_codes),
+            answer_kanji=answer_kanji,
+            mistake_types=[],
+            problem_created_at=_to_micros(created_at),
+            problem_incorrect_count=np.array(incorrect_count, dtype=np.int32),
+            attempt_problem_code=columns["problem_code"],
+            attempt_attempted_at=columns["attempted_at"],
+            attempt_is_correct=columns["is_correct"],
+            attempt_mistake_code=columns["mistake_code"],
+            attempt_id_keys=np.sort(id_keys([a.id for a in attempts])),
+            generations=generations,
+            created_at=datetime.now().isoformat(),
+            source=source,
+        )
+        snapshot.mistake_types = list(mistake_codes)
+
+        self._write(snapshot)
+        app_logger.info(
+            f"スナップショットを作成: 問題{len(problems['id'])}件, 試行{len(attempts)}件"
+        )
+        return snapshot
+
+    def load(self) -> Snapshot | None:
+        """
+        最新のスナップショットを読み込む(列はメモリマップされ、読み取り専用)
+
+        未作成・破損時や、読み込み中に他のプロセスが切り替えて削除した場合は None を返す。
+        """
+        version = self._current_version()
+        if version is None:
+            return None
+        version_dir = self.snapshot_dir / version
+
+        def column(name: str) -> np.ndarray:
+            array: np.ndarray = np.load(version_dir / f"{name}.npy", mmap_mode="r")
+            return array
+
+        try:
+            with (version_dir / "meta.json").open(encoding="utf-8") as f:
+                meta = json.load(f)
+            return Snapshot(
+                problem_ids=meta["problem_ids"],
+                answer_kanji=meta["answer_kanji"],
+                mistake_types=meta["mistake_types"],
+                problem_created_at=column("problem_created_at"),
+                problem_incorrect_count=column("problem_incorrect_count"),
+                attempt_problem_code=column("attempt_problem_code"),
+                attempt_attempted_at=column("attempt_attempted_at"),
+                attempt_is_correct=column("attempt_is_correct"),
+                attempt_mistake_code=column("attempt_mistake_code"),
+                attempt_id_keys=column("attempt_id_keys"),
+                generations=meta["generations"],
+                created_at=meta["created_at"],
+                source=meta.get("source"),
+            )
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            return None
+
+    def _current_version(self) -> str | None:
+        """CURRENT.json が指すディレクトリ名(未作成・破損時は None)"""
+        try:
+            with self.current_path.open(encoding="utf-8") as f:
+                return str(json.load(f)["version"])
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            return None
+
+    def extend(
+        self,
+        snapshot: Snapshot,
+        problem_storage: ProblemStorage,
+        attempt_storage: AttemptStorage,
+    ) -> Snapshot | None:
+        """
+        試行の追記だけがあった場合に、追記分を列の末尾に加えたスナップショットを書き出す
+
+        attempts.csv の前回の末尾以降だけを読むため、試行全体を読み込む export() より軽い。
+        採点では試行の追記と同時に不正解数が更新されるため、問題が変更されていた場合は
+        問題の列だけを problems.csv から読み直す。削除記録の追加、セグメント分割などの
+        書き換えがあった場合や、追記された試行のIDが既存の行(アーカイブを含む)と
+        重複する場合は None を返す(export() し直す)。
+        """
+        source = snapshot.source
+        if source is None:
+            return None
+
+        problems_generation = problem_storage.generation
+        problems = None
+        if snapshot.generations["problems"] != problems_generation:
+            problems = problem_storage.load_problem_columns()
+
+        attempt_storage.flush()
+        with attempt_storage.lock.shared() as locked:
+            generation = locked.generation
+            current = _source(attempt_storage, source["include_archived"])
+            if current["files"] != source["files"] or current["tombstones"] != source["tombstones"]:
+                return None
+            inode, offset = source["active"]
+            end = current["active"][1]
+            if current["active"][0] != inode or end < offset:
+                return None
+            attempts = attempt_storage.read_appended(offset, end)
+
+        # 追記された試行のIDが既存の行と重複していれば全体を書き出し直す
+        # (ハッシュの衝突でも書き出し直すだけで、結果は変わらない)
+        new_keys = np.sort(id_keys([a.id for a in attempts]))
+        positions = np.searchsorted(snapshot.attempt_id_keys, new_keys)
+        found = positions < len(snapshot.attempt_id_keys)
+        if np.any(snapshot.attempt_id_keys[positions[found]] == new_keys[found]):
+            return None
+
+        if problems is None:
+            problem_ids = list(snapshot.problem_ids)
+            answer_kanji = list(snapshot.answer_kanji)
+            problem_created_at = snapshot.problem_created_at
+            problem_incorrect_count = snapshot.problem_incorrect_count
+            problem_code = snapshot.attempt_problem_code
+        else:
+            (
+                problem_ids,
+                answer_kanji,
+                problem_created_at,
+                problem_incorrect_count,
+                problem_code,
+            ) = _reload_problem_columns(snapshot, problems)
+        problem_count = len(problem_ids)
+        problem_codes = {pid: i for i, pid in enumerate(problem_ids)}
+        for a in attempts:
+            if a.problem_id not in problem_codes:
+                problem_codes[a.problem_id] = len(problem_ids)
+                problem_ids.append(a.problem_id)
+                answer_kanji.append("")
+        added = len(problem_ids) - problem_count
+        mistake_codes = {m: i for i, m in enumerate(snapshot.mistake_types)}
+        appended = _attempt_columns(attempts, problem_codes, mistake_codes)
+
+        extended = Snapshot(
+            problem_ids=problem_ids,
+            answer_kanji=answer_kanji,
+            mistake_types=list(mistake_codes),
+            problem_created_at=np.concatenate([problem_created_at, _to_micros(["NaT"] * added)]),
+            problem_incorrect_count=np.concatenate(
+                [problem_incorrect_count, np.zeros(added, dtype=np.int32)]
+            ),
+            attempt_problem_code=np.concatenate([problem_code, appended["problem_code"]]),
+            attempt_attempted_at=np.concatenate(
+                [snapshot.attempt_attempted_at, appended["attempted_at"]]
+            ),
+            attempt_is_correct=np.concatenate(
+                [snapshot.attempt_is_correct, appended["is_correct"]]
+            ),
+            attempt_mistake_code=np.concatenate(
+                [snapshot.attempt_mistake_code, appended["mistake_code"]]
+            ),
+            attempt_id_keys=np.insert(snapshot.attempt_id_keys, positions, new_keys),
+            generations={"problems": problems_generation, "attempts": generation},
+            created_at=datetime.now().isoformat(),
+            source=current,
+        )
+        self._write(extended)
+        app_logger.info(f"スナップショットに試行を追加: {len(attempts)}件")
+        return extended
+
+    @staticmethod
+    def is_current(
+        snapshot: Snapshot, problem_storage: ProblemStorage, attempt_storage: AttemptStorage
+    ) -> bool:
+        """スナップショット作成後にデータファイルが更新されていないかどうか"""
+        return snapshot.generations == {
+            "problems": problem_storage.generation,
+            "attempts": attempt_storage.generation,
+        }
+
+    def _write(self, snapshot: Snapshot) -> None:
+        """スナップショットを新しいディレクトリに書き出して切り替える"""
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        version_dir = Path(tempfile.mkdtemp(dir=self.snapshot_dir, prefix="v"))
+        for prefix, names in (("attempt", ATTEMPT_COLUMNS), ("problem", PROBLEM_COLUMNS)):
+            for name in names:
+                np.save(version_dir / f"{prefix}_{name}.npy", getattr(snapshot, f"{prefix}_{name}"))
+        # 辞書の列が長いため、C実装で一度に文字列化してから書き込む
+        with (version_dir / "meta.json").open("w", encoding="utf-8") as f:
+            f.write(
+                json.dumps(
+                    {
+                        "problem_ids": snapshot.problem_ids,
+                        "answer_kanji": snapshot.answer_kanji,
+                        "mistake_types": snapshot.mistake_types,
+                        "generations": snapshot.generations,
+                        "created_at": snapshot.created_at,
+                        "source": snapshot.source,
+                    },
+                    ensure_ascii=False,
+                )
+            )
+
+        previous = self._current_version()
+        with tempfile.NamedTemporaryFile(
+            mode="w", encoding="utf-8", delete=False, dir=self.snapshot_dir, suffix=".tmp"
+        ) as tmp_file:
+            json.dump({"version": version_dir.name}, tmp_file)
+            tmp_path = Path(tmp_file.name)
+        tmp_path.replace(self.current_path)
+
+        if previous is not None and previous != version_dir.name:
+            shutil.rmtree(self.snapshot_dir / previous, ignore_errors=True)
+
+
+def _to_micros(iso_timestamps: list[str]) -> np.ndarray:
+    """ISO形式の日時文字列をまとめて解析し、マイクロ秒(int64)の配列に変換"""
+    return np.array(iso_timestamps, dtype="datetime64[us]").view(np.int64)
+
+
+def _reload_problem_columns(
+    snapshot: Snapshot, problems: dict[str, list]
+) -> tuple[list[str], list[str], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    読み直した問題で問題の列を作り直し、既存の試行の問題番号を付け替える
+
+    export() と同じく問題マスタの順に並べ、試行にしか現れないIDを試行に最初に現れた
+    順に後ろに追加する。
+
+    Args:
+        problems: ProblemStorage.load_problem_columns() の結果
+
+    Returns:
+        (問題ID, 答えの漢字, 作成日時, 不正解数, 既存の試行の問題番号)
+    """
+    problem_codes = {pid: i for i, pid in enumerate(problems["id"])}
+    answer_kanji = problems["answer_kanji"]
+    created_at = problems["created_at"]
+    incorrect_count = problems["incorrect_count"]
+
+    used, first = np.unique(snapshot.attempt_problem_code, return_index=True)
+    for code in used[np.argsort(first)]:
+        pid = snapshot.problem_ids[code]
+        if pid not in problem_codes:
+            problem_codes[pid] = len(problem_codes)
+            answer_kanji.append("")
+            created_at.append("NaT")
+            incorrect_count.append(0)
+
+    # 試行に現れない古い番号は参照されないため、どの番号に付け替えてもよい
+    remap = np.fromiter(
+        (problem_codes.get(pid, 0) for pid in snapshot.problem_ids),
+        dtype=np.int32,
+        count=len(snapshot.problem_ids),
+    )
+    return (
+        list(problem_codes),
+        answer_kanji,
+        _to_micros(created_at),
+        np.array(incorrect_count, dtype=np.int32),
+        remap[snapshot.attempt_problem_code],
+    )
+
+
+def _attempt_columns(
+    attempts: list[Attempt], problem_codes: dict[str, int], mistake_codes: dict[str, int]
+) -> dict[str, np.ndarray]:
+    """試行を列の配列に変換(新しい間違いの種類は mistake_codes に追加する)"""
+    return {
+        "problem_code": np.fromiter(
+            (problem_codes[a.problem_id] for a in attempts), dtype=np.int32, count=len(attempts)
+        ),
+        "attempted_at": _to_micros([a.attempted_at_iso for a in attempts]),
+        "is_correct": np.fromiter(
+            (a.is_correct for a in attempts), dtype=np.bool_, count=len(attempts)
+        ),
+        "mistake_code": np.fromiter(
+            (mistake_codes.setdefault(a.mistake_type, len(mistake_codes)) for a in attempts),
+            dtype=np.int16,
+            count=len(attempts),
+        ),
+    }
+
+
+def _signature(path: Path) -> list[int] | None:
+    """ファイルの (inode, サイズ, 更新時刻ns)。存在しなければ None"""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return [stat.st_ino, stat.st_size, stat.st_mtime_ns]
+
+
+def _source(attempt_storage: AttemptStorage, include_archived: bool) -> dict:
+    """
+    試行ログの各ファイルの状態
+
+    封印済みセグメント・アーカイブ・削除記録は (inode, サイズ, 更新時刻ns)、
+    追記される attempts.csv は (inode, サイズ) を記録する。
+    """
+    paths = attempt_storage.data_files()[:-1]
+    if include_archived:
+        archived = attempt_storage.archive.segments_in_range(None, None)
+        paths = [attempt_storage.archive.segment_path(s) for s in archived] + paths
+    stat = attempt_storage.file_path.stat()
+    return {
+        "include_archived": include_archived,
+        "files": {
+            path.relative_to(attempt_storage.data_dir).as_posix(): _signature(path)
+            for path in paths
+        },
+        "tombstones": _signature(attempt_storage.tombstones.file_path),
+        "active": [stat.st_ino, stat.st_size],
+    }
@@ -0,0 +1,230 @@
+"""
+学習統計の計算
+"""
+
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from .snapshot import Snapshot, SnapshotExporter
+from .storage import AttemptStorage, ProblemStorage
+from .utils import extract_kanji
+
+MICROS_PER_DAY = 86_400_000_000
+
+
+@dataclass
+class OverallStats:
+    """全体統計"""
+
+    total_attempts: int
+    correct_count: int
+    accuracy: float
+    attempted_problems: int
+    study_days: int
+
+
+def _accuracy(correct: np.ndarray, total: np.ndarray) -> np.ndarray:
+    """正答率を計算(試行のない行は0)"""
+    accuracy: np.ndarray = np.divide(correct, total, out=np.zeros(len(total)), where=total > 0)
+    return accuracy
+
+
+def _period_frame(
+    days: np.ndarray, freq: str, correct: np.ndarray, total: np.ndarray | None = None
+) -> pd.DataFrame:
+    """
+    日番号ごとの試行を日別・週別に集計
+
+    Args:
+        days: 日番号(1970-01-01からの日数)
+        freq: "D"(日別)または "W"(週別、月曜始まり)
+        correct: 各要素の正解数
+        total: 各要素の試行数(省略時は1件ずつ)
+    """
+    if freq == "W":
+        # 1970-01-01 は木曜日のため、3日ずらして月曜日にそろえる
+        days = days - (days + 3) % 7
+    elif freq != "D":
+        msg = f"不正な集計単位です: {freq}"
+        raise ValueError(msg)
+
+    periods, inverse = np.unique(days, return_inverse=True)
+    total_count = np.bincount(inverse, weights=total, minlength=len(periods)).astype(np.int64)
+    correct_count = np.bincount(inverse, weights=correct, minlength=len(periods)).astype(np.int64)
+    return pd.DataFrame(
+        {
+            "period": periods.astype("datetime64[D]"),
+            "total_count": total_count,
+            "correct_count": correct_count,
+            "accuracy": _accuracy(correct_count, total_count),
+        }
+    )
+
+
+class StatisticsCalculator:
+    """
+    スナップショットの列に対する統計計算
+
+    試行ごとのループは行わず、問題番号・日付の配列に対する np.bincount などの
+    列演算で集計する。結果は計算済みのものを再利用する。
+    """
+
+    def __init__(self, snapshot: Snapshot):
+        self.snapshot = snapshot
+        self._period_cache: dict[str, pd.DataFrame] = {}
+
+    @cached_property
+    def _problem_counts(self) -> tuple[np.ndarray, np.ndarray]:
+        """問題番号ごとの (試行数, 正解数)"""
+        snapshot = self.snapshot
+        size = len(snapshot.problem_ids)
+        codes = np.asarray(snapshot.attempt_problem_code)
+        total = np.bincount(codes, minlength=size)
+        correct = np.bincount(codes, weights=snapshot.attempt_is_correct, minlength=size)
+        return total, correct.astype(np.int64)
+
+    @cached_property
+    def _attempt_days(self) -> np.ndarray:
+        """試行ごとの日番号(1970-01-01からの日数)"""
+        return np.asarray(self.snapshot.attempt_attempted_at) // MICROS_PER_DAY
+
+    @cached_property
+    def overall(self) -> OverallStats:
+        """全体統計"""
+        total, correct = self._problem_counts
+        total_attempts = int(total.sum())
+        correct_count = int(correct.sum())
+        return OverallStats(
+            total_attempts=total_attempts,
+            correct_count=correct_count,
+            accuracy=correct_count / total_attempts if total_attempts else 0.0,
+            attempted_problems=int(np.count_nonzero(total)),
+            study_days=len(np.unique(self._attempt_days)),
+        )
+
+    @cached_property
+    def problem_accuracy(self) -> pd.DataFrame:
+        """問題別の試行数・正解数・正答率(試行のある問題のみ、正答率の低い順)"""
+        snapshot = self.snapshot
+        total, correct = self._problem_counts
+        frame = pd.DataFrame(
+            {
+                "problem_id": snapshot.problem_ids,
+                "answer_kanji": snapshot.answer_kanji,
+                "total_count": total,
+                "correct_count": correct,
+                "accuracy": _accuracy(correct, total),
+            }
+        )
+        frame = frame[frame["total_count"] > 0]
+        return frame.sort_values(["accuracy", "total_count"], ascending=[True, False]).reset_index(
+            drop=True
+        )
+
+    @cached_property
+    def kanji_accuracy(self) -> pd.DataFrame:
+        """漢字1文字ごとの試行数・正解数・正答率(正答率の低い順)"""
+        problems = self.problem_accuracy[["answer_kanji", "total_count", "correct_count"]]
+        # 集計済みの問題単位の行を漢字に展開するため、試行数に依存しない
+        problems = problems.assign(kanji=problems["answer_kanji"].map(extract_kanji))
+        exploded = problems.explode("kanji").dropna(subset=["kanji"])
+        if exploded.empty:
+            return pd.DataFrame(columns=["kanji", "total_count", "correct_count", "accuracy"])
+        grouped = exploded.groupby("kanji", sort=False)[["total_count", "correct_count"]].sum()
+        grouped["accuracy"] = _accuracy(
+            grouped["correct_count"].to_numpy(), grouped["total_count"].to_numpy()
+        )
+        return (
+            grouped.reset_index()
+            .sort_values(["accuracy", "total_count"], ascending=[True, False])
+            .reset_index(drop=True)
+        )
+
+    def period_accuracy(self, freq: str = "D") -> pd.DataFrame:
+        """
+        日別("D")または週別("W"、月曜始まり)の試行数・正解数・正答率
+
+        Returns:
+            pd.DataFrame: period(期間の開始日), total_count, correct_count, accuracy
+        """
+        if freq not in self._period_cache:
+            self._period_cache[freq] = _period_frame(
+                self._attempt_days, freq, correct=self.snapshot.attempt_is_correct
+            )
+        return self._period_cache[freq]
+
+    @cached_property
+    def mistake_breakdown(self) -> pd.DataFrame:
+        """不正解の試行の間違いの種類別件数と割合(件数の多い順)"""
+        snapshot = self.snapshot
+        incorrect = ~np.asarray(snapshot.attempt_is_correct)
+        counts = np.bincount(
+            np.asarray(snapshot.attempt_mistake_code)[incorrect],
+            minlength=len(snapshot.mistake_types),
+        )
+        frame = pd.DataFrame({"mistake_type": snapshot.mistake_types, "count": counts})
+        frame = frame[frame["count"] > 0]
+        total = int(frame["count"].sum())
+        frame["ratio"] = frame["count"] / total if total else 0.0
+        return frame.sort_values("count", ascending=False).reset_index(drop=True)
+
+
+class StatisticsManager:
+    """
+    統計計算のキャッシュ管理
+
+    問題・試行ストレージの世代番号が変わらない限り、同じ計算結果を返す。
+    新しい試行が保存されると世代番号が変わり、スナップショットを更新する
+    (試行ログへの追記だけなら問題の変更があっても追記分を加え、それ以外は作り直す)。
+    """
+
+    def __init__(self, problem_storage: ProblemStorage, attempt_storage: AttemptStorage):
+        self.problem_storage = problem_storage
+        self.attempt_storage = attempt_storage
+        self.exporter = SnapshotExporter(attempt_storage.data_dir)
+        self._calculator: StatisticsCalculator | None = None
+
+    def get_calculator(self) -> StatisticsCalculator:
+        """最新のデータに対する統計計算オブジェクトを取得"""
+        # 書き込みキューの試行を反映してから世代番号を確認する
+        self.attempt_storage.flush()
+        calculator = self._calculator
+        if calculator is not None and self.exporter.is_current(
+            calculator.snapshot, self.problem_storage, self.attempt_storage
+        ):
+            return calculator
+
+        snapshot = self.exporter.load()
+        if snapshot is None or not self.exporter.is_current(
+            snapshot, self.problem_storage, self.attempt_storage
+        ):
+            # 試行ログへの追記だけなら追記分を既存の列に加え、それ以外は全体を書き出し直す
+            extended = (
+                self.exporter.extend(snapshot, self.problem_storage, self.attempt_storage)
+                if snapshot is not None
+                else None
+            )
+            snapshot = extended or self.exporter.export(self.problem_storage, self.attempt_storage)
+        self._calculator = StatisticsCalculator(snapshot)
+        return self._calculator
+
+    def progress(self, freq: str = "D") -> pd.DataFrame:
+        """
+        日別・週別の進捗を日別集計(ロールアップ)から取得
+
+        試行全体ではなく日ごとの集計行だけを読むため、履歴の長さによらず軽い。
+        列は StatisticsCalculator.period_accuracy() と同じ。
+        """
+        if not self.attempt_storage.ensure_rollups():
+            return self.get_calculator().period_accuracy(freq)
+        rollups = self.attempt_storage.rollups.load_daily()
+        days = np.array([r.date for r in rollups], dtype="datetime64[D]").view(np.int64)
+        return _period_frame(
+            days,
+            freq,
+            correct=np.array([r.correct_count for r in rollups], dtype=np.int64),
+            total=np.array([r.total_count for r in rollups], dtype=np.int64),
+        )
@@ -3,31 +3,111 @@ CSV入出力機能
 """
 
 import csv
+import io
+import os
 import shutil
+import sys
 import tempfile
+from collections.abc import Callable
+from datetime import datetime
+from operator import itemgetter
 from pathlib import Path
 
+from .attempt_segments import ARCHIVE_DIR_NAME, AttemptSegmentStore, month_of, open_segment
+from .file_lock import FileLock
 from .logger import app_logger
-from .models import Attempt, Problem
+from .models import Attempt, Problem, parse_incorrect_count
+from .offset_index import OffsetIndex
+from .rollups import DailyRollupStore
+from .tombstones import TombstoneLog, is_tombstoned
+from .write_behind import WriteBehindQueue
+
+PROBLEM_HEADER = ["id", "sentence", "answer_kanji", "reading", "created_at", "incorrect_count"]
+ATTEMPT_HEADER = [
+    "id",
+    "problem_id",
+    "attempted_at",
+    "is_correct",
+    "mistake_type",
+    "learning_memo",
+]
+# 書き込みキューから追記できなかった試行の退避先
+PENDING_ATTEMPTS_FILE_NAME = "attempts.pending.csv"
+
+
+def _column_indexes(header: list[str]) -> dict[str, int]:
+    """ヘッダから列名→列番号の対応を求める"""
+    return {name: i for i, name in enumerate(header)}
+
+
+def _pad_row(row: list[str], width: int) -> list[str]:
+    """列数が足りない行(後方互換)を空文字で補う"""
+    if len(row) < width:
+        row.extend([""] * (width - len(row)))
+    return row
+
+
+def _attempt_from_row(columns: dict[str, int], row: list[str]) -> Attempt:
+    """列番号に従って試行の行を Attempt に変換"""
+    mistake_idx = columns.get("mistake_type")
+    memo_idx = columns.get("learning_memo")
+    ts_idx = columns.get("timestamp")
+    attempted_at = row[columns["attempted_at"]]
+    return Attempt.from_stored(
+        id=row[columns["id"]],
+        problem_id=row[columns["problem_id"]],
+        attempted_at=attempted_at,
+        is_correct=row[columns["is_correct"]] == "True",
+        mistake_type=(row[mistake_idx] if mistake_idx is not None else "") or "なし",
+        learning_memo=row[memo_idx] if memo_idx is not None else "",
+        timestamp=(row[ts_idx] if ts_idx is not None else "") or attempted_at,
+    )
 
 
 class ProblemStorage:
     """問題データのCSV入出力"""
 
-    def __init__(self, data_dir: str = "data"):
+    def __init__(
+        self,
+        data_dir: str = "data",
+        *,
+        lock_timeout: float = 10.0,
+        retry_on_conflict: bool = True,
+        read_only: bool = False,
+    ):
+        """
+        Args:
+            data_dir: データディレクトリのパス
+            lock_timeout: ロック取得のタイムアウト秒数(0で即時失敗)
+            retry_on_conflict: 書き込み競合時に再読み込みして再適用するかどうか
+            read_only: 開くときにファイルを作成しないかどうか(検査用)
+        """
         self.data_dir = Path(data_dir)
-        self.data_dir.mkdir(exist_ok=True)
         self.file_path = self.data_dir / "problems.csv"
-        self._ensure_file_exists()
+        self.retry_on_conflict = retry_on_conflict
+        self._lock = FileLock(self.file_path, timeout=lock_timeout)
+        self.tombstones = TombstoneLog(self.data_dir / "problems.tombstones.csv")
+        self.index = OffsetIndex(self.file_path)
+        if not read_only:
+            self.data_dir.mkdir(exist_ok=True)
+            self._ensure_file_exists()
+
+    @property
+    def generation(self) -> int:
+        """データファイルの世代番号(書き込みのたびに増加)"""
+        return self._lock.read_generation()
+
+    @property
+    def lock(self) -> FileLock:
+        """problems.csv と削除記録のロック"""
+        return self._lock
 
     def _ensure_file_exists(self):
         """CSVファイルが存在しない場合は作成"""
         if not self.file_path.exists():
             with self.file_path.open("w", newline="", encoding="utf-8") as f:
                 writer = csv.writer(f)
-                writer.writerow(
-                    ["id", "sentence", "answer_kanji", "reading", "created_at", "incorrect_count"]
-                )
+                writer.writerow(PROBLEM_HEADER)
 
     def _atomic_write_csv(self, file_path: Path, header: list[str], rows: list[list]) -> bool:
         """一時ファイル経由でアトミックにCSVを書き込む"""
@@ -58,36 +138,71 @@ class ProblemStorage:
                 tmp_path.unlink()
             return False
 
+    @staticmethod
+    def _to_row(problem: Problem) -> list:
+        """問題をCSV行に変換"""
+        return [
+            problem.id,
+            problem.sentence,
+            problem.answer_kanji,
+            problem.reading,
+            problem.created_at_iso,
+            problem.incorrect_count,
+        ]
+
+    def _commit_problems(self, mutate: Callable[[list[Problem]], bool]) -> bool:
+        """
+        楽観的並行制御で問題一覧を変更して書き込む
+
+        読み込みと変更は共有ロックのみで行い、排他ロックは書き込み直前の
+        世代番号の確認と置換の間だけ保持する。世代番号が変わっていた場合は
+        排他ロック下で再読み込みして変更を再適用する(retry_on_conflict=False
+        の場合は即時失敗)。
+
+        Args:
+            mutate: 問題一覧をその場で変更し、書き込みが必要ならTrueを返す関数
+        """
+        with self._lock.shared() as locked:
+            generation = locked.generation
+            problems = self._read_problems()
+
+        if not mutate(problems):
+            return False
+
+        with self._lock.exclusive() as locked:
+            if locked.generation != generation:
+                if not self.retry_on_conflict:
+                    app_logger.warning(f"書き込み競合を検出: {self.file_path}")
+                    print(
+                        f"書き込み競合エラー: {self.file_path} は他のプロセスにより更新されました"
+                    )
+                    return False
+                problems = self._read_problems()
+                if not mutate(problems):
+                    return False
+
+            rows = [self._to_row(p) for p in problems]
+            if not self._atomic_write_csv(self.file_path, PROBLEM_HEADER, rows):
+                return False
+            # 削除済みの行は書き込まれていないため、削除記録は不要になる
+            self.tombstones.clear()
+            locked.bump_generation()
+            return True
+
     def save_problem(self, problem: Problem) -> bool:
         """新規問題を追加(全体再書き込み方式)"""
-        try:
-            # 既存問題を読み込み
-            problems = self.load_problems()
 
+        def append_problem(problems: list[Problem]) -> bool:
             # ID重複チェック
             if any(p.id == problem.id for p in problems):
                 app_logger.warning(f"ID重複検出: {problem.id}")
                 print(f"ID重複エラー: {problem.id} は既に存在します")
                 return False
-
-            # 新規問題を追加
             problems.append(problem)
+            return True
 
-            # 全体を再書き込み
-            header = ["id", "sentence", "answer_kanji", "reading", "created_at", "incorrect_count"]
-            rows = [
-                [
-                    p.id,
-                    p.sentence,
-                    p.answer_kanji,
-                    p.reading,
-                    p.created_at.isoformat(),
-                    p.incorrect_count,
-                ]
-                for p in problems
-            ]
-
-            success = self._atomic_write_csv(self.file_path, header, rows)
+        try:
+            success = self._commit_problems(append_problem)
             if success:
                 app_logger.info(f"問題を保存: ID={problem.id}, 漢字={problem.answer_kanji}")
             return success
@@ -98,36 +213,18 @@ class ProblemStorage:
 
     def update_problem(self, problem: Problem) -> bool:
         """既存問題を更新(全体再書き込み方式)"""
-        try:
-            problems = self.load_problems()
 
+        def replace_problem(problems: list[Problem]) -> bool:
             # 該当問題を検索して更新
-            updated = False
             for i, p in enumerate(problems):
                 if p.id == problem.id:
                     problems[i] = problem
-                    updated = True
-                    break
-
-            if not updated:
-                print(f"更新エラー: ID {problem.id} が見つかりません")
-                return False
-
-            # 全体を再書き込み
-            header = ["id", "sentence", "answer_kanji", "reading", "created_at", "incorrect_count"]
-            rows = [
-                [
-                    p.id,
-                    p.sentence,
-                    p.answer_kanji,
-                    p.reading,
-                    p.created_at.isoformat(),
-                    p.incorrect_count,
-                ]
-                for p in problems
-            ]
+                    return True
+            print(f"更新エラー: ID {problem.id} が見つかりません")
+            return False
 
-            success = self._atomic_write_csv(self.file_path, header, rows)
+        try:
+            success = self._commit_problems(replace_problem)
             if success:
                 app_logger.info(f"問題を更新: ID={problem.id}")
             return success
@@ -136,128 +233,300 @@ class ProblemStorage:
             print(f"問題の更新に失敗しました: {e}")
             return False
 
+    def increment_incorrect_count(self, problem_id: str) -> bool:
+        """問題の不正解数を1増やす(読み込みから書き込みまでを競合なく行う)"""
+        return self.adjust_incorrect_counts({problem_id: 1})
+
+    def decrement_incorrect_count(self, problem_id: str) -> bool:
+        """問題の不正解数を1減らす(読み込みから書き込みまでを競合なく行う)"""
+        return self.adjust_incorrect_counts({problem_id: -1})
+
+    def adjust_incorrect_counts(self, deltas: dict[str, int]) -> bool:
+        """
+        複数の問題の不正解数をまとめて増減し、1回の書き込みで保存する(最低値は0)
+
+        採点では1回の送信で採点したすべての問題の増減を渡すため、問題ファイルの
+        書き込みは問題数によらず1回で済む。
+
+        Args:
+            deltas: 問題IDごとの不正解数の増減
+
+        Returns:
+            bool: 書き込んだかどうか(どの問題も見つからなかった場合は False)
+        """
+        if not deltas:
+            return False
+
+        def apply_adjustments(problems: list[Problem]) -> bool:
+            found = set()
+            for p in problems:
+                delta = deltas.get(p.id)
+                if delta is not None:
+                    p.incorrect_count = max(0, p.incorrect_count + delta)
+                    found.add(p.id)
+            for problem_id in deltas.keys() - found:
+                print(f"更新エラー: ID {problem_id} が見つかりません")
+            return bool(found)
+
+        try:
+            success = self._commit_problems(apply_adjustments)
+            if success:
+                app_logger.info(f"不正解数を更新: {len(deltas)}件")
+            return success
+
+        except Exception as e:
+            print(f"不正解数の更新に失敗しました: {e}")
+            return False
+
     def delete_problem_once(self, problem_id: str) -> bool:
-        """同一IDのレコードが複数存在する場合でも、最初の1件だけ削除する"""
+        """同一IDのレコードが複数存在する場合でも、最初の1件だけ削除する(削除記録の追記のみ)"""
         try:
-            # 生のCSV行を扱って最初の一致のみ削除
-            rows = []
-            with self.file_path.open(encoding="utf-8") as f:
-                reader = csv.reader(f)
-                rows = list(reader)
-            if not rows:
-                return True
-            header = rows[0]
-            # id列のインデックスを特定（後方互換）
-            try:
-                id_idx = header.index("id")
-            except ValueError:
-                id_idx = 0
-            removed = False
-            new_rows = [header]
-            for row in rows[1:]:
-                if not removed and len(row) > id_idx and row[id_idx] == problem_id:
-                    removed = True
-                    continue
-                new_rows.append(row)
-            with self.file_path.open("w", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                for r in new_rows:
-                    writer.writerow(r)
+            with self._lock.exclusive() as locked:
+                tombstones = self.tombstones.load()
+                # 索引で該当行だけを読み、削除されていない最初の一致の版だけを削除済みにする
+                header, rows = self.index.find_rows(problem_id)
+                for row in rows:
+                    created_at = row[header.index("created_at")]
+                    if is_tombstoned(tombstones, problem_id, created_at):
+                        continue
+                    self.tombstones.append([(problem_id, created_at)])
+                    locked.bump_generation()
+                    break
             return True
         except Exception as e:
             print(f"問題の部分削除に失敗しました: {e}")
             return False
 
+    def get_problem(self, problem_id: str) -> Problem | None:
+        """
+        IDで問題を1件取得(オフセット索引で該当行だけを読み込む)
+
+        同一IDの行が複数ある場合は load_problems() と同じく created_at が最新のものを返す。
+        """
+        try:
+            with self._lock.shared():
+                header, rows = self.index.find_rows(problem_id)
+                tombstones = self.tombstones.load()
+        except Exception as e:
+            print(f"問題の取得に失敗しました: {e}")
+            return None
+
+        columns = _column_indexes(header)
+        live = [
+            _pad_row(row, len(header))
+            for row in rows
+            if not is_tombstoned(tombstones, problem_id, row[columns["created_at"]])
+        ]
+        if not live:
+            return None
+        row = max(live, key=itemgetter(columns["created_at"]))
+        count_idx = columns.get("incorrect_count")
+        return Problem(
+            row[columns["sentence"]],
+            row[columns["answer_kanji"]],
+            row[columns["reading"]],
+            id=problem_id,
+            created_at=row[columns["created_at"]],
+            incorrect_count=row[count_idx] if count_idx is not None else 0,
+        )
+
     def load_problems(self) -> list[Problem]:
         """問題一覧を読み込み(重複自動解消付き)"""
-        problems: list[Problem] = []
         try:
-            with self.file_path.open(encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                rows = list(reader)
-
-            # ID重複を解消: 同一IDの場合は created_at が最新のものを採用
-            id_to_rows = {}
-            for row in rows:
-                row_id = row.get("id", "")
-                if not row_id:
-                    continue
-
-                # 後方互換: incorrect_count がない場合は 0 を設定
-                if (
-                    "incorrect_count" not in row
-                    or row["incorrect_count"] == ""
-                    or row["incorrect_count"] is None
-                ):
-                    row["incorrect_count"] = "0"
-
-                # 既存IDがある場合は created_at を比較
-                if row_id in id_to_rows:
-                    from datetime import datetime
-
-                    existing_created_at = datetime.fromisoformat(id_to_rows[row_id]["created_at"])
-                    new_created_at = datetime.fromisoformat(row["created_at"])
-                    if new_created_at > existing_created_at:
-                        id_to_rows[row_id] = row
-                else:
-                    id_to_rows[row_id] = row
+            with self._lock.shared():
+                return self._read_problems()
+        except Exception as e:
+            print(f"問題の読み込みに失敗しました: {e}")
+            return []
 
-            # Problem オブジェクトに変換
-            for row in id_to_rows.values():
-                problem = Problem.from_dict(row)
-                problems.append(problem)
+    def load_problem_columns(self) -> dict[str, list]:
+        """
+        問題一覧を列ごとのリストとして読み込む(load_problems() と同じ問題を同じ順に返す)
 
-            # created_at でソート（古い順）
-            problems.sort(key=lambda p: p.created_at)
+        Problem を作らないため、分析用に一部の列だけが必要な場合は load_problems() より軽い。
 
+        Returns:
+            dict: "id" / "answer_kanji" / "created_at"(ISO文字列) / "incorrect_count" の各列
+        """
+        try:
+            with self._lock.shared():
+                columns, rows = self._read_problem_rows()
         except Exception as e:
             print(f"問題の読み込みに失敗しました: {e}")
+            columns, rows = _column_indexes(PROBLEM_HEADER), []
+        now = datetime.now().isoformat()
+        id_idx = columns["id"]
+        kanji_idx = columns["answer_kanji"]
+        created_idx = columns["created_at"]
+        count_idx = columns.get("incorrect_count")
+        return {
+            "id": [row[id_idx] for row in rows],
+            "answer_kanji": [row[kanji_idx] for row in rows],
+            "created_at": [row[created_idx] or now for row in rows],
+            "incorrect_count": [
+                parse_incorrect_count(row[count_idx]) if count_idx is not None else 0
+                for row in rows
+            ],
+        }
+
+    def _read_problems(self) -> list[Problem]:
+        """
+        問題一覧を読み込む(ロックは呼び出し側で取得する)
+
+        列番号はヘッダから一度だけ求めて各行を位置で読み取る。重複解消と並べ替えは
+        created_at のISO文字列のまま比較し、日時の解析は参照時まで行わない。
+        """
+        columns, rows = self._read_problem_rows()
+        id_idx = columns["id"]
+        created_idx = columns["created_at"]
+        # 後方互換: incorrect_count 列がない場合は 0 とする
+        count_idx = columns.get("incorrect_count")
+        sentence_idx = columns["sentence"]
+        kanji_idx = columns["answer_kanji"]
+        reading_idx = columns["reading"]
+        return [
+            Problem(
+                row[sentence_idx],
+                row[kanji_idx],
+                row[reading_idx],
+                id=row[id_idx],
+                created_at=row[created_idx],
+                incorrect_count=row[count_idx] if count_idx is not None else 0,
+            )
+            for row in rows
+        ]
 
-        return problems
+    def _read_problem_rows(self) -> tuple[dict[str, int], list[list[str]]]:
+        """
+        削除記録と重複を除いた問題の行を created_at の古い順に読み込む
+        (ロックは呼び出し側で取得する)
+
+        Returns:
+            (列名→列番号, 行のリスト)
+        """
+        with self.file_path.open(encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, PROBLEM_HEADER)
+            rows = [_pad_row(row, len(header)) for row in reader if row]
+        tombstones = self.tombstones.load()
+
+        columns = _column_indexes(header)
+        id_idx = columns["id"]
+        created_idx = columns["created_at"]
+
+        # ID重複を解消: 同一IDの場合は created_at が最新のものを採用
+        id_to_row: dict[str, list[str]] = {}
+        for row in rows:
+            row_id = row[id_idx]
+            if not row_id:
+                continue
+            if tombstones and is_tombstoned(tombstones, row_id, row[created_idx]):
+                continue
+            existing = id_to_row.get(row_id)
+            if existing is None or row[created_idx] > existing[created_idx]:
+                id_to_row[row_id] = row
+
+        # created_at でソート（古い順）
+        return columns, sorted(id_to_row.values(), key=itemgetter(created_idx))
 
     def delete_problem(self, problem_id: str) -> bool:
-        """問題を削除"""
+        """問題を削除(削除記録の追記のみ。ファイルは次回の全体書き込みで反映)"""
         try:
-            problems = self.load_problems()
-            problems = [p for p in problems if p.id != problem_id]
-
-            with self.file_path.open("w", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow(
-                    ["id", "sentence", "answer_kanji", "reading", "created_at", "incorrect_count"]
-                )
-                for problem in problems:
-                    writer.writerow(
-                        [
-                            problem.id,
-                            problem.sentence,
-                            problem.answer_kanji,
-                            problem.reading,
-                            problem.created_at.isoformat(),
-                            problem.incorrect_count,
-                        ]
-                    )
+            with self._lock.exclusive() as locked:
+                self.tombstones.append([(problem_id, "")])
+                locked.bump_generation()
+            app_logger.info(f"問題を削除: ID={problem_id}")
             return True
         except Exception as e:
             print(f"問題の削除に失敗しました: {e}")
             return False
 
+    def fold_tombstones(self) -> bool:
+        """削除記録を problems.csv に反映して消去する(削除記録がなければ何もしない)"""
+        if not self.tombstones.file_path.exists():
+            return False
+        try:
+            return self._commit_problems(lambda _problems: True)
+        except Exception as e:
+            print(f"削除記録の反映に失敗しました: {e}")
+            return False
+
 
 class AttemptStorage:
     """試行データのCSV入出力"""
 
-    def __init__(self, data_dir: str = "data"):
+    def __init__(
+        self,
+        data_dir: str = "data",
+        *,
+        lock_timeout: float = 10.0,
+        retry_on_conflict: bool = True,
+        write_behind: bool = False,
+        fsync_policy: str = "batch",
+        fsync_interval: float = 1.0,
+        batch_size: int = 100,
+        read_only: bool = False,
+    ):
+        """
+        Args:
+            data_dir: データディレクトリのパス
+            lock_timeout: ロック取得のタイムアウト秒数(0で即時失敗)
+            retry_on_conflict: 書き込み競合時に再読み込みして再適用するかどうか
+            write_behind: enqueue_attempt() をバックグラウンドでまとめて追記するかどうか
+            fsync_policy: 追記時のfsyncポリシー("batch" / "interval" / "off")
+            fsync_interval: fsync_policy="interval" の場合の間隔秒数
+            batch_size: 1回の追記でまとめる最大件数
+            read_only: 開くときにファイルを作成・変換しないかどうか(検査用)。
+                列の追加・セグメントへの分割・退避した試行の再追記を行わない
+        """
         self.data_dir = Path(data_dir)
-        self.data_dir.mkdir(exist_ok=True)
         self.file_path = self.data_dir / "attempts.csv"
+        self.retry_on_conflict = retry_on_conflict
+        self._lock = FileLock(self.file_path, timeout=lock_timeout)
+        self.segments = AttemptSegmentStore(self.data_dir)
+        self.archive = AttemptSegmentStore(self.data_dir, ARCHIVE_DIR_NAME)
+        self.tombstones = TombstoneLog(self.data_dir / "attempts.tombstones.csv")
+        self.rollups = DailyRollupStore(self.data_dir)
+        self._active_month: str | None = None
+        self.pending_path = self.data_dir / PENDING_ATTEMPTS_FILE_NAME
+        self._write_queue: WriteBehindQueue | None = None
+        if read_only:
+            return
+        self.data_dir.mkdir(exist_ok=True)
         self._ensure_file_exists()
+        self._upgrade_header_if_needed()
+        self._rotate_segments_if_needed()
+        self.replay_pending()
+        if write_behind:
+            self._write_queue = WriteBehindQueue(
+                self._append_attempts,
+                fsync_policy=fsync_policy,
+                fsync_interval=fsync_interval,
+                batch_size=batch_size,
+                on_failure=self._save_pending,
+                sync=self._sync_attempts,
+                name=f"attempt-writer-{self.file_path}",
+            )
+
+    @property
+    def generation(self) -> int:
+        """データファイルの世代番号(書き込みのたびに増加)"""
+        return self._lock.read_generation()
+
+    @property
+    def lock(self) -> FileLock:
+        """試行ログ全体(attempts.csv・セグメント・アーカイブ)のロック"""
+        return self._lock
 
     def _ensure_file_exists(self):
         """CSVファイルが存在しない場合は作成"""
         if not self.file_path.exists():
             with self.file_path.open("w", newline="", encoding="utf-8") as f:
                 writer = csv.writer(f)
-                writer.writerow(["id", "problem_id", "attempted_at", "is_correct"])
+                writer.writerow(ATTEMPT_HEADER)
+            # 空の試行ログに対応する集計を作成し、以降は差分更新する
+            if not self.segments.manifest_path.exists():
+                self.rollups.rebuild([], self.generation)
 
     def _atomic_write_csv(self, file_path: Path, header: list[str], rows: list[list]) -> bool:
         """一時ファイル経由でアトミックにCSVを書き込む"""
@@ -288,26 +557,149 @@ class AttemptStorage:
                 tmp_path.unlink()
             return False
 
+    def _upgrade_header_if_needed(self) -> None:
+        """
+        attempts.csv のヘッダに不足している列があれば追加する
+
+        mistake_type・learning_memo 列がない従来形式のファイルを現在の列構成に
+        書き直す。封印済みセグメントは変更せず、読み込み時に既定値を補う。
+        """
+        with self.file_path.open(encoding="utf-8") as f:
+            header = next(csv.reader(f), ATTEMPT_HEADER)
+        if all(column in header for column in ATTEMPT_HEADER):
+            return
+
+        with self._lock.exclusive() as locked:
+            with self.file_path.open(encoding="utf-8") as f:
+                reader = csv.reader(f)
+                header = next(reader, ATTEMPT_HEADER)
+                rows = [row for row in reader if row]
+            missing = [column for column in ATTEMPT_HEADER if column not in header]
+            if not missing:
+                return
+            upgraded = header + missing
+            rows = [_pad_row(row, len(upgraded)) for row in rows]
+            if not self._atomic_write_csv(self.file_path, upgraded, rows):
+                msg = f"試行ログの列追加に失敗しました: {self.file_path}"
+                raise OSError(msg)
+            generation = locked.bump_generation()
+            self.rollups.advance(generation - 1, generation)
+            app_logger.info(f"試行ログに列を追加: {self.file_path}")
+
+    def _rotate_segments_if_needed(self) -> None:
+        """
+        月が替わっていれば attempts.csv の前月以前の行を封印済みセグメントに移す
+
+        attempts.csv には常に当月分(と後から追記された過去日時の少数の行)だけが残り、
+        新しい書き込みはこのファイルにのみ触れる。
+        """
+        current_month = datetime.now().strftime("%Y-%m")
+        if self._active_month == current_month:
+            return
+
+        with self._lock.exclusive() as locked:
+            active_month, _ = self.segments.load_manifest()
+            if active_month != current_month:
+                with self.file_path.open(encoding="utf-8") as f:
+                    reader = csv.reader(f)
+                    header = next(reader, ATTEMPT_HEADER)
+                    rows = [row for row in reader if row]
+
+                at_idx = header.index("attempted_at")
+                rows_by_month: dict[str, list[list[str]]] = {}
+                remaining = []
+                for row in rows:
+                    month = month_of(row[at_idx]) if len(row) > at_idx else current_month
+                    if month < current_month:
+                        rows_by_month.setdefault(month, []).append(row)
+                    else:
+                        remaining.append(row)
+
+                if rows_by_month:
+                    self.segments.seal(header, rows_by_month, current_month)
+                    if not self._atomic_write_csv(self.file_path, header, remaining):
+                        msg = f"セグメント分割後の書き込みに失敗しました: {self.file_path}"
+                        raise OSError(msg)
+                    generation = locked.bump_generation()
+                    self.rollups.advance(generation - 1, generation)
+                    app_logger.info(
+                        f"試行ログをセグメントに分割: {sum(len(r) for r in rows_by_month.values())}件"
+                    )
+                else:
+                    _, segments = self.segments.load_manifest()
+                    self.segments.save_manifest(current_month, segments)
+
+        self._active_month = current_month
+
+    def data_files(self) -> list[Path]:
+        """試行ログを構成するファイル一覧(封印済みセグメントを古い順、最後に attempts.csv)"""
+        segments = self.segments.segments_in_range(None, None)
+        return [self.segments.segment_path(s) for s in segments] + [self.file_path]
+
+    def _commit_attempts(
+        self, mutate: Callable[[list[Attempt]], bool], *, appended: list[Attempt] | None = None
+    ) -> bool:
+        """
+        楽観的並行制御で試行一覧を変更して書き込む
+
+        ProblemStorage._commit_problems と同じく、世代番号が変わっていた場合は
+        排他ロック下で再読み込みして変更を再適用する。
+
+        Args:
+            mutate: 試行一覧を変更する関数(False を返すと書き込まない)
+            appended: 変更で追加される試行(日別集計に加算する)
+        """
+        with self._lock.shared() as locked:
+            generation = locked.generation
+            attempts = self._read_attempts()
+
+        if not mutate(attempts):
+            return False
+
+        with self._lock.exclusive() as locked:
+            if locked.generation != generation:
+                if not self.retry_on_conflict:
+                    app_logger.warning(f"書き込み競合を検出: {self.file_path}")
+                    print(
+                        f"書き込み競合エラー: {self.file_path} は他のプロセスにより更新されました"
+                    )
+                    return False
+                attempts = self._read_attempts()
+                if not mutate(attempts):
+                    return False
+
+            rows = [
+                [
+                    a.id,
+                    a.problem_id,
+                    a.attempted_at_iso,
+                    a.is_correct,
+                    a.mistake_type,
+                    a.learning_memo,
+                ]
+                for a in attempts
+            ]
+            if not self._atomic_write_csv(self.file_path, ATTEMPT_HEADER, rows):
+                return False
+            generation = locked.bump_generation()
+            self.rollups.apply(appended or [], generation - 1, generation)
+            return True
+
     def save_attempt(self, attempt: Attempt) -> bool:
         """試行を保存(全体再書き込み方式)"""
-        try:
-            attempts = self.load_attempts()
 
-            # ID重複チェック
+        def append_attempt(attempts: list[Attempt]) -> bool:
+            # ID重複チェック(当月分のみ。封印済みセグメントは読み込まない)
             if any(a.id == attempt.id for a in attempts):
                 app_logger.warning(f"試行ID重複検出: {attempt.id}")
                 print(f"ID重複エラー: {attempt.id} は既に存在します")
                 return False
-
             attempts.append(attempt)
+            return True
 
-            # 全体を再書き込み
-            header = ["id", "problem_id", "attempted_at", "is_correct"]
-            rows = [
-                [a.id, a.problem_id, a.attempted_at.isoformat(), a.is_correct] for a in attempts
-            ]
-
-            success = self._atomic_write_csv(self.file_path, header, rows)
+        try:
+            self._rotate_segments_if_needed()
+            success = self._commit_attempts(append_attempt, appended=[attempt])
             if success:
                 app_logger.info(
                     f"試行を保存: ID={attempt.id}, 問題ID={attempt.problem_id}, 正解={attempt.is_correct}"
@@ -318,32 +710,287 @@ class AttemptStorage:
             print(f"試行の保存に失敗しました: {e}")
             return False
 
-    def load_attempts(self) -> list[Attempt]:
-        """試行一覧を読み込み(ID重複自動解消付き)"""
-        attempts = []
+    def enqueue_attempt(self, attempt: Attempt) -> bool:
+        """
+        試行を書き込みキューに追加(write_behind=True の場合)
+
+        書き込みはバックグラウンドスレッドがまとめて追記する。
+        write_behind=False の場合は save_attempt() と同じく同期的に保存する。
+        """
+        if self._write_queue is None:
+            return self.save_attempt(attempt)
         try:
+            self._write_queue.enqueue(attempt)
+            return True
+        except Exception as e:
+            print(f"試行のキュー追加に失敗しました: {e}")
+            return False
+
+    def flush(self) -> None:
+        """書き込みキューに積まれた試行がすべて保存されるまで待機"""
+        if self._write_queue is not None:
+            self._write_queue.flush()
+
+    def close(self) -> None:
+        """書き込みキューを書き出して停止"""
+        if self._write_queue is not None:
+            self._write_queue.close()
+
+    def _append_attempts(self, attempts: list[Attempt], fsync: bool) -> None:
+        """試行をまとめてファイル末尾に追記(既存行は書き換えない)"""
+        self._rotate_segments_if_needed()
+        with self._lock.exclusive() as locked:
+            # 既存ファイルの列構成に合わせて追記する
             with self.file_path.open(encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                rows = list(reader)
-
-            # ID重複を解消（同一IDの場合は最終行を採用）
-            id_to_row = {}
-            for row in rows:
-                row_id = row.get("id", "")
-                if not row_id:
-                    continue
-                id_to_row[row_id] = row
+                header = next(csv.reader(f), ATTEMPT_HEADER)
+            with self.file_path.open("a", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                for attempt in attempts:
+                    data = attempt.to_dict()
+                    writer.writerow([data.get(column, "") for column in header])
+                f.flush()
+                if fsync:
+                    os.fsync(f.fileno())
+            generation = locked.bump_generation()
+            self.rollups.apply(attempts, generation - 1, generation)
+        app_logger.info(f"試行を一括追記: {len(attempts)}件")
+
+    def _sync_attempts(self) -> None:
+        """追記済みの試行を fsync する"""
+        with self.file_path.open("rb") as f:
+            os.fsync(f.fileno())
+
+    def _save_pending(self, attempts: list[Attempt]) -> None:
+        """追記できなかった試行を退避ファイルに追記する(次回起動時に再追記される)"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if not self.pending_path.exists():
+            writer.writerow(ATTEMPT_HEADER)
+        for attempt in attempts:
+            data = attempt.to_dict()
+            writer.writerow([data.get(column, "") for column in ATTEMPT_HEADER])
+        # 1回の書き込みで追記し、行の途中で他の書き込みと混ざらないようにする
+        with self.pending_path.open("a", newline="", encoding="utf-8") as f:
+            f.write(buffer.getvalue())
+            f.flush()
+            os.fsync(f.fileno())
+
+    def replay_pending(self) -> int:
+        """
+        退避ファイルの試行を試行ログに追記する
+
+        退避ファイルは名前を変えて取得するため、複数のプロセスが同時に呼んでも
+        二重に追記されない。既に保存済みのIDは追記しない。
+
+        Returns:
+            int: 追記した件数
+        """
+        claimed = self.pending_path.with_name(f"{self.pending_path.name}.{os.getpid()}.replay")
+        try:
+            self.pending_path.replace(claimed)
+        except FileNotFoundError:
+            return 0
+
+        try:
+            with claimed.open(encoding="utf-8", newline="") as f:
+                pending = [Attempt.from_dict(row) for row in csv.DictReader(f) if row.get("id")]
+            attempts = [a for a in pending if self.get_attempt(a.id) is None]
+            if attempts:
+                self._append_attempts(attempts, fsync=True)
+            app_logger.info(f"退避した試行を追記: {len(attempts)}件")
+        except Exception as e:
+            app_logger.error(f"退避した試行の追記に失敗しました: {e}")
+            # 次回に再試行できるよう退避ファイルに戻す
+            with claimed.open(encoding="utf-8", newline="") as f:
+                pending = [Attempt.from_dict(row) for row in csv.DictReader(f) if row.get("id")]
+            self._save_pending(pending)
+            attempts = []
+        claimed.unlink(missing_ok=True)
+        return len(attempts)
+
+    def load_attempts(
+        self,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        include_archived: bool = False,
+    ) -> list[Attempt]:
+        """
+        試行一覧を読み込み(ID重複自動解消付き)
 
-            # Attempt オブジェクトに変換
-            for row in id_to_row.values():
-                attempt = Attempt.from_dict(row)
-                attempts.append(attempt)
+        Args:
+            start: この日時以降の試行のみ読み込む
+            end: この日時以前の試行のみ読み込む
+            include_archived: 集約済みで圧縮アーカイブに移した試行も読み込むかどうか
 
+        期間を指定した場合は、マニフェストで該当月のセグメントだけを開く。
+        """
+        # 書き込みキューに残っている試行も読み込み結果に含める
+        self.flush()
+        start_month = start.strftime("%Y-%m") if start else None
+        end_month = end.strftime("%Y-%m") if end else None
+        try:
+            with self._lock.shared():
+                paths: list[Path] = []
+                if include_archived:
+                    archived = self.archive.segments_in_range(start_month, end_month)
+                    paths.extend(self.archive.segment_path(s) for s in archived)
+                segments = self.segments.segments_in_range(start_month, end_month)
+                paths.extend(self.segments.segment_path(s) for s in segments)
+                paths.append(self.file_path)
+                attempts = self._read_attempts(paths)
         except Exception as e:
             print(f"試行の読み込みに失敗しました: {e}")
+            return []
 
+        # 日時を解析せずISO文字列のまま比較する
+        if start is not None:
+            start_iso = start.isoformat()
+            attempts = [a for a in attempts if a.attempted_at_iso >= start_iso]
+        if end is not None:
+            end_iso = end.isoformat()
+            attempts = [a for a in attempts if a.attempted_at_iso <= end_iso]
         return attempts
 
+    def _read_attempts(self, paths: list[Path] | None = None) -> list[Attempt]:
+        """
+        試行一覧を読み込む(ロックは呼び出し側で取得する)
+
+        ファイルごとにヘッダから列番号を求めて各行を位置で読み取り、
+        繰り返し現れる problem_id と mistake_type は intern して共有する。
+
+        Args:
+            paths: 読み込むファイル(省略時は attempts.csv のみ)
+        """
+        tombstones = self.tombstones.load()
+        intern = sys.intern
+
+        # ID重複を解消（同一IDの場合は最終行を採用）
+        id_to_values: dict[str, tuple[str, str, str, str, str, str]] = {}
+        for path in paths or [self.file_path]:
+            with open_segment(path) as f:
+                reader = csv.reader(f)
+                header = next(reader, ATTEMPT_HEADER)
+                columns = _column_indexes(header)
+                id_idx = columns["id"]
+                pid_idx = columns["problem_id"]
+                at_idx = columns["attempted_at"]
+                correct_idx = columns["is_correct"]
+                mistake_idx = columns.get("mistake_type")
+                memo_idx = columns.get("learning_memo")
+                ts_idx = columns.get("timestamp")
+                width = len(header)
+
+                for row in reader:
+                    if not row:
+                        continue
+                    if len(row) < width:
+                        _pad_row(row, width)
+                    row_id = row[id_idx]
+                    if not row_id or row_id in tombstones:
+                        continue
+                    id_to_values[row_id] = (
+                        intern(row[pid_idx]),
+                        row[at_idx],
+                        row[correct_idx],
+                        # 後方互換: mistake_type 列がない・空の行は "なし" とする
+                        intern(row[mistake_idx] or "なし") if mistake_idx is not None else "なし",
+                        row[memo_idx] if memo_idx is not None else "",
+                        row[ts_idx] if ts_idx is not None else "",
+                    )
+
+        # Attempt オブジェクトに変換（日時はISO文字列のまま保持し、参照時に解析される）
+        from_stored = Attempt.from_stored
+        return [
+            from_stored(
+                id=row_id,
+                problem_id=problem_id,
+                attempted_at=attempted_at,
+                is_correct=is_correct == "True",
+                mistake_type=mistake,
+                learning_memo=memo,
+                timestamp=ts or attempted_at,
+            )
+            for row_id, (problem_id, attempted_at, is_correct, mistake, memo, ts) in (
+                id_to_values.items()
+            )
+        ]
+
+    def rebuild_rollups(self) -> bool:
+        """日別集計を試行ログ全体(アーカイブを含む)から作り直す"""
+        self.flush()
+        try:
+            with self._lock.shared() as locked:
+                generation = locked.generation
+                archived = self.archive.segments_in_range(None, None)
+                paths = [self.archive.segment_path(s) for s in archived] + self.data_files()
+                self.rollups.rebuild(self._read_attempts(paths), generation)
+            return True
+
+        except Exception as e:
+            app_logger.exception(f"日別集計の再構築に失敗しました: {e}")
+            print(f"日別集計の再構築に失敗しました: {e}")
+            return False
+
+    def ensure_rollups(self) -> bool:
+        """日別集計が最新でなければ作り直す(削除や他の手段での書き換えの後など)"""
+        self.flush()
+        if self.rollups.is_current(self.generation):
+            return True
+        return self.rebuild_rollups()
+
+    def get_attempt(self, attempt_id: str) -> Attempt | None:
+        """IDで試行を1件取得(オフセット索引で該当行だけを読み込む。アーカイブは対象外)"""
+        self.flush()
+        try:
+            with self._lock.shared():
+                if attempt_id in self.tombstones.load():
+                    return None
+                found = self._find_attempt_row(attempt_id)
+        except Exception as e:
+            print(f"試行の取得に失敗しました: {e}")
+            return None
+        if found is None:
+            return None
+
+        header, row = found
+        return _attempt_from_row(_column_indexes(header), row)
+
+    def read_appended(self, offset: int, end: int) -> list[Attempt]:
+        """
+        attempts.csv の offset から end までに追記された試行を読み込む
+
+        ロックは呼び出し側で取得する。削除記録のあるIDは除き、同じIDの行は後の行を採用する。
+        """
+        with self.file_path.open("rb") as f:
+            header = next(csv.reader([f.readline().decode("utf-8")]), ATTEMPT_HEADER)
+            f.seek(offset)
+            text = f.read(end - offset).decode("utf-8")
+        columns = _column_indexes(header)
+        id_idx = columns["id"]
+        width = len(header)
+        tombstones = self.tombstones.load()
+        rows: dict[str, list[str]] = {}
+        for row in csv.reader(io.StringIO(text, newline="")):
+            if not row:
+                continue
+            _pad_row(row, width)
+            if row[id_idx] and row[id_idx] not in tombstones:
+                rows[row[id_idx]] = row
+        return [_attempt_from_row(columns, row) for row in rows.values()]
+
+    def _find_attempt_row(self, attempt_id: str) -> tuple[list[str], list[str]] | None:
+        """
+        試行の行を索引で探す(ロックは呼び出し側で取得する)
+
+        load_attempts() と同じく後に書かれた行を優先するため、attempts.csv から
+        新しいセグメントの順に探し、ファイル内では最後の一致を返す。
+        """
+        for path in reversed(self.data_files()):
+            header, rows = OffsetIndex(path).find_rows(attempt_id)
+            if rows:
+                return header, _pad_row(rows[-1], len(header))
+        return None
+
     def get_attempts_by_problem(self, problem_id: str) -> list[Attempt]:
         """特定の問題の試行を取得"""
         attempts = self.load_attempts()
@@ -361,25 +1008,37 @@ class AttemptStorage:
         return saved_count
 
     def delete_attempt(self, attempt_id: str) -> bool:
-        """試行を削除(全体再書き込み方式)"""
-        try:
-            attempts = self.load_attempts()
-            attempts = [a for a in attempts if a.id != attempt_id]
+        """試行を削除(削除記録の追記のみ)"""
+        return self.delete_attempts([attempt_id]) == 1
 
-            # 全体を再書き込み
-            header = ["id", "problem_id", "attempted_at", "is_correct"]
-            rows = [
-                [a.id, a.problem_id, a.attempted_at.isoformat(), a.is_correct] for a in attempts
-            ]
+    def delete_attempts(self, attempt_ids: list[str]) -> int:
+        """
+        複数の試行を一括削除
 
-            success = self._atomic_write_csv(self.file_path, header, rows)
-            if success:
-                app_logger.info(f"試行を削除: ID={attempt_id}")
-            else:
-                app_logger.error(f"試行の削除に失敗: ID={attempt_id}")
-            return success
+        attempts.csv やセグメントは書き換えず、削除記録を1回追記するだけで完了する。
+        記録はセグメントの集約時(AttemptCompactor)にファイルへ反映される。
+        既に削除済みのIDは件数に含めない。
+
+        Returns:
+            int: 削除した件数
+        """
+        if not attempt_ids:
+            return 0
+        try:
+            with self._lock.exclusive() as locked:
+                tombstones = self.tombstones.load()
+                targets = [
+                    attempt_id
+                    for attempt_id in dict.fromkeys(attempt_ids)
+                    if attempt_id not in tombstones
+                ]
+                if targets:
+                    self.tombstones.append([(attempt_id, "") for attempt_id in targets])
+                    locked.bump_generation()
+            app_logger.info(f"試行を削除: {len(targets)}件")
+            return len(targets)
 
         except Exception as e:
-            app_logger.exception(f"試行の削除に失敗しました: ID={attempt_id}, エラー={e}")
+            app_logger.exception(f"試行の削除に失敗しました: 件数={len(attempt_ids)}, エラー={e}")
             print(f"試行の削除に失敗しました: {e}")
-            return False
+            return 0
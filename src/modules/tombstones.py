@@ -0,0 +1,66 @@
+"""
+削除記録(トゥームストーン)の管理
+"""
+
+import csv
+from datetime import datetime
+from pathlib import Path
+
+TOMBSTONE_HEADER = ["id", "version", "deleted_at"]
+
+
+def is_tombstoned(tombstones: dict[str, set[str]], row_id: str, version: str = "") -> bool:
+    """
+    行が削除済みかどうかを判定
+
+    Args:
+        tombstones: TombstoneLog.load() の結果
+        row_id: 行のID
+        version: 行のバージョン(問題の場合は created_at)
+    """
+    versions = tombstones.get(row_id)
+    return versions is not None and ("" in versions or version in versions)
+
+
+class TombstoneLog:
+    """
+    削除済みレコードの記録
+
+    削除はデータファイルを書き換えずにこのファイルへ1行追記するだけで完了し、
+    読み込み側が該当行を除外する。version が空の記録は同一IDのすべての行を、
+    空でない記録はそのバージョン(問題の created_at)の行だけを削除済みとする。
+    記録はデータファイルの全体再書き込み(集約)時に反映されて消去される。
+    ロックは呼び出し側が対象データファイルのロックで取得する。
+    """
+
+    def __init__(self, file_path: Path):
+        self.file_path = Path(file_path)
+
+    def append(self, entries: list[tuple[str, str]]) -> None:
+        """
+        削除記録を追記
+
+        Args:
+            entries: (ID, バージョン) のリスト
+        """
+        deleted_at = datetime.now().isoformat()
+        is_new = not self.file_path.exists()
+        with self.file_path.open("a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            if is_new:
+                writer.writerow(TOMBSTONE_HEADER)
+            writer.writerows([row_id, version, deleted_at] for row_id, version in entries)
+
+    def load(self) -> dict[str, set[str]]:
+        """削除記録を {ID: バージョンの集合} として読み込む"""
+        tombstones: dict[str, set[str]] = {}
+        if not self.file_path.exists():
+            return tombstones
+        with self.file_path.open(encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                tombstones.setdefault(row["id"], set()).add(row.get("version") or "")
+        return tombstones
+
+    def clear(self) -> None:
+        """集約済みの削除記録を消去"""
+        self.file_path.unlink(missing_ok=True)
@@ -11,21 +11,19 @@ def get_current_datetime() -> datetime:
     return datetime.now()
 
 
+# ひらがな→カタカナの変換表(一括読み込み時も1文字ずつの連結を避ける)
+_HIRAGANA_TO_KATAKANA = str.maketrans(
+    {chr(code): chr(code - ord("あ") + ord("ア")) for code in range(ord("あ"), ord("ん") + 1)}
+)
+
+
 def normalize_reading(reading: str) -> str:
     """読みをカタカナに正規化"""
     if not reading:
         return ""
 
     # ひらがなをカタカナに変換
-    katakana = ""
-    for char in reading:
-        if "あ" <= char <= "ん":
-            # ひらがなをカタカナに変換
-            katakana += chr(ord(char) - ord("あ") + ord("ア"))
-        else:
-            katakana += char
-
-    return katakana
+    return reading.translate(_HIRAGANA_TO_KATAKANA)
 
 
 def validate_reading_format(reading: str) -> bool:
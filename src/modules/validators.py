@@ -4,6 +4,7 @@
 
 from dataclasses import dataclass
 
+from .kanji_grades import SECONDARY_GRADE, grade_of
 from .utils import contains_kanji, validate_reading_format
 
 
@@ -82,3 +83,18 @@ class InputValidator:
             errors.append("読みはひらがなまたはカタカナで入力してください")
 
         return ValidationResult(is_valid=len(errors) == 0, errors=errors)
+
+    def validate_grade(self, answer_kanji: str, grade: int) -> ValidationResult:
+        """回答漢字が指定した学年までに習う漢字かどうかのバリデーション"""
+        errors = []
+
+        for char in dict.fromkeys(answer_kanji):
+            char_grade = grade_of(char)
+            if char_grade is None or char_grade <= grade:
+                continue
+            if char_grade == SECONDARY_GRADE:
+                errors.append(f"「{char}」は小学校で習わない漢字です")
+            else:
+                errors.append(f"「{char}」は{char_grade}年生で習う漢字です")
+
+        return ValidationResult(is_valid=len(errors) == 0, errors=errors)
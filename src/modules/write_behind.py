@@ -0,0 +1,163 @@
+"""
+書き込み遅延(ライトビハインド)キュー
+"""
+
+import atexit
+import queue
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from .logger import app_logger
+
+FSYNC_POLICIES = ("batch", "interval", "off")
+
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """
+    バックグラウンドスレッドでまとめて書き込むキュー
+
+    enqueue() はメモリ上のキューに追加するだけで即座に戻る。書き込みスレッドは
+    キューに溜まった項目を最大 batch_size 件ずつまとめて append_batch に渡す。
+    再試行しても追記できなかったバッチは on_failure に渡し、捨てずに退避させる。
+    fsync_policy="interval" では、次のバッチが来なくても最後の追記から
+    fsync_interval 秒後に sync を呼び、書き込んだ内容を永続化する。
+    """
+
+    def __init__(
+        self,
+        append_batch: Callable[[list[Any], bool], None],
+        *,
+        fsync_policy: str = "batch",
+        fsync_interval: float = 1.0,
+        batch_size: int = 100,
+        max_retries: int = 3,
+        on_failure: Callable[[list[Any]], None] | None = None,
+        sync: Callable[[], None] | None = None,
+        name: str = "write-behind",
+    ):
+        """
+        Args:
+            append_batch: (項目リスト, fsyncするかどうか) を受け取り追記する関数
+            fsync_policy: "batch"(バッチごと) / "interval"(一定間隔) / "off"(なし)
+            fsync_interval: fsync_policy="interval" の場合の間隔秒数
+            batch_size: 1回の追記でまとめる最大件数
+            max_retries: 追記失敗時の再試行回数
+            on_failure: 再試行しても追記できなかったバッチを受け取る関数
+            sync: 追記済みの内容を fsync する関数(fsync_policy="interval" で使う)
+            name: 書き込みスレッド名
+        """
+        if fsync_policy not in FSYNC_POLICIES:
+            msg = f"不正なfsyncポリシーです: {fsync_policy}"
+            raise ValueError(msg)
+
+        self._append_batch = append_batch
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self._on_failure = on_failure
+        self._sync = sync
+        self._queue: queue.Queue = queue.Queue()
+        self._last_fsync = time.monotonic()
+        self._unsynced = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def enqueue(self, item: Any) -> None:
+        """項目をキューに追加"""
+        if self._closed:
+            msg = "書き込みキューは既に停止しています"
+            raise RuntimeError(msg)
+        self._queue.put(item)
+
+    def flush(self) -> None:
+        """キューに積まれた項目がすべて書き込まれるまで待機"""
+        self._queue.join()
+
+    def close(self) -> None:
+        """キューを書き出してから書き込みスレッドを停止"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        atexit.unregister(self.close)
+
+    def _run(self) -> None:
+        """書き込みスレッド本体"""
+        stopping = False
+        while not stopping:
+            try:
+                first = self._queue.get(timeout=self._sync_timeout())
+            except queue.Empty:
+                self._sync_now()
+                continue
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if _STOP in batch:
+                stopping = True
+            items = [item for item in batch if item is not _STOP]
+            if items:
+                self._write(items, final=stopping)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write(self, items: list[Any], final: bool) -> None:
+        """fsyncポリシーに従ってバッチを追記"""
+        if self.fsync_policy == "batch":
+            fsync = True
+        elif self.fsync_policy == "interval":
+            fsync = final or time.monotonic() - self._last_fsync >= self.fsync_interval
+        else:
+            fsync = False
+
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                self._append_batch(items, fsync)
+                if fsync:
+                    self._last_fsync = time.monotonic()
+                    self._unsynced = False
+                elif self.fsync_policy == "interval":
+                    self._unsynced = True
+                return
+            except Exception as e:
+                app_logger.error(f"一括追記に失敗しました({attempt}/{self.max_retries}回目): {e}")
+                time.sleep(0.1 * attempt)
+
+        if self._on_failure is not None:
+            try:
+                self._on_failure(items)
+                app_logger.error(f"一括追記を断念し、{len(items)}件を退避しました")
+                return
+            except Exception as e:
+                app_logger.error(f"追記できなかった項目の退避に失敗しました: {e}")
+        app_logger.critical(f"一括追記を断念しました: {len(items)}件が保存されていません")
+
+    def _sync_timeout(self) -> float | None:
+        """次の fsync までの待ち時間(fsync 待ちの追記がなければ None)"""
+        if not self._unsynced or self._sync is None:
+            return None
+        return max(0.0, self._last_fsync + self.fsync_interval - time.monotonic())
+
+    def _sync_now(self) -> None:
+        """fsync 待ちの追記を永続化(失敗した場合は fsync_interval 秒後に再試行する)"""
+        if self._sync is None:
+            return
+        self._last_fsync = time.monotonic()
+        try:
+            self._sync()
+        except Exception as e:
+            app_logger.error(f"fsyncに失敗しました: {e}")
+            return
+        self._unsynced = False
@@ -0,0 +1,127 @@
+"""
+試行ログの月別セグメントのテスト
+"""
+
+import csv
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from src.modules.models import Attempt
+from src.modules.storage import ATTEMPT_HEADER, AttemptStorage
+
+
+def _write_legacy_attempts(data_dir: str, timestamps: list[str]) -> None:
+    """複数月にまたがる従来形式の attempts.csv を作成"""
+    with (Path(data_dir) / "attempts.csv").open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(ATTEMPT_HEADER)
+        for i, timestamp in enumerate(timestamps):
+            writer.writerow([f"attempt-{i}", f"problem-{i % 3}", timestamp, i % 2 == 0])
+
+
+class TestAttemptSegments:
+    """AttemptStorageのセグメント分割のテスト"""
+
+    def setup_method(self):
+        """各テストメソッド実行前の準備"""
+        self.timestamps = [
+            "2025-01-10T10:00:00",
+            "2025-01-20T10:00:00",
+            "2025-02-05T10:00:00",
+            "2025-03-15T10:00:00",
+            datetime.now().isoformat(),
+        ]
+
+    def test_rotation_seals_past_months(self):
+        """前月以前の行がセグメントに移されるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            _write_legacy_attempts(temp_dir, self.timestamps)
+            storage = AttemptStorage(temp_dir)
+
+            active_month, segments = storage.segments.load_manifest()
+            assert active_month == datetime.now().strftime("%Y-%m")
+            assert [s.month for s in segments] == ["2025-01", "2025-02", "2025-03"]
+            assert segments[0].rows == 2
+            assert segments[0].min_attempted_at == "2025-01-10T10:00:00"
+            assert segments[0].max_attempted_at == "2025-01-20T10:00:00"
+
+            with storage.file_path.open(encoding="utf-8") as f:
+                assert len(list(csv.DictReader(f))) == 1
+            assert len(storage.load_attempts()) == len(self.timestamps)
+
+    def test_range_query_opens_only_relevant_segments(self):
+        """期間指定の読み込みが該当月のセグメントのみを対象にするテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            _write_legacy_attempts(temp_dir, self.timestamps)
+            storage = AttemptStorage(temp_dir)
+
+            segments = storage.segments.segments_in_range("2025-02", "2025-02")
+            assert [s.month for s in segments] == ["2025-02"]
+
+            attempts = storage.load_attempts(
+                start=datetime.fromisoformat("2025-02-01T00:00:00"),
+                end=datetime.fromisoformat("2025-03-31T23:59:59"),
+            )
+            assert sorted(a.id for a in attempts) == ["attempt-2", "attempt-3"]
+
+    def test_new_writes_touch_only_active_file(self):
+        """新しい書き込みが封印済みセグメントを変更しないテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            _write_legacy_attempts(temp_dir, self.timestamps)
+            storage = AttemptStorage(temp_dir)
+            segment_paths = storage.data_files()[:-1]
+            before = {p: p.stat().st_mtime_ns for p in segment_paths}
+
+            assert storage.save_attempt(Attempt(problem_id="problem-0", is_correct=True))
+
+            assert {p: p.stat().st_mtime_ns for p in segment_paths} == before
+            assert len(storage.load_attempts()) == len(self.timestamps) + 1
+
+    def test_delete_attempt_in_segment(self):
+        """封印済みセグメント内の試行を削除できるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            _write_legacy_attempts(temp_dir, self.timestamps)
+            storage = AttemptStorage(temp_dir)
+            segment_paths = storage.data_files()[:-1]
+            before = {p: p.stat().st_mtime_ns for p in segment_paths}
+
+            assert storage.delete_attempt("attempt-0") is True
+
+            assert "attempt-0" not in {a.id for a in storage.load_attempts()}
+            # 削除記録の追記のみで、封印済みセグメントは書き換えない
+            assert {p: p.stat().st_mtime_ns for p in segment_paths} == before
+
+    def test_late_rows_create_new_segment_version(self):
+        """過去月の行は封印済みセグメントを変更せず、新しい版に移されるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            _write_legacy_attempts(temp_dir, self.timestamps)
+            storage = AttemptStorage(temp_dir)
+            sealed = storage.data_files()[0]
+            assert sealed.name == "attempts_202501.csv"
+            before = sealed.read_bytes()
+            assert storage.get_attempt("attempt-0") is not None
+
+            assert storage.save_attempt(
+                Attempt(
+                    problem_id="problem-0",
+                    is_correct=True,
+                    attempted_at=datetime.fromisoformat("2025-01-25T10:00:00"),
+                )
+            )
+            # 月替わりを再現してセグメントへの分割をやり直す
+            _, segments = storage.segments.load_manifest()
+            storage.segments.save_manifest("2025-04", segments)
+            storage._active_month = None
+            storage._rotate_segments_if_needed()
+
+            _, segments = storage.segments.load_manifest()
+            assert segments[0].file == "attempts_202501.v2.csv"
+            assert segments[0].rows == 3
+            assert segments[0].max_attempted_at == "2025-01-25T10:00:00"
+            new_version = storage.segments.segment_path(segments[0])
+            assert new_version.read_bytes().startswith(before)
+            assert not sealed.exists()
+            assert not list(storage.segments.segment_dir.glob("*.tmp"))
+            assert len(storage.load_attempts()) == len(self.timestamps) + 1
+            assert storage.get_attempt("attempt-0") is not None
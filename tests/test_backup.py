@@ -0,0 +1,369 @@
+"""
+バックアップ機能のテスト
+"""
+
+import gzip
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from src.modules import backup
+from src.modules.attempt_segments import AttemptSegmentStore
+from src.modules.backup import BackupManager, BackupScheduler
+
+
+class TestBackupManager:
+    """BackupManagerのテスト"""
+
+    def setup_method(self):
+        """各テストメソッド実行前の準備"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.temp_dir.name)
+        self.data_dir = root / "data"
+        self.backup_dir = root / "backups"
+        self.data_dir.mkdir()
+        (self.data_dir / "problems.csv").write_text("id,sentence\np1,学校\n", encoding="utf-8")
+        (self.data_dir / "attempts.csv").write_text("id,problem_id\na1,p1\n", encoding="utf-8")
+        self.manager = BackupManager(str(self.data_dir), str(self.backup_dir))
+
+    def teardown_method(self):
+        """各テストメソッド実行後のクリーンアップ"""
+        self.temp_dir.cleanup()
+
+    def _objects(self) -> list[Path]:
+        """保存されたオブジェクト一覧"""
+        return [p for p in (self.backup_dir / "objects").glob("*/*") if p.is_file()]
+
+    def test_unchanged_files_are_skipped(self):
+        """変更がなければマニフェストもオブジェクトも増えないテスト"""
+        assert self.manager.create_backup()
+        assert self.manager.create_backup()
+        assert len(self.manager.list_backups()) == 1
+        assert len(self._objects()) == 2
+
+        # 更新時刻だけ変わっても内容が同じなら新しいバックアップは作らない
+        problems = self.data_dir / "problems.csv"
+        os.utime(problems, ns=(time.time_ns(), time.time_ns() + 10**9))
+        assert self.manager.create_backup()
+        assert len(self.manager.list_backups()) == 1
+
+        (self.data_dir / "attempts.csv").write_text(
+            "id,problem_id\na1,p1\na2,p1\n", encoding="utf-8"
+        )
+        assert self.manager.create_backup()
+        backups = self.manager.list_backups()
+        assert len(backups) == 2
+        problem_hashes = {b["files"]["problems.csv"]["hash"] for b in backups}
+        assert len(problem_hashes) == 1
+        assert len(self._objects()) == 3
+
+    def test_identical_content_is_stored_once(self):
+        """同じ内容のファイルはオブジェクトを共有するテスト"""
+        (self.data_dir / "copy.csv").write_text("id,sentence\np1,学校\n", encoding="utf-8")
+        assert self.manager.create_backup()
+        files = self.manager.list_backups()[0]["files"]
+        assert files["copy.csv"]["hash"] == files["problems.csv"]["hash"]
+        assert len(self._objects()) == 2
+
+    def test_restore(self):
+        """バックアップ時点の内容に復元するテスト"""
+        self.manager.create_backup()
+        backup_id = self.manager.list_backups()[0]["id"]
+        (self.data_dir / "problems.csv").write_text("id,sentence\n", encoding="utf-8")
+        (self.data_dir / "attempts.csv").write_text("id,problem_id\n", encoding="utf-8")
+
+        assert self.manager.restore_backup(backup_id, files=["problems.csv"])
+        assert (self.data_dir / "problems.csv").read_text(encoding="utf-8").endswith("p1,学校\n")
+        assert (self.data_dir / "attempts.csv").read_text(encoding="utf-8") == "id,problem_id\n"
+
+        assert self.manager.restore_backup(backup_id)
+        assert (self.data_dir / "attempts.csv").read_text(encoding="utf-8").endswith("a1,p1\n")
+        assert not self.manager.restore_backup("20000101_000000_000000")
+
+    def test_cleanup_keeps_latest_and_collects_objects(self):
+        """古いバックアップと参照されないオブジェクトを削除するテスト"""
+        self.manager.create_backup()
+        (self.data_dir / "attempts.csv").write_text("id,problem_id\n", encoding="utf-8")
+        self.manager.create_backup()
+
+        # すべてのマニフェストを保持期間より前にして目録を作り直す
+        old = (datetime.now() - timedelta(days=60)).isoformat()
+        for path in (self.backup_dir / "manifests").glob("*.json"):
+            manifest = json.loads(path.read_text(encoding="utf-8"))
+            manifest["created_at"] = old
+            path.write_text(json.dumps(manifest), encoding="utf-8")
+        (self.backup_dir / "catalog.sqlite3").unlink()
+        self.manager = BackupManager(str(self.data_dir), str(self.backup_dir))
+        assert len(self.manager.list_backups()) == 2
+
+        # 古い1件のマニフェストと、そこからのみ参照されるオブジェクトが削除される
+        assert self.manager.cleanup_old_backups() == 2
+        assert len(list((self.backup_dir / "manifests").glob("*.json"))) == 1
+        backups = self.manager.list_backups()
+        assert len(backups) == 1
+        assert len(self._objects()) == 2
+        assert self.manager.restore_backup(backups[0]["id"])
+
+    def test_legacy_backups(self):
+        """以前の形式のバックアップの復元と削除のテスト"""
+        legacy = self.backup_dir / "attempt_summaries_20240101_000000.csv"
+        legacy.write_text("problem_id,total\np9,3\n", encoding="utf-8")
+        old = time.time() - 60 * 86400
+        os.utime(legacy, (old, old))
+        manager = BackupManager(str(self.data_dir), str(self.backup_dir))
+
+        assert manager.restore_backup(legacy.name)
+        restored = self.data_dir / "attempt_summaries.csv"
+        assert restored.read_text(encoding="utf-8") == "problem_id,total\np9,3\n"
+        assert manager.get_backup_info()["backup_count"] == 1
+
+        assert manager.cleanup_old_backups() == 1
+        assert not legacy.exists()
+        assert manager.get_backup_info()["backup_count"] == 0
+
+    def test_catalog(self):
+        """目録からの一覧・統計情報と、目録の作り直しのテスト"""
+        self.manager.create_backup()
+        (self.data_dir / "attempts.csv").write_text("id,problem_id\n", encoding="utf-8")
+        self.manager.create_backup()
+        backups = self.manager.list_backups()
+
+        info = self.manager.get_backup_info()
+        assert info["backup_count"] == 2
+        assert info["latest_backup"] == backups[-1]["id"]
+        assert info["total_size_bytes"] == sum(p.stat().st_size for p in self._objects())
+
+        (self.backup_dir / "catalog.sqlite3").unlink()
+        manager = BackupManager(str(self.data_dir), str(self.backup_dir))
+        assert manager.list_backups() == backups
+        assert manager.get_backup_info() == info
+
+    def test_objects_are_compressed(self):
+        """オブジェクトを圧縮して保存し、展開して復元するテスト"""
+        rows = "".join(f"a{i},p1,学校へ行く,がっこう,1\n" for i in range(2000))
+        attempts = self.data_dir / "attempts.csv"
+        attempts.write_text("id,problem_id,sentence,reading,is_correct\n" + rows, encoding="utf-8")
+        assert self.manager.create_backup()
+
+        entry = self.manager.list_backups()[0]["files"]["attempts.csv"]
+        object_path = self.manager._object_path(entry["hash"])
+        assert object_path is not None
+        assert object_path.suffix == self.manager.object_suffix
+        assert object_path.stat().st_size * 10 < attempts.stat().st_size
+
+        original = attempts.read_bytes()
+        attempts.write_text("", encoding="utf-8")
+        assert self.manager.restore_backup(self.manager.list_backups()[0]["id"])
+        assert attempts.read_bytes() == original
+
+    def test_uncompressed_objects_are_restored(self):
+        """圧縮なしで保存された既存のオブジェクトも復元できるテスト"""
+        self.manager.create_backup()
+        manifest = self.manager.list_backups()[0]
+        entry = manifest["files"]["problems.csv"]
+        object_path = self.manager._object_path(entry["hash"])
+        assert object_path is not None
+        object_path.unlink()
+        object_path.with_suffix("").write_bytes((self.data_dir / "problems.csv").read_bytes())
+
+        (self.data_dir / "problems.csv").write_text("", encoding="utf-8")
+        assert self.manager.restore_backup(manifest["id"])
+        assert (self.data_dir / "problems.csv").read_text(encoding="utf-8").endswith("p1,学校\n")
+
+
+class TestZeroCopyBackup:
+    """変更されないファイルを複製せずに保存するバックアップのテスト"""
+
+    def setup_method(self):
+        """各テストメソッド実行前の準備"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.temp_dir.name)
+        self.data_dir = root / "data"
+        (self.data_dir / "attempt_archive").mkdir(parents=True)
+        (self.data_dir / "attempt_segments").mkdir()
+        self.manager = BackupManager(str(self.data_dir), str(root / "backups"))
+
+    def teardown_method(self):
+        """各テストメソッド実行後のクリーンアップ"""
+        self.temp_dir.cleanup()
+
+    def _object(self, name: str) -> Path:
+        """最新のバックアップでファイルに対応するオブジェクト"""
+        entry = self.manager.latest_manifest()["files"][name]
+        object_path = self.manager._object_path(entry["hash"])
+        assert object_path is not None
+        return object_path
+
+    def test_archive_is_linked(self):
+        """圧縮アーカイブは圧縮し直さずにリンク(またはreflink)で保存するテスト"""
+        archive = self.data_dir / "attempt_archive" / "attempts_202401.csv.gz"
+        archive.write_bytes(gzip.compress(b"id,problem_id\na1,p1\n"))
+        original = archive.read_bytes()
+        assert self.manager.create_backup()
+
+        object_path = self._object("attempt_archive/attempts_202401.csv.gz")
+        assert object_path.suffix == ""
+        if not self.manager.reflink_supported:
+            assert object_path.stat().st_ino == archive.stat().st_ino
+
+        # アーカイブは一時ファイルへの置き換えで更新されるため、リンク先は変わらない
+        replacement = archive.with_suffix(".tmp")
+        replacement.write_bytes(gzip.compress(b"id,problem_id\n"))
+        replacement.replace(archive)
+        assert object_path.read_bytes() == original
+
+        assert self.manager.restore_backup(self.manager.list_backups()[0]["id"])
+        assert archive.read_bytes() == original
+
+    def test_sealed_segment_is_linked(self):
+        """封印済みセグメントもリンク(またはreflink)で保存し、新しい版ができても変わらないテスト"""
+        store = AttemptSegmentStore(self.data_dir)
+        header = ["id", "problem_id", "attempted_at"]
+        store.seal(header, {"2024-01": [["a1", "p1", "2024-01-10T00:00:00"]]}, "2024-03")
+        segment = self.data_dir / "attempt_segments" / "attempts_202401.csv"
+        original = segment.read_bytes()
+        assert self.manager.create_backup()
+
+        object_path = self._object("attempt_segments/attempts_202401.csv")
+        assert object_path.suffix == ""
+        if not self.manager.reflink_supported:
+            assert object_path.stat().st_ino == segment.stat().st_ino
+
+        # 過去日時の試行が後から追記されると新しい版が作られ、元のファイルは削除される
+        store.seal(header, {"2024-01": [["a2", "p1", "2024-01-20T00:00:00"]]}, "2024-03")
+        assert not segment.exists()
+        assert object_path.read_bytes() == original
+
+        assert self.manager.restore_backup(self.manager.list_backups()[0]["id"])
+        assert segment.read_bytes() == original
+
+
+class TestIncrementalBackup:
+    """追記分だけを保存するバックアップのテスト"""
+
+    def setup_method(self):
+        """各テストメソッド実行前の準備"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.temp_dir.name)
+        self.data_dir = root / "data"
+        self.data_dir.mkdir()
+        self.attempts = self.data_dir / "attempts.csv"
+        self.attempts.write_text("id,problem_id\n", encoding="utf-8")
+        self.manager = BackupManager(str(self.data_dir), str(root / "backups"))
+
+    def teardown_method(self):
+        """各テストメソッド実行後のクリーンアップ"""
+        self.temp_dir.cleanup()
+
+    def _append(self, line: str) -> None:
+        """試行履歴に1行追記"""
+        with self.attempts.open("a", encoding="utf-8") as f:
+            f.write(line)
+
+    def test_appends_are_stored_as_deltas(self):
+        """追記された部分だけを差分として保存し、各時点に復元できるテスト"""
+        contents = [self.attempts.read_text(encoding="utf-8")]
+        self.manager.create_backup()
+        for i in range(3):
+            self._append(f"a{i},p1\n")
+            contents.append(self.attempts.read_text(encoding="utf-8"))
+            self.manager.create_backup()
+
+        backups = self.manager.list_backups()
+        entries = [b["files"]["attempts.csv"] for b in backups]
+        assert "chain" not in entries[0]
+        assert [len(e["chain"]) for e in entries[1:]] == [2, 3, 4]
+        assert entries[3]["chain"][:3] == entries[2]["chain"]
+
+        for manifest, content in zip(backups, contents, strict=True):
+            self.attempts.write_text("", encoding="utf-8")
+            assert self.manager.restore_to(manifest["created_at"])
+            assert self.attempts.read_text(encoding="utf-8") == content
+        assert not self.manager.restore_to("2000-01-01T00:00:00")
+
+    def test_rewrite_and_chain_limit_store_full_copy(self):
+        """追記以外の変更と差分の上限では全体を保存し直すテスト"""
+        self.manager.create_backup()
+        self._append("a1,p1\n")
+        self.manager.create_backup()
+        self.attempts.write_text("id,problem_id\na9,p9\n", encoding="utf-8")
+        self.manager.create_backup()
+        assert "chain" not in self.manager.latest_manifest()["files"]["attempts.csv"]
+
+        for i in range(backup.MAX_DELTA_CHAIN + 1):
+            self._append(f"b{i},p1\n")
+            self.manager.create_backup()
+        entry = self.manager.latest_manifest()["files"]["attempts.csv"]
+        assert "chain" not in entry
+
+        self.attempts.write_text("", encoding="utf-8")
+        assert self.manager.restore_backup(self.manager.latest_manifest()["id"])
+        assert self.attempts.read_text(encoding="utf-8").endswith(f"b{backup.MAX_DELTA_CHAIN},p1\n")
+
+    def test_cleanup_keeps_chain_objects(self):
+        """差分が参照する元のオブジェクトを削除しないテスト"""
+        self.manager.create_backup()
+        self._append("a1,p1\n")
+        self.manager.create_backup()
+        first = self.manager.list_backups()[0]
+        (self.manager.manifest_dir / f"{first['id']}.json").unlink()
+
+        self.manager.cleanup_old_backups()
+        expected = self.attempts.read_text(encoding="utf-8")
+        self.attempts.write_text("", encoding="utf-8")
+        assert self.manager.restore_backup(self.manager.latest_manifest()["id"])
+        assert self.attempts.read_text(encoding="utf-8") == expected
+
+
+class TestBackupScheduler:
+    """BackupSchedulerのテスト"""
+
+    def setup_method(self):
+        """各テストメソッド実行前の準備"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.temp_dir.name)
+        self.data_dir = root / "data"
+        self.data_dir.mkdir()
+        (self.data_dir / "problems.csv").write_text("id,sentence\np1,学校\n", encoding="utf-8")
+        self.manager = BackupManager(str(self.data_dir), str(root / "backups"))
+
+    def teardown_method(self):
+        """各テストメソッド実行後のクリーンアップ"""
+        self.temp_dir.cleanup()
+
+    def test_runs_only_when_changed(self):
+        """データが変更された場合だけバックアップするテスト"""
+        scheduler = BackupScheduler(self.manager, interval=0)
+        assert scheduler.run_pending()
+        assert not self.manager.has_changes()
+        assert not scheduler.run_pending()
+
+        (self.data_dir / "problems.csv").write_text("id,sentence\n", encoding="utf-8")
+        assert self.manager.has_changes()
+        assert scheduler.run_pending()
+        assert len(self.manager.list_backups()) == 2
+
+    def test_respects_interval(self):
+        """最新のバックアップから間隔が経過するまでは実行しないテスト"""
+        scheduler = BackupScheduler(self.manager, interval=3600)
+        assert scheduler.run_pending()
+        (self.data_dir / "problems.csv").write_text("id,sentence\n", encoding="utf-8")
+        assert not scheduler.run_pending()
+        assert len(self.manager.list_backups()) == 1
+
+    def test_background_thread(self):
+        """バックグラウンドスレッドでバックアップするテスト"""
+        scheduler = BackupScheduler(self.manager, interval=0, poll_interval=0.01)
+        scheduler.start()
+        scheduler.start()
+        try:
+            deadline = time.monotonic() + 5
+            while not self.manager.list_backups() and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            scheduler.stop()
+        assert not scheduler.running
+        assert len(self.manager.list_backups()) == 1
@@ -0,0 +1,88 @@
+"""
+試行の集約・アーカイブ機能のテスト
+"""
+
+import csv
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from src.modules.compaction import AttemptCompactor, load_attempt_summaries
+from src.modules.storage import ATTEMPT_HEADER, AttemptStorage
+
+
+def _write_legacy_attempts(data_dir: str, rows: list[list]) -> None:
+    """複数月にまたがる attempts.csv を作成"""
+    with (Path(data_dir) / "attempts.csv").open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(ATTEMPT_HEADER)
+        writer.writerows(rows)
+
+
+class TestAttemptCompactor:
+    """AttemptCompactorのテスト"""
+
+    def setup_method(self):
+        """各テストメソッド実行前の準備"""
+        self.rows = [
+            ["a1", "p1", "2024-01-10T10:00:00", True],
+            ["a2", "p1", "2024-01-10T11:00:00", False],
+            ["a3", "p2", "2024-01-11T10:00:00", False],
+            ["a4", "p1", "2024-02-01T10:00:00", True],
+            ["a5", "p2", datetime.now().isoformat(), True],
+        ]
+        self.now = datetime.fromisoformat("2024-08-15T00:00:00")
+
+    def test_compact_moves_expired_segments_to_archive(self):
+        """保持期間を過ぎたセグメントがアーカイブされるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            _write_legacy_attempts(temp_dir, self.rows)
+            storage = AttemptStorage(temp_dir)
+
+            compacted = AttemptCompactor(storage, retention_days=200).compact(now=self.now)
+
+            assert compacted == 1
+            _, segments = storage.segments.load_manifest()
+            assert [s.month for s in segments] == ["2024-02"]
+            _, archived = storage.archive.load_manifest()
+            assert [s.month for s in archived] == ["2024-01"]
+            assert storage.archive.segment_path(archived[0]).name == "attempts_202401.csv.gz"
+            assert not (storage.segments.segment_dir / "attempts_202401.csv").exists()
+
+    def test_summaries_keep_statistics(self):
+        """集計行が問題別・日別の試行数と正解数を保持するテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            _write_legacy_attempts(temp_dir, self.rows)
+            storage = AttemptStorage(temp_dir)
+            AttemptCompactor(storage, retention_days=200).compact(now=self.now)
+
+            summaries = {(s.date, s.problem_id): s for s in load_attempt_summaries(temp_dir)}
+            assert summaries[("2024-01-10", "p1")].total_count == 2
+            assert summaries[("2024-01-10", "p1")].correct_count == 1
+            assert summaries[("2024-01-11", "p2")].correct_count == 0
+
+    def test_archived_attempts_stay_queryable(self):
+        """アーカイブ済みの試行を必要に応じて読み込めるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            _write_legacy_attempts(temp_dir, self.rows)
+            storage = AttemptStorage(temp_dir)
+            AttemptCompactor(storage, retention_days=200).compact(now=self.now)
+
+            assert {a.id for a in storage.load_attempts()} == {"a4", "a5"}
+            archived = storage.load_attempts(
+                start=datetime.fromisoformat("2024-01-01T00:00:00"),
+                end=datetime.fromisoformat("2024-01-31T23:59:59"),
+                include_archived=True,
+            )
+            assert {a.id for a in archived} == {"a1", "a2", "a3"}
+
+    def test_compact_is_idempotent(self):
+        """再実行しても集計行が二重計上されないテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            _write_legacy_attempts(temp_dir, self.rows)
+            storage = AttemptStorage(temp_dir)
+            compactor = AttemptCompactor(storage, retention_days=200)
+            compactor.compact(now=self.now)
+
+            assert compactor.compact(now=self.now) == 0
+            assert sum(s.total_count for s in load_attempt_summaries(temp_dir)) == 3
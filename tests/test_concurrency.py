@@ -0,0 +1,115 @@
+"""
+プロセス間ロック・楽観的並行制御のテスト
+"""
+
+import multiprocessing
+import tempfile
+
+import pytest
+
+from src.modules.file_lock import FileLock, LockTimeoutError
+from src.modules.models import Attempt, Problem
+from src.modules.storage import AttemptStorage, ProblemStorage
+
+WORKER_COUNT = 6
+INCREMENTS_PER_WORKER = 15
+
+
+def _increment_worker(data_dir: str, problem_id: str, count: int) -> int:
+    """不正解数を指定回数増やすワーカー"""
+    storage = ProblemStorage(data_dir, lock_timeout=60.0)
+    return sum(1 for _ in range(count) if storage.increment_incorrect_count(problem_id))
+
+
+def _attempt_worker(data_dir: str, problem_id: str, count: int) -> int:
+    """試行を指定件数保存するワーカー"""
+    storage = AttemptStorage(data_dir, lock_timeout=60.0)
+    return sum(
+        1
+        for _ in range(count)
+        if storage.save_attempt(Attempt(problem_id=problem_id, is_correct=False))
+    )
+
+
+class TestFileLock:
+    """FileLockのテスト"""
+
+    def test_generation_increases_on_write(self):
+        """書き込みごとに世代番号が増えるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            storage = ProblemStorage(temp_dir)
+            assert storage.generation == 0
+
+            storage.save_problem(
+                Problem(sentence="漢字の問題", answer_kanji="漢字", reading="かんじ")
+            )
+            assert storage.generation == 1
+
+    def test_exclusive_lock_fails_fast(self):
+        """排他ロック保持中は別ロックが即時失敗するテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            storage = ProblemStorage(temp_dir)
+            holder = FileLock(storage.file_path)
+            contender = FileLock(storage.file_path, timeout=0)
+
+            with holder.exclusive(), pytest.raises(LockTimeoutError), contender.shared():
+                pass
+
+    def test_conflict_without_retry(self):
+        """retry_on_conflict=False の場合に競合で失敗するテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            storage = ProblemStorage(temp_dir, retry_on_conflict=False)
+            other = ProblemStorage(temp_dir)
+            problem = Problem(sentence="漢字の問題", answer_kanji="漢字", reading="かんじ")
+            storage.save_problem(problem)
+
+            def concurrent_mutation(problems: list[Problem]) -> bool:
+                # 読み込み後・書き込み前に別プロセスが更新した状況を再現
+                other.increment_incorrect_count(problem.id)
+                problems[0].increment_incorrect_count()
+                return True
+
+            assert storage._commit_problems(concurrent_mutation) is False
+            assert storage.load_problems()[0].incorrect_count == 2
+
+
+class TestConcurrentWrites:
+    """複数プロセスからの同時書き込みのテスト"""
+
+    def test_no_lost_incorrect_count_updates(self):
+        """複数プロセスの同時採点で不正解数の更新が失われないテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            storage = ProblemStorage(temp_dir)
+            problems = [
+                Problem(sentence="独創的な表現", answer_kanji="独創", reading="どくそう"),
+                Problem(sentence="美しい景色", answer_kanji="景色", reading="けしき"),
+            ]
+            for problem in problems:
+                storage.save_problem(problem)
+
+            ctx = multiprocessing.get_context("spawn")
+            args = [
+                (temp_dir, problems[i % 2].id, INCREMENTS_PER_WORKER) for i in range(WORKER_COUNT)
+            ]
+            with ctx.Pool(WORKER_COUNT) as pool:
+                results = pool.starmap(_increment_worker, args)
+
+            assert sum(results) == WORKER_COUNT * INCREMENTS_PER_WORKER
+            counts = {p.id: p.incorrect_count for p in storage.load_problems()}
+            expected = 1 + INCREMENTS_PER_WORKER * WORKER_COUNT // 2
+            assert counts[problems[0].id] == expected
+            assert counts[problems[1].id] == expected
+
+    def test_no_lost_attempts(self):
+        """複数プロセスの同時保存で試行が失われないテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            AttemptStorage(temp_dir)
+
+            ctx = multiprocessing.get_context("spawn")
+            args = [(temp_dir, f"problem-{i}", INCREMENTS_PER_WORKER) for i in range(WORKER_COUNT)]
+            with ctx.Pool(WORKER_COUNT) as pool:
+                results = pool.starmap(_attempt_worker, args)
+
+            assert sum(results) == WORKER_COUNT * INCREMENTS_PER_WORKER
+            attempts = AttemptStorage(temp_dir).load_attempts()
+            assert len(attempts) == WORKER_COUNT * INCREMENTS_PER_WORKER
@@ -0,0 +1,285 @@
+"""
+ヘルスチェックのテスト
+"""
+
+import csv
+import json
+import tempfile
+from pathlib import Path
+
+from src.modules import health_check
+from src.modules.health_check import (
+    HealthCheckResult,
+    HealthCheckRunner,
+    ProblemIdSet,
+    find_orphans,
+    run_health_check,
+    start_health_check,
+)
+from src.modules.models import Attempt, Problem
+from src.modules.storage import AttemptStorage, ProblemStorage
+
+
+def _summary(result: HealthCheckResult) -> tuple:
+    """比較用に結果を並べ替えてまとめる"""
+    return (
+        result.total_problems,
+        result.total_attempts,
+        sorted(result.duplicate_problem_ids),
+        sorted(result.duplicate_attempt_ids),
+        sorted(result.orphaned_attempts),
+        result.orphan_count,
+        sorted(result.invalid_boolean_values),
+    )
+
+
+class TestIncrementalHealthCheck:
+    """前回の検査済み位置から再開するヘルスチェックのテスト"""
+
+    def setup_method(self):
+        """各テストメソッド実行前の準備"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_dir = Path(self.temp_dir.name)
+        self.problem_storage = ProblemStorage(self.temp_dir.name)
+        self.attempt_storage = AttemptStorage(self.temp_dir.name)
+        self.problem = Problem(sentence="学校へ行く", answer_kanji="学校", reading="がっこう")
+        assert self.problem_storage.save_problem(self.problem)
+        for _ in range(3):
+            assert self.attempt_storage.save_attempt(Attempt(self.problem.id, is_correct=True))
+
+    def teardown_method(self):
+        """各テストメソッド実行後のクリーンアップ"""
+        self.temp_dir.cleanup()
+
+    def _check(self) -> HealthCheckResult:
+        """前回の結果を使うヘルスチェックを実行し、全体の検査と同じ結果か確かめる"""
+        result = run_health_check(self.problem_storage, self.attempt_storage)
+        full = run_health_check(self.problem_storage, self.attempt_storage, incremental=False)
+        assert _summary(result) == _summary(full)
+        assert result.has_issues == full.has_issues
+        return result
+
+    def _append_raw(self, row: list[str]) -> None:
+        """attempts.csv に行を直接追記"""
+        with self.attempt_storage.file_path.open("a", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow(row)
+
+    def _state(self) -> dict:
+        """保存された検査状態"""
+        return json.loads((self.data_dir / "health_check" / "state.json").read_text())
+
+    def test_only_appended_rows_are_checked(self):
+        """追記された行だけを検査し、全体の検査と同じ結果になるテスト"""
+        result = run_health_check(self.problem_storage, self.attempt_storage)
+        assert not result.has_issues
+        assert result.total_attempts == 3
+        mark = self._state()["files"]["attempts.csv"]
+        assert mark["offset"] == self.attempt_storage.file_path.stat().st_size
+
+        existing = self.attempt_storage.load_attempts()[0]
+        self._append_raw([existing.id, self.problem.id, "2024-01-01T00:00:00", "True", "", ""])
+        self._append_raw(["a-orphan", "missing", "2024-01-01T00:00:00", "yes", "", ""])
+
+        result = self._check()
+        assert result.duplicate_attempt_ids == [existing.id]
+        assert result.orphaned_attempts == [("a-orphan", "missing")]
+        assert result.invalid_boolean_values == ["a-orphan"]
+        assert result.total_attempts == 4
+
+        # 前回の検査済み位置より前は読み直さない
+        assert self._state()["files"]["attempts.csv"]["offset"] > mark["offset"]
+
+    def test_unchanged_data_returns_saved_result(self):
+        """追記も問題の変更もなければ、状態を保存し直さずに前回の結果を返すテスト"""
+        self._append_raw(["a-orphan", "missing", "2024-01-01T00:00:00", "True", "", ""])
+        first = run_health_check(self.problem_storage, self.attempt_storage)
+        state_path = self.data_dir / "health_check" / "state.json"
+        saved = state_path.stat().st_mtime_ns
+        arrays = sorted(p.name for p in state_path.parent.glob("*.npy"))
+
+        result = run_health_check(self.problem_storage, self.attempt_storage)
+        assert _summary(result) == _summary(first)
+        assert result.has_issues
+        assert state_path.stat().st_mtime_ns == saved
+        assert sorted(p.name for p in state_path.parent.glob("*.npy")) == arrays
+
+    def test_multiline_field_across_chunks(self):
+        """読み込み単位の境目が引用符内の改行にかかっても行を正しく区切るテスト"""
+        memo = "一行目\n" * 50
+        for _ in range(20):
+            assert self.attempt_storage.save_attempt(
+                Attempt("missing", is_correct=True, learning_memo=memo)
+            )
+        original = health_check.READ_CHUNK_SIZE
+        health_check.READ_CHUNK_SIZE = 256
+        try:
+            result = run_health_check(self.problem_storage, self.attempt_storage)
+        finally:
+            health_check.READ_CHUNK_SIZE = original
+        assert result.total_attempts == 23
+        assert len(result.orphaned_attempts) == 20
+        assert result.invalid_boolean_values == []
+
+    def test_partial_line_is_left_for_next_run(self):
+        """書き込み途中の最終行は次回に検査するテスト"""
+        run_health_check(self.problem_storage, self.attempt_storage)
+        with self.attempt_storage.file_path.open("a", encoding="utf-8") as f:
+            f.write("a-partial,missing,2024-01-01T00:00:00,Tr")
+        result = run_health_check(self.problem_storage, self.attempt_storage)
+        assert result.orphaned_attempts == []
+
+        with self.attempt_storage.file_path.open("a", encoding="utf-8") as f:
+            f.write("ue,,\n")
+        result = self._check()
+        assert result.orphaned_attempts == [("a-partial", "missing")]
+
+    def test_problem_changes(self):
+        """問題の追加で孤立が解消し、削除で新たな孤立が見つかるテスト"""
+        later = Problem(sentence="花火を見る", answer_kanji="花火", reading="はなび")
+        assert self.attempt_storage.save_attempt(Attempt(later.id, is_correct=False))
+        assert len(self._check().orphaned_attempts) == 1
+
+        assert self.problem_storage.save_problem(later)
+        result = self._check()
+        assert result.orphaned_attempts == []
+        assert result.total_problems == 2
+
+        assert self.problem_storage.delete_problem(self.problem.id)
+        result = self._check()
+        assert len(result.orphaned_attempts) == 3
+        assert {pid for _, pid in result.orphaned_attempts} == {self.problem.id}
+
+    def test_duplicates_within_and_across_runs(self):
+        """追記分の中の重複と、前回までに追記したIDとの重複を検出するテスト"""
+        self._append_raw(["a-dup", self.problem.id, "2024-01-01T00:00:00", "True", "", ""])
+        assert self._check().duplicate_attempt_ids == []
+
+        self._append_raw(["a-dup", self.problem.id, "2024-01-02T00:00:00", "True", "", ""])
+        self._append_raw(["a-twice", self.problem.id, "2024-01-02T00:00:00", "True", "", ""])
+        self._append_raw(["a-twice", self.problem.id, "2024-01-03T00:00:00", "True", "", ""])
+        result = self._check()
+        assert sorted(result.duplicate_attempt_ids) == ["a-dup", "a-twice"]
+        assert result.total_attempts == 5
+
+    def test_orphan_list_is_capped(self):
+        """孤立試行の一覧は上限まで、件数はすべて数えるテスト"""
+        for i in range(3):
+            self._append_raw([f"a-{i}", "missing-a", "2024-01-01T00:00:00", "True", "", ""])
+        for i in range(3, 8):
+            self._append_raw([f"a-{i}", "missing-b", "2024-01-01T00:00:00", "True", "", ""])
+        original = health_check.ORPHAN_LIST_LIMIT
+        health_check.ORPHAN_LIST_LIMIT = 5
+        try:
+            result = self._check()
+            assert result.orphan_count == 8
+            assert len(result.orphaned_attempts) == 5
+            assert "孤立試行データ: 8件" in result.get_summary()
+
+            # 問題の追加で孤立でなくなった分は、全体を検査し直さずに件数から除く
+            missing = Problem(
+                sentence="花火を見る", answer_kanji="花火", reading="はなび", id="missing-a"
+            )
+            assert self.problem_storage.save_problem(missing)
+            result = run_health_check(self.problem_storage, self.attempt_storage)
+        finally:
+            health_check.ORPHAN_LIST_LIMIT = original
+        assert result.orphan_count == 5
+        assert {pid for _, pid in result.orphaned_attempts} == {"missing-b"}
+        assert result.has_issues
+
+    def test_rewritten_log_is_checked_again(self):
+        """削除記録の追加や試行ログの書き換えでは全体を検査し直すテスト"""
+        run_health_check(self.problem_storage, self.attempt_storage)
+        attempts = self.attempt_storage.load_attempts()
+        assert self.attempt_storage.delete_attempt(attempts[0].id)
+        assert self._check().total_attempts == 2
+
+        # 検査済みの部分を書き換える(inode とサイズは同じ)
+        content = self.attempt_storage.file_path.read_bytes()
+        target = attempts[-1].problem_id.encode()
+        with self.attempt_storage.file_path.open("r+b") as f:
+            f.write(content.replace(target, b"x" * len(target)))
+        result = self._check()
+        assert len(result.orphaned_attempts) == 2
+
+
+class TestProblemIdSet:
+    """問題IDの所属判定のテスト"""
+
+    def test_membership(self):
+        """含まれるIDだけを真と判定するテスト"""
+        problem_ids = ProblemIdSet.from_ids(f"p-{i}" for i in range(1000))
+        assert len(problem_ids) == 1000
+        assert "p-0" in problem_ids
+        assert "p-1000" not in problem_ids
+        assert problem_ids.contains(["p-999", "x", "p-5"]).tolist() == [True, False, True]
+        assert ProblemIdSet.from_ids([]).contains(["p-0"]).tolist() == [False]
+
+    def test_find_orphans_keeps_order(self):
+        """存在しない問題を参照する試行を順序を保って返すテスト"""
+        problem_ids = ProblemIdSet.from_ids(["p-1", "p-2"])
+        pending = [("a-1", "p-1"), ("a-2", "gone"), ("a-3", "p-2"), ("a-4", "gone")]
+        assert find_orphans(problem_ids, pending) == [("a-2", "gone"), ("a-4", "gone")]
+
+    def test_duplicate_problem_rows(self):
+        """重複した問題の行を検出するテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            problem_storage = ProblemStorage(temp_dir)
+            attempt_storage = AttemptStorage(temp_dir)
+            problem = Problem(sentence="学校へ行く", answer_kanji="学校", reading="がっこう")
+            assert problem_storage.save_problem(problem)
+            with problem_storage.file_path.open("a", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerow([problem.id, "学校", "学校", "がっこう", "2024-01-01", 0])
+
+            result = run_health_check(problem_storage, attempt_storage, incremental=False)
+            assert result.duplicate_problem_ids == [problem.id]
+            assert result.total_problems == 1
+
+
+class TestHealthCheckRunner:
+    """バックグラウンドのヘルスチェックのテスト"""
+
+    def setup_method(self):
+        """各テストメソッド実行前の準備"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.problem_storage = ProblemStorage(self.temp_dir.name)
+        self.attempt_storage = AttemptStorage(self.temp_dir.name)
+        self.problem = Problem(sentence="学校へ行く", answer_kanji="学校", reading="がっこう")
+        assert self.problem_storage.save_problem(self.problem)
+
+    def teardown_method(self):
+        """各テストメソッド実行後のクリーンアップ"""
+        self.temp_dir.cleanup()
+
+    def test_runs_once_per_data_version(self):
+        """データの版ごとに1回だけ検査するテスト"""
+        runner = HealthCheckRunner(self.problem_storage, self.attempt_storage)
+        assert runner.result is None
+        assert not runner.is_current
+
+        assert runner.request()
+        result = runner.wait(timeout=10)
+        assert result is not None
+        assert not result.has_issues
+        assert runner.is_current
+        assert not runner.request()
+
+        # 書き込みで版が変わると結果は古くなり、次の要求で検査し直す
+        assert self.attempt_storage.save_attempt(Attempt("missing", is_correct=True))
+        assert not runner.is_current
+        assert runner.request()
+        result = runner.wait(timeout=10)
+        assert result is not None
+        assert len(result.orphaned_attempts) == 1
+        assert runner.is_current
+
+    def test_runner_is_shared_per_data_dir(self):
+        """同じデータディレクトリでは同じランナーを共有するテスト"""
+        runner = start_health_check(self.problem_storage, self.attempt_storage)
+        runner.wait(timeout=10)
+        other = start_health_check(
+            ProblemStorage(self.temp_dir.name), AttemptStorage(self.temp_dir.name)
+        )
+        assert other is runner
+        assert other.is_current
+        assert not other.running
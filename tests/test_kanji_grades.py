@@ -0,0 +1,69 @@
+"""
+学年別漢字配当表のテスト
+"""
+
+import pytest
+
+from src.modules.kanji_grades import (
+    GRADE_KANJI,
+    GRADES,
+    SECONDARY_GRADE,
+    grade_of,
+    is_within_grade,
+    kanji_for_grade,
+    text_grade,
+)
+from src.modules.validators import InputValidator
+
+
+class TestKanjiGrades:
+    """配当表の参照のテスト"""
+
+    def test_table_size(self):
+        """学年ごとの字数と重複がないことのテスト"""
+        assert [len(kanji) for kanji in GRADE_KANJI] == [80, 160, 200, 202, 193, 191]
+        assert len(set("".join(GRADE_KANJI))) == 1026
+
+    def test_grade_of(self):
+        """1文字の配当学年のテスト"""
+        assert grade_of("一") == 1
+        assert grade_of("話") == 2
+        assert grade_of("漢") == 3
+        assert grade_of("茨") == 4
+        assert grade_of("桜") == 5
+        assert grade_of("創") == 6
+        assert grade_of("鬱") == SECONDARY_GRADE
+        assert grade_of("あ") is None
+        assert grade_of("A") is None
+
+    def test_kanji_for_grade(self):
+        """学年で習う漢字の取得のテスト"""
+        assert all(grade_of(char) == 1 for char in kanji_for_grade(1))
+        assert GRADES == (1, 2, 3, 4, 5, 6)
+        with pytest.raises(ValueError, match="不正な学年"):
+            kanji_for_grade(7)
+
+    def test_text_grade(self):
+        """テキスト全体の配当学年のテスト"""
+        assert text_grade("学校") == 1
+        assert text_grade("創造する") == 6
+        assert text_grade("ひらがな") is None
+        assert is_within_grade("学校へ行く", 2)
+        assert not is_within_grade("創造", 5)
+        assert not is_within_grade("憂鬱", 6)
+
+
+class TestGradeValidation:
+    """学年のバリデーションのテスト"""
+
+    def test_validate_grade(self):
+        """学年の範囲外の漢字をエラーにするテスト"""
+        validator = InputValidator()
+        assert validator.validate_grade("学校", 1).is_valid
+
+        result = validator.validate_grade("創造", 3)
+        assert not result.is_valid
+        assert result.errors == ["「創」は6年生で習う漢字です", "「造」は5年生で習う漢字です"]
+
+        result = validator.validate_grade("鬱", 6)
+        assert result.errors == ["「鬱」は小学校で習わない漢字です"]
@@ -0,0 +1,78 @@
+"""
+漢字の転置索引のテスト
+"""
+
+import tempfile
+
+from src.modules.kanji_index import KanjiIndex
+from src.modules.models import Attempt, Problem
+from src.modules.storage import AttemptStorage, ProblemStorage
+
+
+class TestKanjiIndex:
+    """KanjiIndexのテスト"""
+
+    def setup_method(self):
+        """各テストメソッド実行前の準備"""
+        self.p1 = Problem(sentence="会社を創る", answer_kanji="創", reading="つく", id="p1")
+        self.p2 = Problem(sentence="創造する", answer_kanji="創造", reading="そうぞう", id="p2")
+        self.p3 = Problem(sentence="人と人", answer_kanji="人人", reading="ひと", id="p3")
+        self.p4 = Problem(sentence="造る", answer_kanji="造", reading="つく", id="p4")
+        self.p4.incorrect_count = 2
+        self.problems = [self.p1, self.p2, self.p3, self.p4]
+        # 問題ID -> (試行数, 正解数)
+        self.counts = {"p1": (4, 3), "p2": (2, 0), "p3": (5, 5), "p4": (2, 1)}
+
+    def test_problems_with(self):
+        """漢字を含む問題を取得するテスト"""
+        index = KanjiIndex(self.problems, self.counts)
+        assert index.problems_with("創") == [self.p1, self.p2]
+        assert index.problem_ids_with("造") == ["p2", "p4"]
+        assert index.problems_with("字") == []
+        assert set(index.kanji) == {"創", "造", "人"}
+
+    def test_stats(self):
+        """漢字ごとの集計が含まれる問題の合算になるテスト"""
+        index = KanjiIndex(self.problems, self.counts)
+        stats = index.stats("創")
+        assert stats is not None
+        assert (stats.problem_count, stats.total_count, stats.correct_count) == (2, 6, 3)
+        assert stats.incorrect_count == 3
+
+        # 同じ漢字を2回含む問題は1回として数える
+        stats = index.stats("人")
+        assert stats is not None
+        assert (stats.problem_count, stats.total_count) == (1, 5)
+        assert index.stats("字") is None
+
+    def test_weakest(self):
+        """不正解のある漢字を正答率の低い順に並べるテスト"""
+        index = KanjiIndex(self.problems, self.counts)
+        # 造: 1/4, 創: 3/6, 人: 不正解なし
+        assert [s.kanji for s in index.weakest(20)] == ["造", "創"]
+        assert [s.kanji for s in index.weakest(1)] == ["造"]
+
+    def test_problems_for_weakest(self):
+        """苦手な漢字を含む問題を順に選ぶテスト"""
+        index = KanjiIndex(self.problems, self.counts)
+        # 苦手な漢字の順に1問ずつ: 造(p4, p2 の順) -> 創(p1, p2 の順)
+        assert index.problems_for_weakest(1) == [self.p4]
+        assert index.problems_for_weakest(2) == [self.p4, self.p1]
+        assert index.problems_for_weakest(10) == [self.p4, self.p1, self.p2]
+
+    def test_from_storage(self):
+        """保存済みの問題と試行から索引を作成するテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            problem_storage = ProblemStorage(temp_dir)
+            attempt_storage = AttemptStorage(temp_dir)
+            for problem in self.problems:
+                problem_storage.save_problem(problem)
+            attempt_storage.save_attempt(Attempt(problem_id="p3", is_correct=False))
+            attempt_storage.save_attempt(Attempt(problem_id="p3", is_correct=True))
+            attempt_storage.save_attempt(Attempt(problem_id="deleted", is_correct=False))
+
+            index = KanjiIndex.from_storage(problem_storage, attempt_storage)
+            stats = index.stats("人")
+            assert stats is not None
+            assert (stats.total_count, stats.correct_count) == (2, 1)
+            assert [s.kanji for s in index.weakest()] == ["人"]
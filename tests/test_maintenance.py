@@ -0,0 +1,224 @@
+"""
+データメンテナンスのテスト
+"""
+
+import csv
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from src.modules.maintenance import DataMaintenance
+from src.modules.storage import ATTEMPT_HEADER, PROBLEM_HEADER, AttemptStorage, ProblemStorage
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def _write_csv(path: Path, header: list[str], rows: list[list]) -> None:
+    """CSVを書き込む"""
+    with path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def _read_rows(path: Path) -> list[list[str]]:
+    """ヘッダを除いた行を読み込む"""
+    with path.open(encoding="utf-8") as f:
+        return list(csv.reader(f))[1:]
+
+
+class TestDataMaintenance:
+    """DataMaintenanceクラスのテスト"""
+
+    def setup_method(self):
+        """各テストメソッド実行前の準備"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_dir = Path(self.temp_dir.name)
+        _write_csv(
+            self.data_dir / "problems.csv",
+            PROBLEM_HEADER,
+            [
+                ["p1", "学校へ行く", "学校", "がっこう", "2024-01-01T00:00:00", 2],
+                ["p2", "花火を見る", "花火", "はなび", "2024-01-02T00:00:00", ""],
+                ["p1", "学校に行く", "学校", "がっこう", "2024-01-03T00:00:00", 3],
+                ["p3", "山に登る", "山", "やま", "2024-01-04T00:00:00", 1],
+            ],
+        )
+        # 前月以前の試行は AttemptStorage の初期化時にセグメントへ移される
+        _write_csv(
+            self.data_dir / "attempts.csv",
+            ATTEMPT_HEADER,
+            [
+                ["a1", "p1", "2024-01-10T00:00:00", "True", "なし", ""],
+                ["a2", "gone", "2024-01-11T00:00:00", "False", "読み間違い", ""],
+                ["a3", "p2", "2024-02-01T00:00:00", "True", "なし", ""],
+            ],
+        )
+        self.problem_storage = ProblemStorage(self.temp_dir.name)
+        self.attempt_storage = AttemptStorage(self.temp_dir.name)
+
+    def teardown_method(self):
+        """各テストメソッド実行後のクリーンアップ"""
+        self.temp_dir.cleanup()
+
+    def _segment_paths(self) -> list[Path]:
+        """試行ログのセグメント"""
+        return self.attempt_storage.data_files()[:-1]
+
+    def test_dedupe_problems_keeps_latest(self):
+        """問題は created_at が最新の行を残し、削除記録を反映するテスト"""
+        assert self.problem_storage.delete_problem("p3")
+        generation = self.problem_storage.generation
+
+        result = DataMaintenance(self.temp_dir.name).dedupe_problems()
+        assert result.scanned == 4
+        assert result.removed == 2
+        assert result.rewritten == ["problems.csv"]
+
+        rows = _read_rows(self.problem_storage.file_path)
+        assert [(row[0], row[1], row[5]) for row in rows] == [
+            ("p2", "花火を見る", "0"),
+            ("p1", "学校に行く", "3"),
+        ]
+        assert not self.problem_storage.tombstones.file_path.exists()
+        assert self.problem_storage.generation > generation
+
+    def test_merge_counts(self):
+        """重複した問題の incorrect_count を合算するテスト"""
+        result = DataMaintenance(self.temp_dir.name).dedupe_problems(merge_counts=True)
+        assert result.merged == 1
+        problems = {p.id: p for p in self.problem_storage.load_problems()}
+        assert problems["p1"].incorrect_count == 5
+        assert problems["p1"].sentence == "学校に行く"
+        assert len(problems) == 3
+
+    def test_dry_run_does_not_write(self):
+        """dry-run ではファイルを書き換えないテスト"""
+        before = self.problem_storage.file_path.read_bytes()
+        segments = self._segment_paths()
+        maintenance = DataMaintenance(self.temp_dir.name, dry_run=True)
+
+        assert maintenance.dedupe_problems().removed == 1
+        assert maintenance.drop_orphans().removed == 1
+        assert self.problem_storage.file_path.read_bytes() == before
+        assert self._segment_paths() == segments
+        assert len(_read_rows(segments[0])) == 2
+
+    def test_dedupe_attempts_keeps_last_row(self):
+        """試行は後に書かれた行を残し、空になったセグメントを削除するテスト"""
+        segments = self._segment_paths()
+        assert [p.name for p in segments] == ["attempts_202401.csv", "attempts_202402.csv"]
+        with self.attempt_storage.file_path.open("a", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow(["a3", "p2", "2024-02-01T00:00:00", "False", "なし", "再"])
+
+        result = DataMaintenance(self.temp_dir.name).dedupe_attempts()
+        assert result.scanned == 4
+        assert result.removed == 1
+        assert result.rewritten == ["attempts_202402.csv"]
+
+        assert [p.name for p in self._segment_paths()] == ["attempts_202401.csv"]
+        assert not segments[1].exists()
+        attempt = self.attempt_storage.get_attempt("a3")
+        assert attempt is not None
+        assert attempt.learning_memo == "再"
+
+    def test_drop_orphans(self):
+        """存在しない問題を参照する試行を削除してマニフェストを更新するテスト"""
+        progress = []
+        maintenance = DataMaintenance(
+            self.temp_dir.name, progress=lambda label, count: progress.append((label, count))
+        )
+        assert maintenance.verify().orphaned_attempts == [("a2", "gone")]
+
+        result = maintenance.drop_orphans()
+        assert result.removed == 1
+        assert result.rewritten == ["attempts_202401.csv"]
+        assert ("attempts_202401.csv", 2) in progress
+
+        _, segments = self.attempt_storage.segments.load_manifest()
+        assert segments[0].rows == 1
+        assert segments[0].max_attempted_at == "2024-01-10T00:00:00"
+        assert {a.id for a in self.attempt_storage.load_attempts()} == {
+            "a1",
+            "a3",
+        }
+        assert maintenance.verify().orphaned_attempts == []
+
+    def test_cli(self):
+        """コマンドラインから検査と削除を実行するテスト"""
+        script = ROOT_DIR / "scripts" / "maintenance.py"
+        command = [sys.executable, str(script), "--data-dir", self.temp_dir.name, "--quiet"]
+
+        verify = subprocess.run([*command, "verify"], capture_output=True, text=True, check=False)
+        assert verify.returncode == 1
+        assert "孤立試行データ: 1件" in verify.stdout
+
+        drop = subprocess.run(
+            [*command, "drop-orphans"], capture_output=True, text=True, check=True
+        )
+        assert "1行を削除" in drop.stdout
+        subprocess.run([*command, "dedupe"], capture_output=True, text=True, check=True)
+        verify = subprocess.run([*command, "verify"], capture_output=True, text=True, check=False)
+        assert verify.returncode == 0
+
+
+class TestReadOnlyMaintenance:
+    """dry-run と検査でデータディレクトリを変更しないことのテスト"""
+
+    def setup_method(self):
+        """各テストメソッド実行前の準備(変換前の従来形式のデータ)"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_dir = Path(self.temp_dir.name)
+        _write_csv(
+            self.data_dir / "problems.csv",
+            PROBLEM_HEADER,
+            [
+                ["p1", "学校へ行く", "学校", "がっこう", "2024-01-01T00:00:00", 2],
+                ["p1", "学校に行く", "学校", "がっこう", "2024-01-03T00:00:00", 3],
+            ],
+        )
+        # 列の追加とセグメントへの分割が必要な、前月以前の4列の試行ログ
+        _write_csv(
+            self.data_dir / "attempts.csv",
+            ["id", "problem_id", "attempted_at", "is_correct"],
+            [
+                ["a1", "p1", "2024-01-10T00:00:00", "True"],
+                ["a1", "p1", "2024-01-11T00:00:00", "False"],
+                ["a2", "gone", "2024-02-01T00:00:00", "True"],
+            ],
+        )
+        (self.data_dir / "attempts.pending.csv").write_text(
+            "id,problem_id,attempted_at,is_correct\na3,p1,2024-02-02T00:00:00,True\n",
+            encoding="utf-8",
+        )
+
+    def teardown_method(self):
+        """各テストメソッド実行後のクリーンアップ"""
+        self.temp_dir.cleanup()
+
+    def _files(self) -> dict[str, bytes]:
+        """データディレクトリ内の全ファイルの内容(ロック用の空ファイルを除く)"""
+        return {
+            path.relative_to(self.data_dir).as_posix(): path.read_bytes()
+            for path in sorted(self.data_dir.rglob("*"))
+            if path.is_file() and not (path.suffix == ".lock" and not path.stat().st_size)
+        }
+
+    def test_dry_run_and_verify_leave_files_unchanged(self):
+        """dry-run の各操作と検査の後も全ファイルが同じ内容のままであるテスト"""
+        before = self._files()
+        maintenance = DataMaintenance(self.temp_dir.name, dry_run=True)
+        assert maintenance.dedupe_problems(merge_counts=True).removed == 1
+        assert maintenance.dedupe_attempts().removed == 1
+        assert maintenance.drop_orphans().removed == 1
+        result = maintenance.verify()
+        assert result.duplicate_attempt_ids == ["a1"]
+        assert result.orphaned_attempts == [("a2", "gone")]
+
+        script = ROOT_DIR / "scripts" / "maintenance.py"
+        command = [sys.executable, str(script), "--data-dir", self.temp_dir.name, "--quiet"]
+        for args in (["--dry-run", "dedupe"], ["--dry-run", "drop-orphans"], ["verify"]):
+            subprocess.run([*command, *args], capture_output=True, text=True, check=False)
+
+        assert self._files() == before
@@ -2,9 +2,10 @@
 モデルクラスのテスト
 """
 
+import uuid
 from datetime import datetime
 
-from src.modules.models import Attempt, Problem
+from src.modules.models import ID_SCHEME_ENV, Attempt, Problem, uuid7
 
 
 class TestProblem:
@@ -49,6 +50,20 @@ class TestProblem:
         assert problem.answer_kanji == "テスト"
         assert problem.reading == "テスト"
 
+    def test_created_at_parsed_on_access(self):
+        """created_at がISO文字列のまま保持され、参照時に解析されるテスト"""
+        problem = Problem(
+            sentence="テスト文",
+            answer_kanji="文",
+            reading="ぶん",
+            created_at="2025-01-27T10:00:00",
+        )
+
+        assert problem._created_at is None
+        assert problem.to_dict()["created_at"] == "2025-01-27T10:00:00"
+        assert problem.created_at == datetime.fromisoformat("2025-01-27T10:00:00")
+        assert problem._created_at is not None
+
 
 class TestAttempt:
     """Attemptクラスのテスト"""
@@ -71,3 +86,25 @@ class TestAttempt:
         assert data["is_correct"] is False
         assert "id" in data
         assert "attempted_at" in data
+
+
+class TestTimeOrderedIds:
+    """時刻順ID(UUIDv7)のテスト"""
+
+    def test_uuid7_is_monotonic(self):
+        """同一ミリ秒内でも生成順に並ぶテスト"""
+        ids = [str(uuid7()) for _ in range(1000)]
+
+        assert ids == sorted(ids)
+        assert len(set(ids)) == len(ids)
+        assert all(uuid.UUID(i).version == 7 for i in ids)
+
+    def test_opt_in_scheme(self, monkeypatch):
+        """環境変数で採番方式を切り替えられるテスト"""
+        assert uuid.UUID(Problem(sentence="文", answer_kanji="文", reading="ぶん").id).version == 4
+
+        monkeypatch.setenv(ID_SCHEME_ENV, "uuid7")
+        attempts = [Attempt(problem_id="p", is_correct=True) for _ in range(10)]
+
+        assert all(uuid.UUID(a.id).version == 7 for a in attempts)
+        assert [a.id for a in attempts] == sorted(a.id for a in attempts)
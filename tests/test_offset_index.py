@@ -0,0 +1,125 @@
+"""
+オフセット索引のテスト
+"""
+
+import csv
+import os
+import tempfile
+from pathlib import Path
+
+from src.modules.models import Attempt, Problem
+from src.modules.offset_index import OffsetIndex
+from src.modules.storage import ATTEMPT_HEADER, PROBLEM_HEADER, AttemptStorage, ProblemStorage
+
+
+def _write_problems(path: Path, rows: list[list]) -> None:
+    """problems.csv を作成"""
+    with path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(PROBLEM_HEADER)
+        writer.writerows(rows)
+
+
+class TestOffsetIndex:
+    """OffsetIndexのテスト"""
+
+    def test_find_rows_with_multiline_field(self):
+        """改行を含む行の後でも正しい位置の行を読めるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "problems.csv"
+            _write_problems(
+                path,
+                [
+                    ["p1", "一行目\n二行目", "行", "ぎょう", "2024-01-01T00:00:00", 0],
+                    ["p2", "漢字", "漢字", "かんじ", "2024-01-02T00:00:00", 1],
+                    ["p1", "重複", "重", "じゅう", "2024-01-03T00:00:00", 2],
+                ],
+            )
+            index = OffsetIndex(path)
+
+            header, rows = index.find_rows("p1")
+            assert [row[header.index("sentence")] for row in rows] == ["一行目\n二行目", "重複"]
+            _, rows = index.find_rows("p2")
+            assert rows[0][1] == "漢字"
+            assert index.find_rows("missing") == ([], [])
+
+    def test_rebuild_when_data_changes(self):
+        """データファイルが変わると索引が再構築されるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "problems.csv"
+            _write_problems(path, [["p1", "文", "文", "ぶん", "2024-01-01T00:00:00", 0]])
+            index = OffsetIndex(path)
+            assert index.lookup("p1")
+            assert index.lookup("p2") == []
+
+            with path.open("a", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerow(["p2", "字", "字", "じ", "2024-01-02T00:00:00", 0])
+
+            assert index.lookup("p2")
+
+    def test_rebuild_when_file_replaced(self):
+        """サイズと更新時刻が同じでも置き換えられたファイルでは索引を再構築するテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "problems.csv"
+            _write_problems(path, [["p1", "文", "文", "ぶん", "2024-01-01T00:00:00", 0]])
+            index = OffsetIndex(path)
+            assert index.lookup("p1")
+
+            replacement = Path(temp_dir) / "problems.csv.new"
+            _write_problems(replacement, [["p9", "文", "文", "ぶん", "2024-01-01T00:00:00", 0]])
+            stat = path.stat()
+            os.utime(replacement, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            replacement.replace(path)
+
+            assert index.lookup("p1") == []
+            assert index.lookup("p9")
+
+
+class TestStorageLookup:
+    """ストレージのID指定取得のテスト"""
+
+    def test_get_problem(self):
+        """重複行では最新の版を返し、削除済みはNoneになるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            storage = ProblemStorage(temp_dir)
+            _write_problems(
+                storage.file_path,
+                [
+                    ["p1", "古い文", "古", "ふる", "2024-01-01T00:00:00", 0],
+                    ["p1", "新しい文", "新", "あたら", "2024-02-01T00:00:00", 3],
+                ],
+            )
+
+            problem = storage.get_problem("p1")
+            assert problem is not None
+            assert problem.sentence == "新しい文"
+            assert problem.incorrect_count == 3
+
+            assert storage.delete_problem("p1")
+            assert storage.get_problem("p1") is None
+            assert not storage.update_problem(
+                Problem(sentence="文", answer_kanji="文", reading="ぶん", id="p1")
+            )
+
+    def test_get_attempt_across_segments(self):
+        """封印済みセグメントと当月分の両方から試行を取得できるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with (Path(temp_dir) / "attempts.csv").open("w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(ATTEMPT_HEADER)
+                writer.writerow(["old", "p1", "2024-01-10T10:00:00", True])
+            storage = AttemptStorage(temp_dir)
+            attempt = Attempt(problem_id="p2", is_correct=False)
+            assert storage.save_attempt(attempt)
+
+            old = storage.get_attempt("old")
+            assert old is not None
+            assert old.problem_id == "p1"
+            assert old.is_correct is True
+            new = storage.get_attempt(attempt.id)
+            assert new is not None
+            assert new.attempted_at_iso == attempt.attempted_at_iso
+
+            assert storage.delete_attempt("old")
+            assert storage.get_attempt("old") is None
+            assert storage.get_attempt("missing") is None
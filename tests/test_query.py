@@ -0,0 +1,100 @@
+"""
+問題の複合条件検索のテスト
+"""
+
+import random
+from datetime import datetime
+
+import pytest
+
+from src.modules.models import Problem
+from src.modules.query import ProblemQuery, ProblemQueryEngine
+
+
+def _problem(problem_id: str, answer_kanji: str, created_at: str, incorrect_count: int) -> Problem:
+    """作成日時と不正解数を指定して問題を作成"""
+    problem = Problem(
+        sentence=f"{answer_kanji}の練習",
+        answer_kanji=answer_kanji,
+        reading="れんしゅう",
+        id=problem_id,
+        created_at=datetime.fromisoformat(created_at),
+    )
+    problem.incorrect_count = incorrect_count
+    return problem
+
+
+class TestProblemQueryEngine:
+    """ProblemQueryEngineのテスト"""
+
+    def setup_method(self):
+        """各テストメソッド実行前の準備"""
+        self.problems = [
+            _problem("p1", "学校", "2024-01-01T09:00:00", 0),
+            _problem("p2", "創造", "2024-01-05T09:00:00", 3),
+            _problem("p3", "独創", "2024-02-01T09:00:00", 1),
+            _problem("p4", "花火", "2024-02-10T09:00:00", 3),
+            _problem("p5", "憂鬱", "2024-03-01T09:00:00", 2),
+        ]
+        self.engine = ProblemQueryEngine(self.problems, rng=random.Random(0))
+
+    def _ids(self, query: ProblemQuery) -> list[str]:
+        """検索結果の問題IDを取得"""
+        return [p.id for p in self.engine.execute(query)]
+
+    def test_order_and_limit(self):
+        """並び順と件数の指定が従来の抽出と同じ結果になるテスト"""
+        query = ProblemQuery().order_by("incorrect_count", descending=True).limit(3)
+        expected = sorted(self.problems, key=lambda p: p.incorrect_count, reverse=True)[:3]
+        assert self.engine.execute(query) == expected
+        assert self.engine.explain(query) == "order:incorrect_count"
+
+        query = ProblemQuery().order_by("created_at", descending=True).limit(2)
+        assert self._ids(query) == ["p5", "p4"]
+
+    def test_filters(self):
+        """各条件で絞り込むテスト"""
+        assert self._ids(ProblemQuery().incorrect_between(minimum=2)) == ["p2", "p4", "p5"]
+        assert self._ids(ProblemQuery().incorrect_between(1, 2)) == ["p3", "p5"]
+        assert self._ids(ProblemQuery().created_between("2024-01-05T09:00:00", "2024-02-10")) == [
+            "p2",
+            "p3",
+        ]
+        assert self._ids(ProblemQuery().containing("創")) == ["p2", "p3"]
+        assert self._ids(ProblemQuery().within_grade(2)) == ["p1", "p4"]
+        assert self._ids(ProblemQuery().containing("字")) == []
+
+    def test_combined_filters_use_smallest_index(self):
+        """複数の条件では候補の最も少ない索引を使うテスト"""
+        query = (
+            ProblemQuery()
+            .containing("創")
+            .created_between(start=datetime.fromisoformat("2024-01-01T00:00:00"))
+            .within_grade(6)
+            .order_by("incorrect_count", descending=True)
+        )
+        assert self.engine.explain(query) == "index:kanji"
+        assert self._ids(query) == ["p2", "p3"]
+
+        query = ProblemQuery().created_between(start="2024-03-01").incorrect_between(minimum=1)
+        assert self.engine.explain(query) == "index:created_at"
+        assert self._ids(query) == ["p5"]
+        assert self.engine.explain(ProblemQuery()) == "scan"
+
+    def test_random_order(self):
+        """ランダム抽出は条件に一致する問題から重複なく選ぶテスト"""
+        query = ProblemQuery().incorrect_between(minimum=1).order_by("random").limit(3)
+        ids = self._ids(query)
+        assert len(ids) == 3
+        assert len(set(ids)) == 3
+        assert set(ids) <= {"p2", "p3", "p4", "p5"}
+        assert len(self._ids(query.limit(10))) == 4
+
+    def test_query_is_immutable(self):
+        """条件の追加が元の条件を変更しないテスト"""
+        base = ProblemQuery().within_grade(3)
+        limited = base.limit(1)
+        assert base.max_results is None
+        assert limited.max_grade == 3
+        with pytest.raises(ValueError, match="不正な並び順"):
+            base.order_by("reading")
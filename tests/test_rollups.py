@@ -0,0 +1,111 @@
+"""
+日別集計(ロールアップ)のテスト
+"""
+
+import tempfile
+from datetime import datetime
+
+from src.modules.models import Attempt, Problem
+from src.modules.statistics import StatisticsManager
+from src.modules.storage import AttemptStorage, ProblemStorage
+
+
+def _attempt(problem_id: str, is_correct: bool, when: str) -> Attempt:
+    """日時を指定して試行を作成"""
+    return Attempt(
+        problem_id=problem_id, is_correct=is_correct, attempted_at=datetime.fromisoformat(when)
+    )
+
+
+def _daily(storage: AttemptStorage) -> list[tuple[str, int, int]]:
+    """日別の合計を (日付, 試行数, 正解数) のリストで取得"""
+    return [(r.date, r.total_count, r.correct_count) for r in storage.rollups.load_daily()]
+
+
+class TestDailyRollups:
+    """日別集計のテスト"""
+
+    def test_incremental_update_on_save(self):
+        """採点の保存ごとに集計が差分更新されるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            storage = AttemptStorage(temp_dir)
+            assert storage.rollups.is_current(storage.generation)
+
+            storage.save_attempt(_attempt("p1", True, "2024-01-01T09:00:00"))
+            storage.save_attempt(_attempt("p1", False, "2024-01-01T10:00:00"))
+            storage.save_attempt(_attempt("p2", True, "2024-02-03T10:00:00"))
+
+            assert storage.rollups.is_current(storage.generation)
+            assert _daily(storage) == [("2024-01-01", 2, 1), ("2024-02-03", 1, 1)]
+            problems = storage.rollups.load_problems(start="2024-02-01")
+            assert [(r.date, r.key, r.total_count) for r in problems] == [("2024-02-03", "p2", 1)]
+
+    def test_write_behind_append(self):
+        """バックグラウンド追記でも集計が更新されるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            storage = AttemptStorage(temp_dir, write_behind=True)
+            try:
+                for i in range(5):
+                    storage.enqueue_attempt(_attempt("p1", i % 2 == 0, "2024-03-01T09:00:00"))
+                storage.flush()
+                assert storage.rollups.is_current(storage.generation)
+                assert _daily(storage) == [("2024-03-01", 5, 3)]
+            finally:
+                storage.close()
+
+    def test_rebuild_after_delete(self):
+        """削除後は集計が古くなり、再構築で削除分が除かれるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            storage = AttemptStorage(temp_dir)
+            attempt = _attempt("p1", False, "2024-01-01T09:00:00")
+            storage.save_attempt(attempt)
+            storage.save_attempt(_attempt("p1", True, "2024-01-01T10:00:00"))
+
+            assert storage.delete_attempt(attempt.id)
+            assert not storage.rollups.is_current(storage.generation)
+            assert storage.ensure_rollups()
+            assert storage.rollups.is_current(storage.generation)
+            assert _daily(storage) == [("2024-01-01", 1, 1)]
+
+    def test_backfill_existing_log(self):
+        """集計のない既存の試行ログから集計を作成するテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            storage = AttemptStorage(temp_dir)
+            storage.save_attempt(_attempt("p1", True, "2024-01-01T09:00:00"))
+            storage.rollups.state_path.unlink()
+            storage.save_attempt(_attempt("p1", True, "2024-01-02T09:00:00"))
+
+            # 集計が無効な間は差分更新されない
+            assert storage.rollups.generation() is None
+            assert storage.rebuild_rollups()
+            assert _daily(storage) == [("2024-01-01", 1, 1), ("2024-01-02", 1, 1)]
+
+    def test_kanji_rollups(self):
+        """日別・問題別の集計を漢字別に展開するテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            storage = AttemptStorage(temp_dir)
+            storage.save_attempt(_attempt("p1", False, "2024-01-01T09:00:00"))
+            storage.save_attempt(_attempt("p2", True, "2024-01-01T10:00:00"))
+
+            rollups = storage.rollups.load_kanji({"p1": "漢字", "p2": "文字"})
+            counts = {r.key: (r.total_count, r.correct_count) for r in rollups}
+            assert counts == {"漢": (1, 0), "字": (2, 1), "文": (1, 1)}
+
+    def test_progress_matches_snapshot(self):
+        """集計から求めた進捗がスナップショットの集計と一致するテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            problem_storage = ProblemStorage(temp_dir)
+            attempt_storage = AttemptStorage(temp_dir)
+            problem = Problem(sentence="漢字", answer_kanji="漢字", reading="かんじ")
+            problem_storage.save_problem(problem)
+            for when, is_correct in (
+                ("2024-01-01T09:00:00", True),
+                ("2024-01-02T09:00:00", False),
+                ("2024-01-09T09:00:00", True),
+            ):
+                attempt_storage.save_attempt(_attempt(problem.id, is_correct, when))
+
+            manager = StatisticsManager(problem_storage, attempt_storage)
+            calculator = manager.get_calculator()
+            for freq in ("D", "W"):
+                assert manager.progress(freq).equals(calculator.period_accuracy(freq))
@@ -0,0 +1,210 @@
+"""
+列指向スナップショットのテスト
+"""
+
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from src.modules.models import Attempt, Problem
+from src.modules.snapshot import SnapshotExporter
+from src.modules.statistics import StatisticsManager
+from src.modules.storage import AttemptStorage, ProblemStorage
+
+
+class TestSnapshotExporter:
+    """SnapshotExporterのテスト"""
+
+    def setup_method(self):
+        """各テストメソッド実行前の準備"""
+        self.problems = [
+            Problem(sentence="漢字の練習", answer_kanji="漢字", reading="かんじ"),
+            Problem(sentence="練習する", answer_kanji="練習", reading="れんしゅう"),
+        ]
+
+    def test_export_and_load(self):
+        """書き出したスナップショットをメモリマップで読み込めるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            problem_storage = ProblemStorage(temp_dir)
+            attempt_storage = AttemptStorage(temp_dir)
+            for problem in self.problems:
+                problem_storage.save_problem(problem)
+            attempt_storage.save_attempt(
+                Attempt(problem_id=self.problems[0].id, is_correct=False, mistake_type="読み間違い")
+            )
+            attempt_storage.save_attempt(Attempt(problem_id=self.problems[1].id, is_correct=True))
+            attempt_storage.save_attempt(Attempt(problem_id="orphan", is_correct=True))
+
+            exporter = SnapshotExporter(temp_dir)
+            exporter.export(problem_storage, attempt_storage)
+            snapshot = exporter.load()
+
+            assert snapshot is not None
+            assert isinstance(snapshot.attempt_problem_code, np.memmap)
+            assert snapshot.attempt_attempted_at.dtype == np.int64
+            assert snapshot.problem_ids[:2] == [p.id for p in self.problems]
+            assert snapshot.problem_ids[2] == "orphan"
+            frame = snapshot.attempts_frame()
+            assert frame["problem_id"].tolist() == [
+                self.problems[0].id,
+                self.problems[1].id,
+                "orphan",
+            ]
+            assert frame["mistake_type"].tolist() == ["読み間違い", "なし", "なし"]
+            assert frame["is_correct"].tolist() == [False, True, True]
+            assert snapshot.problems_frame()["answer_kanji"].tolist() == ["漢字", "練習", ""]
+
+    def test_is_current_after_new_attempt(self):
+        """試行が追加されるとスナップショットが古くなるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            problem_storage = ProblemStorage(temp_dir)
+            attempt_storage = AttemptStorage(temp_dir)
+            exporter = SnapshotExporter(temp_dir)
+            assert exporter.load() is None
+
+            snapshot = exporter.export(problem_storage, attempt_storage)
+            assert snapshot.attempt_count == 0
+            assert exporter.is_current(snapshot, problem_storage, attempt_storage)
+
+            attempt_storage.save_attempt(Attempt(problem_id="p1", is_correct=True))
+            assert not exporter.is_current(snapshot, problem_storage, attempt_storage)
+
+            exporter.export(problem_storage, attempt_storage)
+            assert len(list(exporter.snapshot_dir.glob("v*"))) == 1
+
+    def test_cleanup_keeps_unfinished_exports(self):
+        """切り替え前の版だけを削除し、書き出し中のディレクトリは残すテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            problem_storage = ProblemStorage(temp_dir)
+            attempt_storage = AttemptStorage(temp_dir)
+            exporter = SnapshotExporter(temp_dir)
+            exporter.export(problem_storage, attempt_storage)
+            (previous,) = exporter.snapshot_dir.glob("v*")
+            unfinished = exporter.snapshot_dir / "v-unfinished"
+            unfinished.mkdir()
+
+            exporter.export(problem_storage, attempt_storage)
+            assert not previous.exists()
+            assert unfinished.exists()
+            assert len(list(exporter.snapshot_dir.glob("v*"))) == 2
+
+    def test_load_returns_none_when_broken(self):
+        """CURRENT.json が指す版が消えた・壊れた場合は None を返すテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            exporter = SnapshotExporter(temp_dir)
+            exporter.export(ProblemStorage(temp_dir), AttemptStorage(temp_dir))
+            (version_dir,) = exporter.snapshot_dir.glob("v*")
+
+            (version_dir / "attempt_is_correct.npy").unlink()
+            assert exporter.load() is None
+            exporter.current_path.write_text("{", encoding="utf-8")
+            assert exporter.load() is None
+
+    def test_extend_with_appended_attempts(self):
+        """試行の追記だけなら追記分を列の末尾に加え、全体の書き出しと同じ結果になるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            problem_storage = ProblemStorage(temp_dir)
+            attempt_storage = AttemptStorage(temp_dir)
+            for problem in self.problems:
+                problem_storage.save_problem(problem)
+            attempt_storage.save_attempt(Attempt(problem_id=self.problems[0].id, is_correct=True))
+            exporter = SnapshotExporter(temp_dir)
+            snapshot = exporter.export(problem_storage, attempt_storage)
+
+            # 書き込み遅延キューの試行はファイル末尾に追記される
+            writer = AttemptStorage(temp_dir, write_behind=True, fsync_policy="off")
+            writer.enqueue_attempt(
+                Attempt(problem_id=self.problems[1].id, is_correct=False, mistake_type="形")
+            )
+            writer.enqueue_attempt(
+                Attempt(problem_id="orphan", is_correct=True, learning_memo="一行目\n二行目")
+            )
+            writer.close()
+            extended = exporter.extend(snapshot, problem_storage, attempt_storage)
+            assert extended is not None
+            assert exporter.is_current(extended, problem_storage, attempt_storage)
+
+            full = SnapshotExporter(temp_dir).export(problem_storage, attempt_storage)
+            assert extended.problem_ids == full.problem_ids
+            assert extended.mistake_types == full.mistake_types
+            pd.testing.assert_frame_equal(extended.attempts_frame(), full.attempts_frame())
+            pd.testing.assert_frame_equal(extended.problems_frame(), full.problems_frame())
+
+    def test_extend_requires_append_only_change(self):
+        """削除や重複IDの追記があった場合は追記分だけの更新をしないテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            problem_storage = ProblemStorage(temp_dir)
+            attempt_storage = AttemptStorage(temp_dir)
+            attempt = Attempt(problem_id="p1", is_correct=True)
+            attempt_storage.save_attempt(attempt)
+            exporter = SnapshotExporter(temp_dir)
+            snapshot = exporter.export(problem_storage, attempt_storage)
+
+            attempt_storage._append_attempts([attempt], fsync=False)
+            assert exporter.extend(snapshot, problem_storage, attempt_storage) is None
+
+            snapshot = exporter.export(problem_storage, attempt_storage)
+            assert attempt_storage.delete_attempt(attempt.id)
+            assert exporter.extend(snapshot, problem_storage, attempt_storage) is None
+
+    def test_extend_after_problem_change(self):
+        """問題が変更されていても、問題の列を読み直して追記分を加えるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            problem_storage = ProblemStorage(temp_dir)
+            attempt_storage = AttemptStorage(temp_dir)
+            problem_storage.save_problem(self.problems[0])
+            attempt_storage.save_attempt(Attempt(problem_id=self.problems[1].id, is_correct=True))
+            attempt_storage.save_attempt(Attempt(problem_id="orphan", is_correct=True))
+            exporter = SnapshotExporter(temp_dir)
+            snapshot = exporter.export(problem_storage, attempt_storage)
+
+            # 試行にしか現れなかった問題が追加され、既存の問題は不正解数が変わる
+            problem_storage.save_problem(self.problems[1])
+            problem_storage.increment_incorrect_count(self.problems[0].id)
+            attempt_storage._append_attempts(
+                [Attempt(problem_id="new-orphan", is_correct=False, mistake_type="形")],
+                fsync=False,
+            )
+            extended = exporter.extend(snapshot, problem_storage, attempt_storage)
+            assert extended is not None
+            assert exporter.is_current(extended, problem_storage, attempt_storage)
+
+            full = SnapshotExporter(temp_dir).export(problem_storage, attempt_storage)
+            assert extended.problem_ids == full.problem_ids
+            pd.testing.assert_frame_equal(extended.attempts_frame(), full.attempts_frame())
+            pd.testing.assert_frame_equal(extended.problems_frame(), full.problems_frame())
+
+    def test_scoring_flow_extends_snapshot(self, monkeypatch):
+        """採点と同じ順序(試行の追加と不正解数のまとめての更新)の後は書き出し直さないテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            problem_storage = ProblemStorage(temp_dir)
+            attempt_storage = AttemptStorage(temp_dir, write_behind=True, fsync_policy="off")
+            for problem in self.problems:
+                problem_storage.save_problem(problem)
+            manager = StatisticsManager(problem_storage, attempt_storage)
+            manager.get_calculator()
+
+            calls = {"export": 0, "extend": 0}
+            export, extend = manager.exporter.export, manager.exporter.extend
+
+            def counting_export(*args, **kwargs):
+                calls["export"] += 1
+                return export(*args, **kwargs)
+
+            def counting_extend(*args, **kwargs):
+                calls["extend"] += 1
+                return extend(*args, **kwargs)
+
+            monkeypatch.setattr(manager.exporter, "export", counting_export)
+            monkeypatch.setattr(manager.exporter, "extend", counting_extend)
+
+            for problem in self.problems:
+                assert attempt_storage.enqueue_attempt(Attempt(problem.id, is_correct=False))
+            assert problem_storage.adjust_incorrect_counts({p.id: 1 for p in self.problems})
+            calculator = manager.get_calculator()
+            attempt_storage.close()
+
+            assert calls == {"export": 0, "extend": 1}
+            assert calculator.snapshot.attempt_count == 2
+            assert calculator.snapshot.problem_incorrect_count.tolist() == [2, 2]
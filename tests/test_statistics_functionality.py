@@ -0,0 +1,149 @@
+"""
+学習統計のテスト
+"""
+
+import tempfile
+from datetime import datetime
+
+import pytest
+
+from src.modules.models import Attempt, Problem
+from src.modules.snapshot import SnapshotExporter
+from src.modules.statistics import StatisticsCalculator, StatisticsManager
+from src.modules.storage import AttemptStorage, ProblemStorage
+
+
+def _attempt(problem_id: str, is_correct: bool, when: str, mistake_type: str = "なし") -> Attempt:
+    """日時を指定して試行を作成"""
+    return Attempt(
+        problem_id=problem_id,
+        is_correct=is_correct,
+        mistake_type=mistake_type,
+        attempted_at=datetime.fromisoformat(when),
+    )
+
+
+class TestStatisticsCalculator:
+    """StatisticsCalculatorのテスト"""
+
+    def setup_method(self):
+        """各テストメソッド実行前の準備"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.problem_storage = ProblemStorage(self.temp_dir.name)
+        self.attempt_storage = AttemptStorage(self.temp_dir.name)
+        self.p1 = Problem(sentence="漢字の練習", answer_kanji="漢字", reading="かんじ")
+        self.p2 = Problem(sentence="文字を書く", answer_kanji="文字", reading="もじ")
+        self.p3 = Problem(sentence="未出題", answer_kanji="未", reading="み")
+        for problem in (self.p1, self.p2, self.p3):
+            self.problem_storage.save_problem(problem)
+
+        # 2024-01-01 は月曜日
+        for attempt in (
+            _attempt(self.p1.id, False, "2024-01-01T09:00:00", "読み間違い"),
+            _attempt(self.p1.id, True, "2024-01-01T20:00:00"),
+            _attempt(self.p1.id, False, "2024-01-03T09:00:00", "書き間違い"),
+            _attempt(self.p2.id, True, "2024-01-03T10:00:00"),
+            _attempt(self.p2.id, False, "2024-01-08T10:00:00", "読み間違い"),
+        ):
+            self.attempt_storage.save_attempt(attempt)
+
+        snapshot = SnapshotExporter(self.temp_dir.name).export(
+            self.problem_storage, self.attempt_storage
+        )
+        self.calculator = StatisticsCalculator(snapshot)
+
+    def teardown_method(self):
+        """各テストメソッド実行後の後処理"""
+        self.temp_dir.cleanup()
+
+    def test_overall(self):
+        """全体統計のテスト"""
+        overall = self.calculator.overall
+        assert overall.total_attempts == 5
+        assert overall.correct_count == 2
+        assert overall.accuracy == pytest.approx(0.4)
+        assert overall.attempted_problems == 2
+        assert overall.study_days == 3
+
+    def test_problem_accuracy(self):
+        """問題別正答率が正答率の低い順に並ぶテスト"""
+        frame = self.calculator.problem_accuracy
+        assert frame["problem_id"].tolist() == [self.p1.id, self.p2.id]
+        assert frame["total_count"].tolist() == [3, 2]
+        assert frame["correct_count"].tolist() == [1, 1]
+        assert frame["accuracy"].tolist() == pytest.approx([1 / 3, 0.5])
+
+    def test_kanji_accuracy(self):
+        """漢字別正答率が問題の結果を漢字ごとに合算するテスト"""
+        frame = self.calculator.kanji_accuracy.set_index("kanji")
+        assert set(frame.index) == {"漢", "字", "文"}
+        assert frame.loc["字", "total_count"] == 5
+        assert frame.loc["字", "correct_count"] == 2
+        assert frame.loc["漢", "accuracy"] == pytest.approx(1 / 3)
+        assert self.calculator.kanji_accuracy["kanji"].iloc[0] == "漢"
+
+    def test_period_accuracy(self):
+        """日別・週別(月曜始まり)の集計のテスト"""
+        daily = self.calculator.period_accuracy("D")
+        assert [str(p.date()) for p in daily["period"]] == [
+            "2024-01-01",
+            "2024-01-03",
+            "2024-01-08",
+        ]
+        assert daily["total_count"].tolist() == [2, 2, 1]
+        assert daily["correct_count"].tolist() == [1, 1, 0]
+
+        weekly = self.calculator.period_accuracy("W")
+        assert [str(p.date()) for p in weekly["period"]] == ["2024-01-01", "2024-01-08"]
+        assert weekly["total_count"].tolist() == [4, 1]
+        assert weekly["accuracy"].tolist() == pytest.approx([0.5, 0.0])
+
+        with pytest.raises(ValueError, match="不正な集計単位"):
+            self.calculator.period_accuracy("M")
+
+    def test_mistake_breakdown(self):
+        """不正解の試行だけを間違いの種類別に数えるテスト"""
+        frame = self.calculator.mistake_breakdown
+        assert frame["mistake_type"].tolist() == ["読み間違い", "書き間違い"]
+        assert frame["count"].tolist() == [2, 1]
+        assert frame["ratio"].sum() == pytest.approx(1.0)
+
+
+class TestStatisticsManager:
+    """StatisticsManagerのテスト"""
+
+    def test_cache_until_new_attempt(self):
+        """データが変わらない間は同じ計算結果を再利用するテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            problem_storage = ProblemStorage(temp_dir)
+            attempt_storage = AttemptStorage(temp_dir)
+            problem = Problem(sentence="漢字", answer_kanji="漢字", reading="かんじ")
+            problem_storage.save_problem(problem)
+            attempt_storage.save_attempt(Attempt(problem_id=problem.id, is_correct=True))
+
+            manager = StatisticsManager(problem_storage, attempt_storage)
+            calculator = manager.get_calculator()
+            assert calculator.overall.total_attempts == 1
+            assert manager.get_calculator() is calculator
+
+            # 別のマネージャーは保存済みのスナップショットを読み込む
+            other = StatisticsManager(problem_storage, attempt_storage).get_calculator()
+            assert other.overall.total_attempts == 1
+
+            attempt_storage.save_attempt(Attempt(problem_id=problem.id, is_correct=False))
+            updated = manager.get_calculator()
+            assert updated is not calculator
+            assert updated.overall.total_attempts == 2
+            assert updated.overall.correct_count == 1
+
+    def test_empty_storage(self):
+        """試行がない場合も統計を計算できるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manager = StatisticsManager(ProblemStorage(temp_dir), AttemptStorage(temp_dir))
+            calculator = manager.get_calculator()
+            assert calculator.overall.total_attempts == 0
+            assert calculator.overall.accuracy == 0.0
+            assert calculator.problem_accuracy.empty
+            assert calculator.kanji_accuracy.empty
+            assert calculator.period_accuracy("W").empty
+            assert calculator.mistake_breakdown.empty
@@ -3,10 +3,13 @@
 """
 
 import tempfile
+import threading
+from datetime import datetime
 from pathlib import Path
 
 from src.modules.models import Attempt, Problem
-from src.modules.storage import AttemptStorage, ProblemStorage
+from src.modules.storage import ATTEMPT_HEADER, AttemptStorage, ProblemStorage
+from src.modules.write_behind import WriteBehindQueue
 
 
 class TestProblemStorage:
@@ -41,6 +44,25 @@ class TestProblemStorage:
             assert loaded_problems[0].answer_kanji == problem.answer_kanji
             assert loaded_problems[0].reading == problem.reading
 
+    def test_load_legacy_column_layout(self):
+        """列順の異なるCSVや incorrect_count 列のないCSVを読み込めるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            storage = ProblemStorage(temp_dir)
+            storage.file_path.write_text(
+                "created_at,id,reading,answer_kanji,sentence\n"
+                "2024-02-01T00:00:00,p2,かんじ,漢字,新しい文\n"
+                "2024-01-01T00:00:00,p1,れんしゅう,練習,古い文\n"
+                "2024-01-15T00:00:00.5,p2,かんじ,漢字,古い重複\n",
+                encoding="utf-8",
+            )
+
+            problems = storage.load_problems()
+
+            assert [p.id for p in problems] == ["p1", "p2"]
+            assert problems[1].sentence == "新しい文"
+            assert problems[0].reading == "レンシュウ"
+            assert all(p.incorrect_count == 0 for p in problems)
+
     def test_delete_problem(self):
         """問題の削除テスト"""
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -64,6 +86,28 @@ class TestProblemStorage:
             loaded_problems = storage.load_problems()
             assert len(loaded_problems) == 0
 
+    def test_adjust_incorrect_counts_in_one_write(self):
+        """複数の問題の不正解数を1回の書き込みで増減するテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            storage = ProblemStorage(temp_dir)
+            problems = [
+                Problem(sentence="学校へ行く", answer_kanji="学校", reading="がっこう"),
+                Problem(
+                    sentence="花火を見る", answer_kanji="花火", reading="はなび", incorrect_count=0
+                ),
+            ]
+            for problem in problems:
+                storage.save_problem(problem)
+            generation = storage.generation
+
+            assert storage.adjust_incorrect_counts(
+                {problems[0].id: 1, problems[1].id: -1, "missing": 1}
+            )
+            assert storage.generation == generation + 1
+            counts = {p.id: p.incorrect_count for p in storage.load_problems()}
+            assert counts == {problems[0].id: 2, problems[1].id: 0}
+            assert not storage.adjust_incorrect_counts({"missing": 1})
+
 
 class TestAttemptStorage:
     """AttemptStorageのテスト"""
@@ -113,3 +157,113 @@ class TestAttemptStorage:
 
             problem2_attempts = storage.get_attempts_by_problem("problem2")
             assert len(problem2_attempts) == 1
+
+
+class TestAttemptColumns:
+    """試行の間違いの種類・学習メモの保存のテスト"""
+
+    def test_mistake_type_round_trip(self):
+        """間違いの種類と学習メモが保存・読み込みされるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            storage = AttemptStorage(temp_dir)
+            attempt = Attempt(
+                problem_id="problem1",
+                is_correct=False,
+                mistake_type="読み間違い",
+                learning_memo="送り仮名に注意",
+            )
+            assert storage.save_attempt(attempt)
+
+            loaded = AttemptStorage(temp_dir).load_attempts()
+            assert loaded[0].mistake_type == "読み間違い"
+            assert loaded[0].learning_memo == "送り仮名に注意"
+
+    def test_legacy_header_upgraded(self):
+        """従来の4列のファイルに列が追加され、既定値で読み込まれるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "attempts.csv"
+            path.write_text(
+                "id,problem_id,attempted_at,is_correct\n"
+                f"a1,problem1,{datetime.now().isoformat()},False\n",
+                encoding="utf-8",
+            )
+
+            storage = AttemptStorage(temp_dir)
+
+            assert path.read_text(encoding="utf-8").splitlines()[0] == ",".join(ATTEMPT_HEADER)
+            attempts = storage.load_attempts()
+            assert attempts[0].mistake_type == "なし"
+            assert attempts[0].learning_memo == ""
+
+
+class TestAttemptWriteBehind:
+    """AttemptStorageの書き込み遅延キューのテスト"""
+
+    def test_enqueue_and_flush(self):
+        """キューに追加した試行がflush後に読み込めるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            storage = AttemptStorage(temp_dir, write_behind=True, fsync_policy="off")
+            attempts = [Attempt(problem_id=f"problem{i}", is_correct=i % 2 == 0) for i in range(50)]
+
+            for attempt in attempts:
+                assert storage.enqueue_attempt(attempt) is True
+            storage.flush()
+
+            loaded = AttemptStorage(temp_dir).load_attempts()
+            assert {a.id for a in loaded} == {a.id for a in attempts}
+            storage.close()
+
+    def test_close_drains_queue(self):
+        """停止時にキューが書き出されるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            storage = AttemptStorage(temp_dir, write_behind=True, fsync_policy="interval")
+            for i in range(10):
+                storage.enqueue_attempt(Attempt(problem_id=f"problem{i}", is_correct=True))
+            storage.close()
+
+            assert len(AttemptStorage(temp_dir).load_attempts()) == 10
+
+    def test_enqueue_without_write_behind(self):
+        """write_behind=False の場合は同期保存されるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            storage = AttemptStorage(temp_dir)
+            assert storage.enqueue_attempt(Attempt(problem_id="problem1", is_correct=True))
+            assert len(storage.load_attempts()) == 1
+
+    def test_interval_fsync_without_later_batch(self):
+        """fsync_policy="interval" では後続のバッチがなくても間隔後に fsync するテスト"""
+        synced = threading.Event()
+        writes = []
+        queue = WriteBehindQueue(
+            lambda items, fsync: writes.append(fsync),
+            fsync_policy="interval",
+            fsync_interval=0.05,
+            sync=synced.set,
+        )
+        queue.enqueue("item")
+        queue.flush()
+        assert writes == [False]
+        assert synced.wait(timeout=5)
+        queue.close()
+
+    def test_failed_batch_is_replayed(self):
+        """追記できなかった試行が退避され、次回起動時に追記されるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            storage = AttemptStorage(temp_dir, write_behind=True, fsync_policy="off")
+
+            def fail(attempts, fsync):
+                raise OSError
+
+            queue = storage._write_queue
+            assert queue is not None
+            queue._append_batch = fail
+            queue.max_retries = 1
+            attempts = [Attempt(problem_id=f"problem{i}", is_correct=True) for i in range(3)]
+            for attempt in attempts:
+                assert storage.enqueue_attempt(attempt)
+            storage.close()
+
+            assert storage.pending_path.exists()
+            reopened = AttemptStorage(temp_dir)
+            assert {a.id for a in reopened.load_attempts()} == {a.id for a in attempts}
+            assert not reopened.pending_path.exists()
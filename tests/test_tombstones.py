@@ -0,0 +1,97 @@
+"""
+削除記録(トゥームストーン)による削除のテスト
+"""
+
+import csv
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from src.modules.compaction import AttemptCompactor, load_attempt_summaries
+from src.modules.health_check import run_health_check
+from src.modules.models import Attempt, Problem
+from src.modules.storage import ATTEMPT_HEADER, PROBLEM_HEADER, AttemptStorage, ProblemStorage
+
+
+class TestProblemTombstones:
+    """問題の削除記録のテスト"""
+
+    def test_delete_problem_appends_tombstone(self):
+        """削除が problems.csv を書き換えず削除記録の追記で完了するテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            storage = ProblemStorage(temp_dir)
+            problem = Problem(sentence="漢字の練習", answer_kanji="漢字", reading="かんじ")
+            assert storage.save_problem(problem)
+            before = storage.file_path.read_bytes()
+
+            assert storage.delete_problem(problem.id)
+
+            assert storage.file_path.read_bytes() == before
+            assert storage.load_problems() == []
+            assert storage.fold_tombstones()
+            assert not storage.tombstones.file_path.exists()
+            assert storage.load_problems() == []
+
+    def test_delete_problem_once_hides_first_version(self):
+        """同一IDの重複行のうち最初の1件だけが削除されるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            storage = ProblemStorage(temp_dir)
+            with storage.file_path.open("w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(PROBLEM_HEADER)
+                writer.writerow(["p1", "古い文", "古", "ふる", "2024-01-01T00:00:00", 0])
+                writer.writerow(["p1", "新しい文", "新", "あたら", "2024-02-01T00:00:00", 0])
+
+            assert storage.delete_problem_once("p1")
+            problems = storage.load_problems()
+            assert [p.sentence for p in problems] == ["新しい文"]
+
+            assert storage.delete_problem_once("p1")
+            assert storage.load_problems() == []
+
+
+class TestAttemptTombstones:
+    """試行の削除記録のテスト"""
+
+    def test_bulk_delete_and_health_check(self):
+        """孤立試行の一括削除がヘルスチェックに反映されるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            problem_storage = ProblemStorage(temp_dir)
+            attempt_storage = AttemptStorage(temp_dir)
+            orphans = [Attempt(problem_id="missing", is_correct=False) for _ in range(3)]
+            for attempt in orphans:
+                assert attempt_storage.save_attempt(attempt)
+            assert len(run_health_check(problem_storage, attempt_storage).orphaned_attempts) == 3
+
+            assert attempt_storage.delete_attempts([a.id for a in orphans]) == 3
+
+            assert attempt_storage.load_attempts() == []
+            result = run_health_check(problem_storage, attempt_storage)
+            assert result.orphaned_attempts == []
+            assert result.total_attempts == 0
+
+    def test_compaction_folds_tombstones(self):
+        """集約時に削除記録がセグメント・アーカイブ・集計に反映されるテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with (Path(temp_dir) / "attempts.csv").open("w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(ATTEMPT_HEADER)
+                writer.writerow(["a1", "p1", "2024-01-10T10:00:00", True])
+                writer.writerow(["a2", "p1", "2024-01-10T11:00:00", False])
+                writer.writerow(["a3", "p2", "2024-03-01T10:00:00", True])
+                writer.writerow(["a4", "p2", datetime.now().isoformat(), True])
+            storage = AttemptStorage(temp_dir)
+            compactor = AttemptCompactor(storage, retention_days=200)
+            assert compactor.compact(now=datetime.fromisoformat("2024-08-15T00:00:00")) == 1
+
+            assert storage.delete_attempts(["a1", "a3", "a4"]) == 3
+            assert compactor.fold_tombstones() == 3
+
+            assert not storage.tombstones.file_path.exists()
+            assert [a.id for a in storage.load_attempts(include_archived=True)] == ["a2"]
+            _, segments = storage.segments.load_manifest()
+            assert segments == []
+            _, archived = storage.archive.load_manifest()
+            assert [s.rows for s in archived] == [1]
+            summaries = load_attempt_summaries(temp_dir)
+            assert [(s.problem_id, s.total_count) for s in summaries] == [("p1", 1)]